@@ -1,24 +1,43 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import heapq
 import json
 import math
+import os
 import random
+import struct
 import sys
+import tempfile
+import threading
+import time
+from collections import Counter, deque
 from dataclasses import dataclass
+from itertools import islice
 from pathlib import Path
-from typing import List, Tuple, Set, Optional
+from typing import List, Tuple, Optional
 
+import numpy as np
 import pygame as pg
 
 # ============================== CONFIG ==============================
 
-DATA_FILE = Path("snake_data.json")      # highscore + настройки
+DATA_FILE = Path("snake_data.json")      # старый формат: highscore + настройки
+DATA_DIR = Path("snake_data")            # настройки + таблицы рекордов
+LEADERBOARD_SIZE = 100                   # записей на (режим, сетку)
+SAVE_DEBOUNCE = 0.5                      # задержка записи на диск (с)
 FONT_NAME = "arial"
 BASE_FPS = 60                            # FPS отрисовки
+SIM_TICK_MS = 10                         # фиксированный шаг симуляции (мс)
+MAX_TICKS_PER_FRAME = 25                 # защита от «спирали смерти»
 INIT_GRID = (30, 30)                     # стартовая сетка (клеток)
 INIT_TILE = 22                           # размер одной клетки (px)
 INIT_MODE = "CLASSIC"                    # стартовый режим
+MIN_TILE = 8                             # меньше — включается камера
+CAMERA_TILE = 12                         # размер клетки в режиме камеры (px)
+STATIC_MARGIN = 16                       # запас статического слоя вокруг камеры (клеток)
+MAX_WINDOW = (1280, 800)                 # окно больше этого не растягиваем
+MINIMAP_SIZE = 160                       # сторона миникарты (px)
 
 # Цвета
 COLORS = {
@@ -62,6 +81,12 @@ EFFECT_DUR = {
     "reverse": 6.0,
 }
 
+# Время жизни золотого яблока (в секундах)
+GOLD_TTL = 6.0
+
+# Случайных попыток найти пустую клетку, потом — перебор свободных
+SPAWN_TRIES = 64
+
 # Начальная задержка между шагами змейки (мс) и минимальная
 BASE_STEP_MS = 140
 MIN_STEP_MS = 60
@@ -82,6 +107,9 @@ GROW_BY = {
     "shrink": -3,
 }
 
+# Коды ввода для записи/повтора (индекс в INPUT_DIRS)
+INPUT_DIRS = [(0, -1), (0, 1), (-1, 0), (1, 0)]   # up, down, left, right
+
 # ===================================================================
 
 
@@ -92,21 +120,250 @@ def clamp(v, a, b):
     return max(a, min(b, v))
 
 
-def load_data():
-    if DATA_FILE.exists():
+def atomic_write(path: Path, text: str):
+    # пишем во временный файл рядом и подменяем: файл всегда цел;
+    # имя временного файла своё у каждой записи — два писателя не смешаются
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=path.parent,
+                                     prefix=path.name + ".", suffix=".tmp",
+                                     delete=False) as f:
         try:
-            return json.loads(DATA_FILE.read_text("utf-8"))
-        except Exception:
-            pass
-    return {"highscores": {}, "settings": {}}
-
-
-def save_data(d):
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
     try:
-        DATA_FILE.write_text(json.dumps(
-            d, ensure_ascii=False, indent=2), encoding="utf-8")
-    except Exception:
-        pass
+        os.replace(f.name, path)
+    except OSError:
+        os.unlink(f.name)
+        raise
+
+
+class DataStore:
+    """Настройки и таблицы рекордов в памяти, запись на диск — в фоне.
+
+    Каждая таблица (режим, сетка) — отдельный файл, поэтому новое
+    значение переписывает только свой файл. Изменения копятся
+    SAVE_DEBOUNCE секунд и пишутся фоновым потоком, не в игровом цикле.
+    root=None — ничего не пишем (headless, бенчмарки).
+    """
+
+    def __init__(self, root: Optional[Path] = DATA_DIR):
+        self.root = Path(root) if root is not None else None
+        self.settings = {}
+        self.boards = {}          # (mode, "WxH") -> [[score, ts], ...]
+        self.dirty = set()        # "settings" или ключ таблицы
+        self.lock = threading.Lock()
+        self.wake = threading.Condition(self.lock)
+        self.io_lock = threading.Lock()   # одна запись на диск за раз
+        self.deadline = None
+        self.closed = False
+        self.thread = None
+        if self.root is None:
+            return
+        settings_file = self.root / "settings.json"
+        if settings_file.exists():
+            self.settings = self._read_json(settings_file, {})
+        elif DATA_FILE.exists():
+            self._import_legacy()
+        self.thread = threading.Thread(
+            target=self._writer, name="snake-store", daemon=True)
+        self.thread.start()
+
+    # ---------- чтение ----------
+
+    @staticmethod
+    def _read_json(path: Path, default):
+        try:
+            return json.loads(path.read_text("utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"snake: не удалось прочитать {path}: {e}", file=sys.stderr)
+            return default
+
+    def _import_legacy(self):
+        # snake_data.json старого формата: рекорды без размера сетки
+        data = self._read_json(DATA_FILE, {})
+        self.settings = dict(data.get("settings", {}))
+        self.dirty.add("settings")
+        grid = f"{INIT_GRID[0]}x{INIT_GRID[1]}"
+        for mode, score in data.get("highscores", {}).items():
+            self.board(mode, grid).append([int(score), 0])
+            self.dirty.add((mode, grid))
+        self.deadline = time.monotonic()
+
+    def _board_file(self, key) -> Path:
+        mode, grid = key
+        return self.root / "scores" / f"{mode}_{grid}.json"
+
+    def board(self, mode: str, grid: str) -> list:
+        key = (mode, grid)
+        entries = self.boards.get(key)
+        if entries is None:
+            entries = []
+            if self.root is not None:
+                f = self._board_file(key)
+                if f.exists():
+                    entries = self._read_json(f, [])
+            self.boards[key] = entries
+        return entries
+
+    def best(self, mode: str, grid: str) -> int:
+        entries = self.board(mode, grid)
+        return int(entries[0][0]) if entries else 0
+
+    def top(self, mode: str, grid: str, n: int = 10) -> list:
+        return self.board(mode, grid)[:n]
+
+    # ---------- изменения ----------
+
+    def submit(self, mode: str, grid: str, score: int) -> Optional[int]:
+        # место в таблице (с 0) или None, если не попали в топ
+        if score <= 0:
+            return None
+        with self.lock:
+            entries = self.board(mode, grid)
+            rank = len(entries)
+            for i, (s, _) in enumerate(entries):
+                if score > s:
+                    rank = i
+                    break
+            if rank >= LEADERBOARD_SIZE:
+                return None
+            entries.insert(rank, [score, int(time.time())])
+            del entries[LEADERBOARD_SIZE:]
+            self._mark((mode, grid))
+        return rank
+
+    def update_settings(self, **values):
+        with self.lock:
+            self.settings.update(values)
+            self._mark("settings")
+
+    def _mark(self, key):
+        # вызывать под self.lock
+        self.dirty.add(key)
+        self.deadline = time.monotonic() + SAVE_DEBOUNCE
+        self.wake.notify()
+
+    # ---------- запись ----------
+
+    def _writer(self):
+        with self.lock:
+            while not self.closed:
+                if self.deadline is None:
+                    self.wake.wait()
+                    continue
+                delay = self.deadline - time.monotonic()
+                if delay > 0:
+                    self.wake.wait(delay)
+                    continue
+                self._write_dirty()
+
+    def _write_dirty(self):
+        # вызывать под self.lock. Запись (фоновая и flush) идёт под io_lock:
+        # снимок берётся уже внутри него, поэтому более старый снимок не
+        # перезапишет более новый. Сериализуем под lock, пишем без него.
+        self.deadline = None
+        self.lock.release()
+        failed = []
+        try:
+            with self.io_lock:
+                with self.lock:
+                    jobs = []
+                    for key in self.dirty:
+                        value = (self.settings if key == "settings"
+                                 else self.boards[key])
+                        try:
+                            text = json.dumps(value, ensure_ascii=False)
+                        except (TypeError, ValueError) as e:
+                            print(f"snake: не удалось сохранить {key}: {e}",
+                                  file=sys.stderr)
+                            failed.append(key)
+                            continue
+                        jobs.append((key, text))
+                    self.dirty.clear()
+                for key, text in jobs:
+                    path = (self.root / "settings.json" if key == "settings"
+                            else self._board_file(key))
+                    try:
+                        path.parent.mkdir(parents=True, exist_ok=True)
+                        atomic_write(path, text)
+                    except OSError as e:
+                        print(f"snake: не удалось сохранить {path}: {e}",
+                              file=sys.stderr)
+                        failed.append(key)
+        finally:
+            self.lock.acquire()
+        if failed:
+            # не записалось — снова помечаем изменённым и повторим позже
+            # (flush/close повторят сразу)
+            self.dirty.update(failed)
+            if not self.closed:
+                self.deadline = time.monotonic() + SAVE_DEBOUNCE * 10
+
+    def flush(self):
+        if self.root is None:
+            return
+        with self.lock:
+            if self.dirty:
+                self._write_dirty()
+
+    def close(self):
+        if self.root is None:
+            return
+        self.flush()
+        with self.lock:
+            self.closed = True
+            self.wake.notify()
+        self.thread.join(timeout=2)
+
+
+def store_selftest() -> bool:
+    # DataStore во временной папке: первая запись на диск падает с OSError,
+    # потом в настройках оказывается значение, которое не пишется в JSON.
+    # Рекорд всё равно должен оказаться на диске, а настройки — после
+    # исправления значения и close()
+    global atomic_write
+    real_write = atomic_write
+    fail = [1]
+
+    def flaky_write(path, text):
+        if fail:
+            fail.pop()
+            raise OSError("selftest: диск недоступен")
+        real_write(path, text)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        atomic_write = flaky_write
+        try:
+            store = DataStore(Path(tmp))
+            store.submit("CLASSIC", "30x30", 42)
+            store.flush()                      # эта запись падает
+            failed_once = not fail
+            store.update_settings(volume={0.5})
+            store.flush()                      # рекорд пишется, настройки нет
+            kept = "settings" in store.dirty
+            store.update_settings(volume=0.5)
+            store.close()                      # повтор
+        finally:
+            atomic_write = real_write
+        root = Path(tmp)
+        f = root / "scores" / "CLASSIC_30x30.json"
+        saved = json.loads(f.read_text("utf-8")) if f.exists() else []
+        s = root / "settings.json"
+        settings = json.loads(s.read_text("utf-8")) if s.exists() else {}
+        leftovers = list(root.rglob("*.tmp"))
+    ok = (failed_once and kept and saved[:1] and saved[0][0] == 42
+          and settings.get("volume") == 0.5 and not leftovers)
+    print(f"store selftest: {'ok' if ok else 'FAIL'} (saved {saved}, "
+          f"settings {settings}, temp files left {len(leftovers)})")
+    return bool(ok)
+
+
+def secs_to_ticks(seconds: float) -> int:
+    return int(round(seconds * 1000 / SIM_TICK_MS))
 
 
 def grid_to_px(cell: Vec, tile: int) -> pg.Rect:
@@ -118,46 +375,201 @@ def sign(n: int) -> int:
     return (n > 0) - (n < 0)
 
 
-@dataclass
-class Particle:
-    x: float
-    y: float
-    vx: float
-    vy: float
-    life: float
-    color: Tuple[int, int, int]
+class ParticleSystem:
+    """Частицы в заранее выделенных массивах NumPy.
 
-    def update(self, dt: float):
-        self.x += self.vx * dt
-        self.y += self.vy * dt
-        self.life -= dt
+    Живые частицы лежат плотно в [0:count], свободные слоты — хвост
+    [count:capacity]. Обновление и удаление умерших — векторные операции.
+    """
+
+    FADE_TIME = 0.5
+
+    def __init__(self, capacity: int = 1024):
+        self.count = 0
+        self._alloc(capacity)
+
+    def _alloc(self, capacity: int):
+        self.capacity = capacity
+        self.pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.vel = np.zeros((capacity, 2), dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.float32)
+        self.color = np.zeros((capacity, 3), dtype=np.uint8)
 
-    def draw(self, surf: pg.Surface):
-        if self.life <= 0:
+    def _reserve(self, extra: int):
+        need = self.count + extra
+        if need <= self.capacity:
+            return
+        n = self.count
+        old = (self.pos, self.vel, self.life, self.color)
+        self._alloc(max(need, self.capacity * 2))
+        for dst, src in zip((self.pos, self.vel, self.life, self.color), old):
+            dst[:n] = src[:n]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def emit(self, pos, vel, life, color: Tuple[int, int, int]):
+        # pos, vel — (k, 2), life — (k,)
+        k = len(life)
+        self._reserve(k)
+        a, b = self.count, self.count + k
+        self.pos[a:b] = pos
+        self.vel[a:b] = vel
+        self.life[a:b] = life
+        self.color[a:b] = color
+        self.count = b
+
+    def update(self, dt: float):
+        n = self.count
+        if n == 0:
+            return
+        self.pos[:n] += self.vel[:n] * dt
+        self.life[:n] -= dt
+        alive = self.life[:n] > 0
+        k = int(np.count_nonzero(alive))
+        if k == n:
             return
-        alpha = clamp(int(255 * (self.life / 0.5)), 0, 255)
-        s = pg.Surface((4, 4), pg.SRCALPHA)
-        s.fill((*self.color, alpha))
-        surf.blit(s, (self.x, self.y))
+        # уплотнение: живые — в начало массивов
+        self.pos[:k] = self.pos[:n][alive]
+        self.vel[:k] = self.vel[:n][alive]
+        self.life[:k] = self.life[:n][alive]
+        self.color[:k] = self.color[:n][alive]
+        self.count = k
+
+    def draw(self, surf: pg.Surface, sprites: "SpritePool", offset=(0, 0)):
+        n = self.count
+        if n == 0:
+            return
+        alpha = np.clip(self.life[:n] * (255 / self.FADE_TIME),
+                        0, 255).astype(np.int32)
+        xy = (self.pos[:n] - offset).tolist()
+        cols = self.color[:n].tolist()
+        get = sprites.get
+        surf.blits([(get(tuple(c), a), p)
+                    for c, a, p in zip(cols, alpha.tolist(), xy)], False)
+
+
+class SpritePool:
+    """Готовые 4x4 спрайты частиц по (цвет, ступень прозрачности)."""
+
+    ALPHA_STEP = 16
+
+    def __init__(self, size: int = 4):
+        self.size = size
+        self.cache = {}
+
+    def get(self, color: Tuple[int, int, int], alpha: int) -> pg.Surface:
+        bucket = alpha // self.ALPHA_STEP
+        key = (color, bucket)
+        s = self.cache.get(key)
+        if s is None:
+            s = pg.Surface((self.size, self.size), pg.SRCALPHA)
+            s.fill((*color, min(255, bucket * self.ALPHA_STEP)))
+            self.cache[key] = s
+        return s
+
+
+# Шрифты на весь процесс. SysFont при первом вызове сканирует системные
+# шрифты (fc-list и т.п.) — это делается в фоне, а пока скан идёт, текст
+# рисуется встроенным шрифтом pygame; первый кадр его не ждёт.
+_fonts = {}
+_sysfonts_ready = threading.Event()
+_sysfonts_thread: Optional[threading.Thread] = None
+
+
+def preload_fonts():
+    global _sysfonts_thread
+    if _sysfonts_thread is None:
+        _sysfonts_thread = threading.Thread(
+            target=_scan_sysfonts, name="snake-fonts", daemon=True)
+        _sysfonts_thread.start()
+
+
+def _scan_sysfonts():
+    try:
+        pg.font.get_fonts()
+    finally:
+        _sysfonts_ready.set()
+
+
+def get_font(size: int, bold: bool = False) -> pg.font.Font:
+    preload_fonts()
+    ready = _sysfonts_ready.is_set()
+    key = (size, bold, ready)
+    font = _fonts.get(key)
+    if font is None:
+        if not pg.font.get_init():
+            _fonts.clear()  # после pg.quit() старые объекты недействительны
+            pg.font.init()
+        if ready:
+            font = pg.font.SysFont(FONT_NAME, size, bold=bold)
+        else:
+            font = pg.font.Font(None, size)
+            font.set_bold(bold)
+        _fonts[key] = font
+    return font
+
+
+class TextCache:
+    """Кэш отрисованного текста: рендерим заново только при смене строки."""
+
+    MAX_ITEMS = 256
+
+    def __init__(self):
+        self.cache = {}
+
+    def render(self, font: pg.font.Font, text: str, color) -> pg.Surface:
+        key = (id(font), text, color)
+        img = self.cache.get(key)
+        if img is None:
+            if len(self.cache) >= self.MAX_ITEMS:
+                self.cache.clear()
+            img = font.render(text, True, color)
+            self.cache[key] = img
+        return img
+
+    def clear(self):
+        self.cache.clear()
 
 
 @dataclass
 class Item:
     pos: Vec
     kind: str           # 'food', 'gold', 'slow', 'ghost', 'shrink', 'reverse'
-    ttl: Optional[float] = None  # для временных, например gold
+    expires: Optional[int] = None  # тик исчезновения, для временных (gold)
 
 
 class Snake:
     def __init__(self, start: Vec):
-        self.body: List[Vec] = [start]
+        self.body: deque = deque([start])
         self.dir: Vec = (1, 0)
         self.grow: int = 0
         self.alive: bool = True
+        # пространственный индекс тела: клетка -> (сколько сегментов, seq
+        # последнего); индекс сегмента в body = head_seq - seq
+        self.cells = {start: [1, 0]}
+        self.head_seq = 0
 
     def head(self) -> Vec:
         return self.body[0]
 
+    def occupies(self, pos: Vec) -> bool:
+        return pos in self.cells
+
+    def segment_index(self, pos: Vec) -> Optional[int]:
+        c = self.cells.get(pos)
+        return None if c is None else self.head_seq - c[1]
+
+    def _pop_tail(self):
+        tail = self.body.pop()
+        c = self.cells[tail]
+        c[0] -= 1
+        if c[0] == 0:
+            del self.cells[tail]
+
     def set_dir(self, new_dir: Vec):
         # запрет разворота на 180°
         if len(self.body) == 1:
@@ -183,15 +595,22 @@ class Snake:
         new_head = (nx, ny)
 
         # самоукус
-        if not ignore_self and new_head in self.body:
+        if not ignore_self and new_head in self.cells:
             self.alive = False
             return None
 
-        self.body.insert(0, new_head)
+        self.body.appendleft(new_head)
+        self.head_seq += 1
+        c = self.cells.get(new_head)
+        if c is None:
+            self.cells[new_head] = [1, self.head_seq]
+        else:
+            c[0] += 1
+            c[1] = self.head_seq
         if self.grow > 0:
             self.grow -= 1
         else:
-            self.body.pop()
+            self._pop_tail()
 
         return new_head
 
@@ -202,166 +621,624 @@ class Snake:
             # уменьшаем хвост, но минимум 1 сегмент
             for _ in range(min(-delta, max(0, len(self.body) - 1))):
                 if len(self.body) > 1:
-                    self.body.pop()
+                    self._pop_tail()
+
+
+class Camera:
+    """Окно просмотра по большой сетке (в клетках), следует за головой."""
+
+    def __init__(self, view_w: int, view_h: int, grid_w: int, grid_h: int):
+        self.view_w, self.view_h = view_w, view_h
+        self.grid_w, self.grid_h = grid_w, grid_h
+        self.x = self.y = 0
+
+    def follow(self, cell: Vec):
+        x = cell[0] - self.view_w // 2
+        y = cell[1] - self.view_h // 2
+        self.x = clamp(x, 0, max(0, self.grid_w - self.view_w))
+        self.y = clamp(y, 0, max(0, self.grid_h - self.view_h))
+
+    def visible(self, cell: Vec) -> bool:
+        return (self.x <= cell[0] < self.x + self.view_w
+                and self.y <= cell[1] < self.y + self.view_h)
+
+    def bounds(self) -> Tuple[int, int, int, int]:
+        # x0, y0, x1, y1 — видимые клетки, правая/нижняя граница не включена
+        return (self.x, self.y,
+                min(self.grid_w, self.x + self.view_w),
+                min(self.grid_h, self.y + self.view_h))
 
 
 class ObstacleField:
+    """Препятствия как битовая карта NumPy: grid[y, x] == 1 — стена."""
+
+    KINDS = ["rings", "cross", "random", "caves"]
+    MIN_REACH = 0.5   # доля поля, достижимая со старта, иначе перегенерация
+    ATTEMPTS = 8
+    DENSITY = 0.08    # доля стен в «random»
+
     def __init__(self, grid_w: int, grid_h: int):
         self.grid_w = grid_w
         self.grid_h = grid_h
-        self.cells: Set[Vec] = set()
-
-    def generate(self, kind: str = "rings"):
-        self.cells.clear()
-        w, h = self.grid_w, self.grid_h
-
-        if kind == "rings":
-            # Несколько прямоугольных колец
-            for inset in (2, 6, 10):
-                for x in range(inset, w - inset):
-                    self.cells.add((x, inset))
-                    self.cells.add((x, h - inset - 1))
-                for y in range(inset, h - inset):
-                    self.cells.add((inset, y))
-                    self.cells.add((w - inset - 1, y))
-        elif kind == "cross":
-            cx, cy = w // 2, h // 2
-            for x in range(w):
-                if abs(x - cx) > 1:
-                    self.cells.add((x, cy))
-            for y in range(h):
-                if abs(y - cy) > 1:
-                    self.cells.add((cx, y))
-        elif kind == "random":
-            density = 0.08
-            for x in range(w):
-                for y in range(h):
-                    if random.random() < density:
-                        self.cells.add((x, y))
-        else:
-            # без препятствий
-            pass
+        self.grid = np.zeros((grid_h, grid_w), dtype=np.uint8)
+
+    @property
+    def count(self) -> int:
+        return int(np.count_nonzero(self.grid))
+
+    def generate(self, kind: str = "rings", rng: Optional[random.Random] = None,
+                 start: Optional[Vec] = None, density: Optional[float] = None):
+        # генератор NumPy сеется из rng игры — карта детерминирована зерном;
+        # density — доля стен для «random» (по умолчанию DENSITY)
+        rng = rng or random
+        density = self.DENSITY if density is None else density
+        nrng = np.random.default_rng(rng.getrandbits(64))
+        if start is None:
+            start = (self.grid_w // 2, self.grid_h // 2)
+
+        for _ in range(self.ATTEMPTS):
+            self.grid[:] = 0
+            if kind == "rings":
+                self._rings()
+            elif kind == "cross":
+                self._cross()
+            elif kind == "random":
+                self.grid[:] = nrng.random(self.grid.shape) < density
+            elif kind == "caves":
+                self._caves(nrng)
+            else:
+                # без препятствий
+                return
+            self.clear_around(start)
+            if self.keep_reachable(start):
+                return
+        self.grid[:] = 0
+
+    def _rings(self):
+        # Несколько прямоугольных колец с проходами посередине сторон
+        g, w, h = self.grid, self.grid_w, self.grid_h
+        for inset in (2, 6, 10):
+            if w - 2 * inset < 3 or h - 2 * inset < 3:
+                break
+            x0, x1, y0, y1 = inset, w - inset - 1, inset, h - inset - 1
+            g[y0, x0:x1 + 1] = 1
+            g[y1, x0:x1 + 1] = 1
+            g[y0:y1 + 1, x0] = 1
+            g[y0:y1 + 1, x1] = 1
+            mx, my = w // 2, h // 2
+            g[y0, mx - 1:mx + 2] = 0
+            g[y1, mx - 1:mx + 2] = 0
+            g[my - 1:my + 2, x0] = 0
+            g[my - 1:my + 2, x1] = 0
+
+    def _cross(self):
+        g, w, h = self.grid, self.grid_w, self.grid_h
+        cx, cy = w // 2, h // 2
+        g[cy, :] = 1
+        g[:, cx] = 1
+        g[cy, max(0, cx - 1):cx + 2] = 0
+        g[max(0, cy - 1):cy + 2, cx] = 0
+
+    def _caves(self, nrng, fill: float = 0.45, iterations: int = 4):
+        # клеточный автомат: стена, если вокруг >= 5 стен, пол — если <= 3
+        g = (nrng.random(self.grid.shape) < fill).astype(np.uint8)
+        for _ in range(iterations):
+            p = np.pad(g, 1, constant_values=1)
+            n = (p[:-2, :-2] + p[:-2, 1:-1] + p[:-2, 2:]
+                 + p[1:-1, :-2] + p[1:-1, 2:]
+                 + p[2:, :-2] + p[2:, 1:-1] + p[2:, 2:])
+            g = np.where(n >= 5, 1, np.where(n <= 3, 0, g)).astype(np.uint8)
+        self.grid[:] = g
+
+    def clear_around(self, cell: Vec, radius: int = 1):
+        # стартовая точка и её окрестность всегда свободны
+        x, y = cell
+        self.grid[max(0, y - radius):y + radius + 1,
+                  max(0, x - radius):x + radius + 1] = 0
+
+    def reachable(self, start: Vec) -> np.ndarray:
+        """Заливка от start: булева маска клеток, достижимых по 4-соседству.
+
+        Вместо обхода по клеткам заливка идёт целыми отрезками: проход по
+        строкам распространяет достижимость на весь свободный отрезок строки,
+        проход по столбцам — столбца; чередуем до стабилизации. Число
+        проходов ~ числу поворотов пути, а не его длине.
+        """
+        free = self.grid == 0
+        x, y = start
+        if not free[y, x]:
+            return np.zeros_like(free)
+        rows = self._runs(free)
+        cols = self._runs(free.T)
+        reach = np.zeros_like(free)
+        reach[y, x] = True
+        total = 1
+        while True:
+            reach = self._spread(reach, rows)
+            reach = self._spread(reach.T, cols).T
+            new_total = int(np.count_nonzero(reach))
+            if new_total == total:
+                return reach
+            total = new_total
+
+    @staticmethod
+    def _runs(free: np.ndarray):
+        # начала отрезков в плоском массиве (строка за строкой) и их длины;
+        # «отрезок» тянется до начала следующего, стены внутри ему не мешают
+        flat = np.ascontiguousarray(free).ravel()
+        w = free.shape[1]
+        starts = flat.copy()
+        starts[1:] &= ~flat[:-1]
+        starts[::w] = flat[::w]
+        idx = np.flatnonzero(starts)
+        if idx.size == 0 or idx[0] != 0:
+            idx = np.concatenate(([0], idx))
+        lengths = np.diff(np.append(idx, flat.size))
+        return flat, idx, lengths
+
+    @staticmethod
+    def _spread(reach: np.ndarray, runs) -> np.ndarray:
+        flat, idx, lengths = runs
+        hit = np.logical_or.reduceat(np.ascontiguousarray(reach).ravel(), idx)
+        return (np.repeat(hit, lengths) & flat).reshape(reach.shape)
+
+    def keep_reachable(self, start: Vec) -> bool:
+        # недостижимые карманы заливаем стеной, чтобы там не спавнились предметы
+        reach = self.reachable(start)
+        if np.count_nonzero(reach) < self.MIN_REACH * self.grid.size:
+            return False
+        self.grid[~reach] = 1
+        return True
+
+    def layer(self, x0: int, y0: int, x1: int, y1: int, tile: int) -> pg.Surface:
+        # участок карты одной поверхностью: клетка -> пиксель -> масштаб до tile
+        part = self.grid[y0:y1, x0:x1].T
+        rgb = np.zeros((*part.shape, 3), dtype=np.uint8)
+        rgb[part == 1] = COLORS["obstacle"]
+        surf = pg.surfarray.make_surface(rgb)
+        surf.set_colorkey((0, 0, 0))
+        return pg.transform.scale(surf, (part.shape[0] * tile, part.shape[1] * tile))
 
     def draw(self, surf: pg.Surface, tile: int):
-        col = COLORS["obstacle"]
-        for cell in self.cells:
-            pg.draw.rect(surf, col, grid_to_px(cell, tile))
+        surf.blit(self.layer(0, 0, self.grid_w, self.grid_h, tile), (0, 0))
+
+    def draw_region(self, surf: pg.Surface, tile: int,
+                    x0: int, y0: int, x1: int, y1: int):
+        # стены участка [x0, x1) x [y0, y1); клетка (x0, y0) — угол surf
+        surf.blit(self.layer(x0, y0, x1, y1, tile), (0, 0))
+
+    def draw_minimap(self, surf: pg.Surface, scale: float):
+        # max-pooling: точка миникарты есть, если в её блоке есть стена
+        step = max(1, int(round(1 / scale)))
+        h, w = self.grid.shape
+        ph, pw = -h % step, -w % step
+        g = np.pad(self.grid, ((0, ph), (0, pw)))
+        pooled = g.reshape((h + ph) // step, step, (w + pw) // step, step).max(axis=(1, 3))
+        rgb = np.zeros((*pooled.T.shape, 3), dtype=np.uint8)
+        rgb[pooled.T == 1] = COLORS["obstacle"]
+        small = pg.surfarray.make_surface(rgb)
+        small.set_colorkey((0, 0, 0))
+        surf.blit(pg.transform.scale(small, surf.get_size()), (0, 0))
 
     def is_blocked(self, pos: Vec) -> bool:
-        return pos in self.cells
+        return self.grid[pos[1], pos[0]] == 1
+
+
+# -------------------- Запись и повтор партий --------------------
+#
+# Файл повторов — подряд идущие сессии:
+#   SESSION_MAGIC, заголовок SESSION_HEADER, varint(число событий),
+#   события varint((tick - prev_tick) << 2 | код ввода).
+# Сессии дописываются в конец, файл можно читать потоково.
+
+SESSION_MAGIC = b"SNKR"
+SESSION_HEADER = struct.Struct("<IHHHHBII")
+MODE_CODES = list(MODES)
+
+
+def write_varint(out: bytearray, n: int):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def read_varint(f) -> int:
+    n = shift = 0
+    while True:
+        b = f.read(1)
+        if not b:
+            raise EOFError("обрезанный файл повтора")
+        n |= (b[0] & 0x7F) << shift
+        if b[0] < 0x80:
+            return n
+        shift += 7
+
+
+@dataclass
+class Session:
+    seed: int
+    grid_w: int
+    grid_h: int
+    base_step_ms: int
+    min_step_ms: int
+    mode: str
+    score: int
+    ticks: int
+    events: List[Tuple[int, int]]   # (tick, код ввода)
+
+    def encode(self) -> bytes:
+        out = bytearray(SESSION_MAGIC)
+        out += SESSION_HEADER.pack(
+            self.seed, self.grid_w, self.grid_h, self.base_step_ms,
+            self.min_step_ms, MODE_CODES.index(self.mode),
+            self.score, self.ticks)
+        write_varint(out, len(self.events))
+        prev = 0
+        for tick, code in self.events:
+            write_varint(out, (tick - prev) << 2 | code)
+            prev = tick
+        return bytes(out)
+
+
+def iter_sessions(path: Path):
+    # генератор: сессии читаются по одной, весь файл в память не грузится
+    with open(path, "rb") as f:
+        while True:
+            magic = f.read(len(SESSION_MAGIC))
+            if not magic:
+                return
+            if magic != SESSION_MAGIC:
+                raise ValueError(f"{path}: это не файл повторов")
+            seed, gw, gh, base, min_ms, mode, score, ticks = SESSION_HEADER.unpack(
+                f.read(SESSION_HEADER.size))
+            events = []
+            tick = 0
+            for _ in range(read_varint(f)):
+                v = read_varint(f)
+                tick += v >> 2
+                events.append((tick, v & 3))
+            yield Session(seed, gw, gh, base, min_ms, MODE_CODES[mode],
+                          score, ticks, events)
+
+
+class SessionRecorder:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.session: Optional[Session] = None
+
+    def start(self, game: "Game"):
+        self.session = Session(
+            game.session_seed, game.grid_w, game.grid_h, game.base_step_ms,
+            game.min_step_ms, game.mode, 0, 0, [])
+
+    def add(self, tick: int, code: int):
+        if self.session is not None:
+            self.session.events.append((tick, code))
+
+    def finish(self, game: "Game"):
+        if self.session is None:
+            return
+        if game.tick == 0:
+            self.session = None  # партия так и не началась
+            return
+        self.session.score = game.score
+        self.session.ticks = game.tick
+        with open(self.path, "ab") as f:
+            f.write(self.session.encode())
+        self.session = None
+
+
+def replay_session(session: Session) -> "Game":
+    """Прогнать записанную партию без окна на полной скорости."""
+    game = Game(session.grid_w, session.grid_h, 1, session.mode, headless=True)
+    game.base_step_ms = session.base_step_ms
+    game.min_step_ms = session.min_step_ms
+    game.reset_level(seed=session.seed)
+    game.state = "playing"
+    events = session.events
+    i = 0
+    while game.snake.alive and game.tick < session.ticks:
+        while i < len(events) and events[i][0] == game.tick:
+            game.apply_input(events[i][1])
+            i += 1
+        game.sim_tick()
+    return game
 
 
 class Game:
-    def __init__(self, grid_w: int, grid_h: int, tile: int, mode: str):
-        pg.init()
-        pg.display.set_caption("Advanced Snake — Pygame")
+    def __init__(self, grid_w: int, grid_h: int, tile: int, mode: str,
+                 fps: int = BASE_FPS, vsync: bool = False,
+                 headless: bool = False, seed: Optional[int] = None,
+                 record_path: Optional[Path] = None,
+                 store: Optional[DataStore] = None, autopilot: bool = False,
+                 telemetry=None):
+        # headless — только симуляция, без окна и шрифтов (повторы, бенчмарки)
+        self.headless = headless
+        # telemetry — приёмник событий партии (snake_telemetry.Telemetry)
+        self.telemetry = telemetry
+        # autopilot — играет решатель по гамильтонову циклу (snake_solver.py)
+        self.autopilot = autopilot
+        self.pilot = None
+        self.autopilot_off: Optional[str] = None   # почему на этой карте он не играет
+        self.snake: Snake = None  # type: ignore
         self.grid_w, self.grid_h = grid_w, grid_h
+        self.camera: Optional[Camera] = None
         self.tile = tile
-        self.width, self.height = grid_w * tile, grid_h * tile
-        self.screen = pg.display.set_mode(
-            (self.width, self.height), pg.RESIZABLE)
-        self.clock = pg.time.Clock()
-
-        self.font_small = pg.font.SysFont(FONT_NAME, 18)
-        self.font = pg.font.SysFont(FONT_NAME, 22)
-        self.font_big = pg.font.SysFont(FONT_NAME, 48, bold=True)
-        self.font_mid = pg.font.SysFont(FONT_NAME, 28, bold=True)
+        self.fit_view(min(grid_w * tile, MAX_WINDOW[0]),
+                      min(grid_h * tile, MAX_WINDOW[1]))
+        # fps = 0 — без ограничения кадров (или vsync), симуляция от этого не зависит
+        self.fps = fps
+        self.vsync = vsync
+        self.fullscreen = False
+        if not headless:
+            # только видео: pg.init() поднял бы ещё звук и джойстики;
+            # шрифты — лениво, через get_font (см. свойства font_*)
+            pg.display.init()
+            preload_fonts()
+            pg.display.set_caption("Advanced Snake — Pygame")
+            self.set_display_mode()
+            self.clock = pg.time.Clock()
 
         self.state = "menu"  # menu, playing, paused, gameover, settings
         self.mode = mode
-        self.data = load_data()
-        self.highscores = self.data.get("highscores", {})
-        self.settings = self.data.get("settings", {})
+        if store is None:
+            store = DataStore(None if headless else DATA_DIR)
+        self.store = store
+        self.settings = store.settings
+
+        # Случайность симуляции — только через self.rng (зерно на сессию)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.recorder = SessionRecorder(record_path) if record_path else None
 
         # Параметры шага
         self.base_step_ms = self.settings.get("base_step_ms", BASE_STEP_MS)
         self.min_step_ms = self.settings.get("min_step_ms", MIN_STEP_MS)
 
         # Объекты уровня
-        self.snake: Snake = None  # type: ignore
-        self.items: List[Item] = []
-        self.particles: List[Particle] = []
+        self.items = {}               # клетка -> Item, подбор за O(1)
+        self.item_counts = Counter()  # сколько предметов каждого вида
+        # таймеры по абсолютному тику: (tick, seq, действие, объект)
+        self.timers = []
+        self.timer_seq = 0
+        self.particles = ParticleSystem()
         self.obstacles = ObstacleField(grid_w, grid_h)
 
-        # Таймеры эффектов
+        # Эффекты: тик окончания (активен, пока tick < значения)
         self.effects = {
-            "slow": 0.0,
-            "ghost": 0.0,
-            "reverse": 0.0,
+            "slow": 0,
+            "ghost": 0,
+            "reverse": 0,
         }
 
         self.score = 0
+        self.cleared = False      # змейка заняла всё поле
         self.step_timer = 0.0
         self.step_ms = self.base_step_ms
-        self.fullscreen = False
+        self.tick = 0             # номер тика симуляции
+        self.accum_ms = 0.0       # несимулированное реальное время
+        self.prev_head: Optional[Vec] = None
+
+        # Кэши отрисовки
+        self.static_layer: Optional[pg.Surface] = None  # фон + сетка + стены
+        self.static_key = None        # участок мира (клетки), для которого он собран
+        self.grid_layer: Optional[pg.Surface] = None    # фон + сетка без стен
+        self.overlay_layer: Optional[pg.Surface] = None
+        self.minimap_layer: Optional[pg.Surface] = None
+        self.text_cache = TextCache()
+        self.sprites = SpritePool()
 
         self.reset_level(full_reset=True)
 
     # -------------------- Вспомогательное --------------------
 
-    def current_best(self) -> int:
-        return int(self.highscores.get(self.mode, 0))
+    @property
+    def font_small(self) -> pg.font.Font:
+        return get_font(18)
+
+    @property
+    def font(self) -> pg.font.Font:
+        return get_font(22)
+
+    @property
+    def font_mid(self) -> pg.font.Font:
+        return get_font(28, bold=True)
+
+    @property
+    def font_big(self) -> pg.font.Font:
+        return get_font(48, bold=True)
+
+    def apply_settings(self):
+        # настройки применяются на месте: окно уже подогнано под сетку
+        # (resize_for_grid), остаётся сохранить и начать уровень заново
+        self.store.update_settings(
+            base_step_ms=self.base_step_ms,
+            min_step_ms=self.min_step_ms,
+        )
+        self.reset_level(full_reset=True)
+
+    def grid_key(self) -> str:
+        return f"{self.grid_w}x{self.grid_h}"
+
+    def current_best(self, mode: Optional[str] = None) -> int:
+        return self.store.best(mode or self.mode, self.grid_key())
 
     def record_best(self):
-        if self.score > self.current_best():
-            self.highscores[self.mode] = self.score
-            self.data["highscores"] = self.highscores
-            save_data(self.data)
+        if self.recorder:
+            self.recorder.finish(self)
+        if self.headless or self.pilot is not None:
+            return
+        self.store.submit(self.mode, self.grid_key(), self.score)
+
+    def fit_view(self, width, height):
+        # Подогнать размер тайла под окно; если сетка не влезает даже с
+        # MIN_TILE — фиксированный тайл и камера, которая ездит за головой
+        tile = min(width // self.grid_w, height // self.grid_h)
+        if tile >= MIN_TILE:
+            self.tile = tile
+            self.camera = None
+            self.width, self.height = self.grid_w * tile, self.grid_h * tile
+        else:
+            self.tile = CAMERA_TILE
+            self.width, self.height = width, height
+            self.camera = Camera(width // self.tile, height // self.tile,
+                                 self.grid_w, self.grid_h)
+            if self.snake is not None:
+                self.camera.follow(self.snake.head())
 
     def resize_window(self, width, height):
-        # Подогнать размер тайла при ресайзе окна
-        new_tile_x = max(8, width // self.grid_w)
-        new_tile_y = max(8, height // self.grid_h)
-        self.tile = min(new_tile_x, new_tile_y)
-        self.width, self.height = self.grid_w * self.tile, self.grid_h * self.tile
-        self.screen = pg.display.set_mode(
-            (self.width, self.height), pg.RESIZABLE)
-
-    def random_empty_cell(self) -> Vec:
-        occupied = set(self.snake.body) | {
-            it.pos for it in self.items} | set(self.obstacles.cells)
-        while True:
-            pos = (random.randrange(self.grid_w),
-                   random.randrange(self.grid_h))
-            if pos not in occupied:
+        self.fit_view(width, height)
+        self.set_display_mode()
+        self.invalidate_static()
+
+    def resize_for_grid(self):
+        # после смены размера сетки в настройках
+        tile = self.tile if self.camera is None else CAMERA_TILE
+        self.resize_window(min(self.grid_w * tile, MAX_WINDOW[0]),
+                           min(self.grid_h * tile, MAX_WINDOW[1]))
+
+    def set_display_mode(self):
+        flags = pg.FULLSCREEN if self.fullscreen else pg.RESIZABLE
+        if self.vsync:
+            # vsync в pygame работает только с SCALED/OPENGL
+            try:
+                self.screen = pg.display.set_mode(
+                    (self.width, self.height), flags | pg.SCALED, vsync=1)
+                return
+            except pg.error:
+                self.vsync = False
+        self.screen = pg.display.set_mode((self.width, self.height), flags)
+
+    def invalidate_static(self):
+        # сбросить кэш статического слоя (ресайз, новая карта)
+        self.static_layer = None
+        self.static_key = None
+        self.grid_layer = None
+        self.overlay_layer = None
+        self.minimap_layer = None
+
+    def random_empty_cell(self) -> Optional[Vec]:
+        items = self.items
+        blocked = self.obstacles.is_blocked
+        # автопилот ходит только по циклу — предметы кладём на его клетки
+        allowed = self.pilot.cycle.index if self.pilot is not None else None
+
+        def free(pos):
+            return (not self.snake.occupies(pos) and pos not in items
+                    and not blocked(pos) and (allowed is None or pos in allowed))
+
+        for _ in range(SPAWN_TRIES):
+            pos = (self.rng.randrange(self.grid_w),
+                   self.rng.randrange(self.grid_h))
+            if free(pos):
                 return pos
+        # поле почти заполнено — перебираем свободные клетки
+        cells = allowed if allowed is not None else (
+            (x, y) for y in range(self.grid_h) for x in range(self.grid_w))
+        cells = [pos for pos in cells if free(pos)]
+        return self.rng.choice(cells) if cells else None
 
     def spawn_item(self, kind: Optional[str] = None):
         if kind is None:
             # 80–85% обычная еда, остальное — бусты по весам
-            if random.random() < 0.84:
+            if self.rng.random() < 0.84:
                 kind = "food"
             else:
                 kinds = list(POWERUP_WEIGHTS.keys())
                 weights = [POWERUP_WEIGHTS[k] for k in kinds]
-                kind = random.choices(kinds, weights=weights, k=1)[0]
+                kind = self.rng.choices(kinds, weights=weights, k=1)[0]
         pos = self.random_empty_cell()
-        ttl = None
+        if pos is None:
+            return  # свободных клеток не осталось
+        item = Item(pos=pos, kind=kind)
         if kind == "gold":
-            ttl = 6.0  # золотое быстро пропадает
-        self.items.append(Item(pos=pos, kind=kind, ttl=ttl))
-
-    def reset_level(self, full_reset=False):
+            # золотое быстро пропадает
+            item.expires = self.tick + secs_to_ticks(GOLD_TTL)
+            self.schedule(item.expires, "expire", item)
+        self.items[pos] = item
+        self.item_counts[kind] += 1
+        self.emit("spawn", kind=kind, pos=pos)
+
+    def remove_item(self, item: Item):
+        del self.items[item.pos]
+        self.item_counts[item.kind] -= 1
+
+    def emit(self, event: str, **data):
+        if self.telemetry is not None:
+            self.telemetry.emit(self.tick, event, **data)
+
+    def emit_quit(self):
+        # партию бросили на ходу (рестарт, меню, выход)
+        if self.snake is not None and self.snake.alive and self.tick > 0:
+            self.emit("quit", score=self.score, length=len(self.snake.body))
+
+    def schedule(self, tick: int, action: str, obj):
+        self.timer_seq += 1
+        heapq.heappush(self.timers, (tick, self.timer_seq, action, obj))
+
+    def effect_active(self, kind: str) -> bool:
+        return self.effects[kind] > self.tick
+
+    def run_timers(self):
+        # снимаем с кучи только то, что наступило; остальные предметы
+        # и эффекты за тик не трогаем вообще
+        timers = self.timers
+        while timers and timers[0][0] <= self.tick:
+            tick, _, action, obj = heapq.heappop(timers)
+            if action == "expire":
+                # предмет могли уже съесть — тогда запись устарела
+                if self.items.get(obj.pos) is obj:
+                    self.remove_item(obj)
+                    self.emit("expire", kind=obj.kind, pos=obj.pos)
+            elif action == "effect_end":
+                # эффект могли продлить — тогда сработает более поздняя запись
+                if self.effects[obj] == tick:
+                    self.effects[obj] = 0
+                    self.emit("effect_end", kind=obj)
+
+    def reset_level(self, full_reset=False, seed: Optional[int] = None):
+        if self.recorder:
+            self.recorder.finish(self)  # рестарт посреди партии
+        self.emit_quit()
+        # каждая партия — своё зерно: по нему + записи ввода её можно повторить
+        if seed is None:
+            seed = self.seed if self.seed is not None else random.getrandbits(32)
+            self.seed = None
+        self.session_seed = seed
+        self.rng = random.Random(seed)
         cx, cy = self.grid_w // 2, self.grid_h // 2
         self.snake = Snake((cx, cy))
         self.items.clear()
+        self.item_counts.clear()
+        self.timers.clear()
         self.particles.clear()
-        self.effects = {k: 0.0 for k in self.effects}
+        self.effects = {k: 0 for k in self.effects}
         self.score = 0
         self.step_timer = 0.0
         self.step_ms = self.base_step_ms
+        self.tick = 0
+        self.accum_ms = 0.0
+        self.prev_head = None
+        self.cleared = False
         # Генерация препятствий по режиму
         self.obstacles = ObstacleField(self.grid_w, self.grid_h)
         if self.mode == "OBSTACLES":
+            # стартовая точка и вокруг чуть-чуть расчищаются генератором
             self.obstacles.generate(
-                random.choice(["rings", "cross", "random"]))
-            # уберём стартовую точку и вокруг чуть-чуть
-            safe = {(cx, cy), (cx + 1, cy), (cx - 1, cy),
-                    (cx, cy + 1), (cx, cy - 1)}
-            self.obstacles.cells -= safe
+                self.rng.choice(ObstacleField.KINDS), self.rng, start=(cx, cy))
+        self.invalidate_static()
+        self.setup_pilot((cx, cy))
+        if self.telemetry is not None:
+            self.telemetry.start_session(
+                0, mode=self.mode, grid=self.grid_key(), seed=seed,
+                step_ms=self.step_ms, autopilot=self.pilot is not None)
         # стартовые предметы
         for _ in range(2):
             self.spawn_item("food")
+        # партии автопилота не пишем: ввод у него свой, а не игрока
+        if self.recorder and self.pilot is None:
+            self.recorder.start(self)
         if full_reset:
             # дополнительные “медленные” флаги
             self.state = "menu"
@@ -369,16 +1246,17 @@ class Game:
     # -------------------- Эффекты --------------------
 
     def add_particles_burst(self, cell: Vec, color: Tuple[int, int, int]):
+        if self.headless:
+            return
         x, y = cell
         cx = x * self.tile + self.tile / 2
         cy = y * self.tile + self.tile / 2
-        for _ in range(12):
-            ang = random.random() * math.tau
-            speed = 160 + 80 * random.random()
-            vx = math.cos(ang) * speed
-            vy = math.sin(ang) * speed
-            life = 0.35 + random.random() * 0.25
-            self.particles.append(Particle(cx, cy, vx, vy, life, color))
+        n = 12
+        ang = np.random.random(n) * math.tau
+        speed = 160 + 80 * np.random.random(n)
+        vel = np.column_stack((np.cos(ang) * speed, np.sin(ang) * speed))
+        life = 0.35 + np.random.random(n) * 0.25
+        self.particles.emit((cx, cy), vel, life, color)
 
     def apply_effect(self, kind: str):
         if kind == "food":
@@ -387,39 +1265,74 @@ class Game:
         elif kind == "gold":
             self.score += SCORES["gold"]
             self.snake.change_length(GROW_BY["gold"])
-        elif kind == "slow":
-            self.effects["slow"] = EFFECT_DUR["slow"]
-        elif kind == "ghost":
-            self.effects["ghost"] = EFFECT_DUR["ghost"]
+        elif kind in EFFECT_DUR:
+            self.start_effect(kind)
         elif kind == "shrink":
             self.snake.change_length(GROW_BY["shrink"])
-        elif kind == "reverse":
-            self.effects["reverse"] = EFFECT_DUR["reverse"]
 
         # Марафон — ускорять шаг
         if self.mode == "MARATHON":
             if self.score > 0 and self.score % MARATHON_ACCEL_EVERY == 0:
-                self.step_ms = max(self.min_step_ms, self.step_ms - 2)
+                step_ms = max(self.min_step_ms, self.step_ms - 2)
+                if step_ms != self.step_ms:
+                    self.step_ms = step_ms
+                    self.emit("step", step_ms=step_ms)
+
+    def start_effect(self, kind: str):
+        end = self.tick + secs_to_ticks(EFFECT_DUR[kind])
+        self.effects[kind] = end
+        self.schedule(end, "effect_end", kind)
+        self.emit("effect_start", kind=kind, until=end)
 
     # -------------------- Обновление/логика --------------------
 
-    def dir_from_key(self, key: int) -> Optional[Vec]:
+    def input_from_key(self, key: int) -> Optional[int]:
         mapping = {
-            pg.K_UP: (0, -1),
-            pg.K_w: (0, -1),
-            pg.K_DOWN: (0, 1),
-            pg.K_s: (0, 1),
-            pg.K_LEFT: (-1, 0),
-            pg.K_a: (-1, 0),
-            pg.K_RIGHT: (1, 0),
-            pg.K_d: (1, 0),
+            pg.K_UP: 0,
+            pg.K_w: 0,
+            pg.K_DOWN: 1,
+            pg.K_s: 1,
+            pg.K_LEFT: 2,
+            pg.K_a: 2,
+            pg.K_RIGHT: 3,
+            pg.K_d: 3,
         }
-        if key not in mapping:
-            return None
-        dx, dy = mapping[key]
-        if self.effects["reverse"] > 0:
+        return mapping.get(key)
+
+    def setup_pilot(self, start: Vec):
+        # еда при автопилоте кладётся только на его цикл, поэтому по
+        # неполному циклу (узкие проходы, тупики) поле не пройти — на такой
+        # карте автопилот выключается и играет человек
+        self.pilot = None
+        self.autopilot_off = None
+        if not self.autopilot:
+            return
+        # цикл кэшируется по раскладке стен — рестарт его не пересчитывает
+        from snake_solver import Autopilot, cycle_for
+        pilot = Autopilot(cycle_for(self.obstacles.grid, start))
+        if pilot.covers(self.obstacles):
+            self.pilot = pilot
+        else:
+            free = self.obstacles.grid.size - self.obstacles.count
+            self.autopilot_off = (f"Автопилот выключен: цикл проходит "
+                                  f"{pilot.cycle.n} из {free} свободных клеток")
+
+    def autopilot_input(self):
+        d = self.pilot.choose(self)
+        if d is None or d == self.snake.dir:
+            return
+        if self.effect_active("reverse"):
+            d = (-d[0], -d[1])  # apply_input развернёт обратно
+        self.apply_input(INPUT_DIRS.index(d))
+
+    def apply_input(self, code: int):
+        # ввод попадает в запись с номером текущего тика
+        if self.recorder:
+            self.recorder.add(self.tick, code)
+        dx, dy = INPUT_DIRS[code]
+        if self.effect_active("reverse"):
             dx, dy = -dx, -dy
-        return (dx, dy)
+        self.snake.set_dir((dx, dy))
 
     def handle_events(self) -> bool:
         # return False -> выход
@@ -438,9 +1351,7 @@ class Game:
                         return False
                 elif e.key == pg.K_f:
                     self.fullscreen = not self.fullscreen
-                    flags = pg.FULLSCREEN if self.fullscreen else pg.RESIZABLE
-                    self.screen = pg.display.set_mode(
-                        (self.width, self.height), flags)
+                    self.set_display_mode()
                 elif self.state == "menu":
                     if e.key in (pg.K_SPACE, pg.K_RETURN):
                         self.state = "playing"
@@ -457,6 +1368,9 @@ class Game:
                     elif e.key == pg.K_4:
                         self.mode = "MARATHON"
                         self.reset_level(full_reset=True)
+                    elif e.key == pg.K_a:
+                        self.autopilot = not self.autopilot
+                        self.reset_level(full_reset=True)
                     elif e.key == pg.K_TAB:
                         self.state = "settings"
                 elif self.state == "settings":
@@ -469,25 +1383,14 @@ class Game:
                     elif e.key == pg.K_UP:
                         gw, gh = self.grid_w, self.grid_h
                         self.grid_w, self.grid_h = gw + 2, gh + 2
-                        self.resize_window(
-                            self.width + 2 * self.tile, self.height + 2 * self.tile)
+                        self.resize_for_grid()
                     elif e.key == pg.K_DOWN:
                         if self.grid_w > 12 and self.grid_h > 12:
                             self.grid_w -= 2
                             self.grid_h -= 2
-                            self.resize_window(
-                                self.width - 2 * self.tile, self.height - 2 * self.tile)
+                            self.resize_for_grid()
                     elif e.key in (pg.K_RETURN, pg.K_SPACE):
-                        # применить
-                        self.data["settings"] = {
-                            "base_step_ms": self.base_step_ms,
-                            "min_step_ms": self.min_step_ms,
-                        }
-                        save_data(self.data)
-                        # пересоздать игру с новыми размерами
-                        self.__init__(self.grid_w, self.grid_h,
-                                      self.tile, self.mode)
-                        self.state = "menu"
+                        self.apply_settings()
                     elif e.key == pg.K_ESCAPE:
                         self.state = "menu"
                 elif self.state == "playing":
@@ -497,9 +1400,9 @@ class Game:
                         self.reset_level()
                         self.state = "playing"
                     else:
-                        d = self.dir_from_key(e.key)
-                        if d:
-                            self.snake.set_dir(d)
+                        code = self.input_from_key(e.key)
+                        if code is not None:
+                            self.apply_input(code)
                 elif self.state == "paused":
                     if e.key in (pg.K_p, pg.K_SPACE, pg.K_RETURN):
                         self.state = "playing"
@@ -514,77 +1417,204 @@ class Game:
                         self.state = "menu"
         return True
 
-    def update(self, dt_ms: float):
-        # обновление таймеров эффектов
-        for k in list(self.effects.keys()):
-            if self.effects[k] > 0:
-                self.effects[k] = max(0.0, self.effects[k] - dt_ms / 1000.0)
+    def current_step_ms(self) -> float:
+        slow_factor = 0.55 if self.effect_active("slow") else 1.0
+        return self.step_ms / slow_factor
 
-        slow_factor = 0.55 if self.effects["slow"] > 0 else 1.0
-        step_ms = self.step_ms / slow_factor
+    def sim_tick(self):
+        # один фиксированный тик симуляции длиной SIM_TICK_MS;
+        # всё игровое состояние меняется только здесь
+        self.tick += 1
         wrap = (self.mode == "WRAP")
 
-        if self.state == "playing" and self.snake.alive:
-            # тик движения
-            self.step_timer += dt_ms
-            if self.step_timer >= step_ms:
-                self.step_timer -= step_ms
-
-                # следующий шаг
-                new_head = self.snake.step(
-                    wrap=wrap,
-                    grid_w=self.grid_w,
-                    grid_h=self.grid_h,
-                    ignore_self=(self.effects["ghost"] > 0),
-                )
-
-                # столкновение с препятствиями
-                if new_head is None:
-                    pass  # уже умер
-                else:
-                    if self.obstacles.is_blocked(new_head):
+        # тик движения
+        self.step_timer += SIM_TICK_MS
+        step_ms = self.current_step_ms()
+        if self.step_timer >= step_ms:
+            self.step_timer -= step_ms
+            if self.pilot is not None:
+                self.autopilot_input()
+            self.prev_head = self.snake.head()
+
+            # следующий шаг
+            new_head = self.snake.step(
+                wrap=wrap,
+                grid_w=self.grid_w,
+                grid_h=self.grid_h,
+                ignore_self=self.effect_active("ghost"),
+            )
+
+            # столкновение с препятствиями
+            if new_head is None:
+                # уже умер: вылет за край или самоукус
+                hx, hy = self.snake.head()
+                dx, dy = self.snake.dir
+                inside = 0 <= hx + dx < self.grid_w and 0 <= hy + dy < self.grid_h
+                self.emit_death("self" if wrap or inside else "wall")
+            else:
+                if self.obstacles.is_blocked(new_head):
+                    self.snake.alive = False
+                    self.emit_death("obstacle")
+
+            if self.snake.alive and new_head is not None:
+                # предметы
+                it = self.items.get(new_head)
+                if it is not None:
+                    self.apply_effect(it.kind)
+                    self.emit("pickup", kind=it.kind, pos=it.pos,
+                              length=len(self.snake.body), score=self.score)
+                    self.add_particles_burst(
+                        it.pos, COLORS.get(it.kind, COLORS["food"]))
+                    self.remove_item(it)
+                    # всегда поддерживаем минимум 2 предмета на карте
+                    if self.item_counts["food"] < 1:
+                        self.spawn_item("food")
+                    if len(self.items) < 3 and self.rng.random() < 0.35:
+                        self.spawn_item(None)
+                    if not self.items:
+                        # класть еду некуда — поле пройдено
+                        self.cleared = True
                         self.snake.alive = False
+                        self.emit_death("cleared")
+
+        # истёкшие таймеры (gold, эффекты) — после шага: подбор важнее
+        self.run_timers()
 
-                if self.snake.alive and new_head is not None:
-                    # предметы
-                    for it in list(self.items):
-                        if it.pos == self.snake.head():
-                            self.apply_effect(it.kind)
-                            self.add_particles_burst(
-                                it.pos, COLORS.get(it.kind, COLORS["food"]))
-                            self.items.remove(it)
-                            # всегда поддерживаем минимум 2 предмета на карте
-                            if sum(1 for i in self.items if i.kind == "food") < 1:
-                                self.spawn_item("food")
-                            if len(self.items) < 3 and random.random() < 0.35:
-                                self.spawn_item(None)
-
-            # TTL у временных предметов (gold)
-            for it in list(self.items):
-                if it.ttl is not None:
-                    it.ttl -= dt_ms / 1000.0
-                    if it.ttl <= 0:
-                        self.items.remove(it)
-
-        # Частицы
-        for p in list(self.particles):
-            p.update(dt_ms / 1000.0)
-            if p.life <= 0:
-                self.particles.remove(p)
+    def emit_death(self, cause: str):
+        self.emit("death", cause=cause, score=self.score,
+                  length=len(self.snake.body))
+
+    def update(self, dt_ms: float):
+        # фиксированный шаг: прогоняем столько тиков, сколько «накопилось»,
+        # но не больше MAX_TICKS_PER_FRAME — остаток после долгого фриза отбрасываем
+        if self.state == "playing" and self.snake.alive:
+            self.accum_ms += dt_ms
+            ticks = 0
+            while self.accum_ms >= SIM_TICK_MS and ticks < MAX_TICKS_PER_FRAME:
+                self.sim_tick()
+                self.accum_ms -= SIM_TICK_MS
+                ticks += 1
+                if not self.snake.alive:
+                    self.accum_ms = 0.0
+                    break
+            if ticks == MAX_TICKS_PER_FRAME:
+                self.accum_ms = min(self.accum_ms, SIM_TICK_MS)
+
+        # Частицы — чисто визуальные, живут в реальном времени
+        self.particles.update(dt_ms / 1000.0)
 
         # конец игры?
         if self.state == "playing" and not self.snake.alive:
             self.record_best()
             self.state = "gameover"
 
+    def interp_alpha(self) -> float:
+        # доля пройденного пути между клетками для плавной отрисовки головы
+        if self.state != "playing" or self.prev_head is None:
+            return 1.0
+        return clamp((self.step_timer + self.accum_ms) / self.current_step_ms(), 0.0, 1.0)
+
     # -------------------- Отрисовка --------------------
 
-    def draw_grid(self):
+    def draw_grid(self, surf: pg.Surface):
         col = COLORS["grid"]
-        for x in range(0, self.width, self.tile):
-            pg.draw.line(self.screen, col, (x, 0), (x, self.height), 1)
-        for y in range(0, self.height, self.tile):
-            pg.draw.line(self.screen, col, (0, y), (self.width, y), 1)
+        w, h = surf.get_size()
+        for x in range(0, w, self.tile):
+            pg.draw.line(surf, col, (x, 0), (x, h), 1)
+        for y in range(0, h, self.tile):
+            pg.draw.line(surf, col, (0, y), (w, y), 1)
+
+    def static_region(self) -> Tuple[int, int, int, int]:
+        # клетки статического слоя: вся сетка или окно камеры (с неполной
+        # клеткой у правого/нижнего края) и STATIC_MARGIN клеток вокруг
+        cam = self.camera
+        if cam is None:
+            return 0, 0, self.grid_w, self.grid_h
+        m = STATIC_MARGIN
+        return (max(0, cam.x - m), max(0, cam.y - m),
+                cam.x + cam.view_w + 1 + m, cam.y + cam.view_h + 1 + m)
+
+    def build_static_layer(self, region) -> pg.Surface:
+        # фон, сетка и препятствия не меняются между кадрами —
+        # рисуем их один раз и потом просто блитим. Фон с сеткой
+        # одинаков для любого участка (камера сдвигается на целые клетки),
+        # поэтому собирается один раз, а на участок докладываются только стены
+        x0, y0, x1, y1 = region
+        size = ((x1 - x0) * self.tile, (y1 - y0) * self.tile)
+        if self.grid_layer is None:
+            if self.camera is None:
+                grid_size = size
+            else:
+                span = 1 + 2 * STATIC_MARGIN
+                grid_size = ((self.camera.view_w + span) * self.tile,
+                             (self.camera.view_h + span) * self.tile)
+            self.grid_layer = pg.Surface(grid_size).convert()
+            self.grid_layer.fill(COLORS["bg"])
+            self.draw_grid(self.grid_layer)
+        surf = self.static_layer
+        if surf is None or surf.get_size() != size:
+            surf = pg.Surface(size).convert()
+        surf.blit(self.grid_layer, (0, 0))
+        if self.mode == "OBSTACLES":
+            self.obstacles.draw_region(surf, self.tile, x0, y0, x1, y1)
+        return surf
+
+    def draw_static(self):
+        # с камерой слой шире окна на STATIC_MARGIN клеток с каждой стороны
+        # и пересобирается, только когда окно выходит за его край
+        region = self.static_key
+        cam = self.camera
+        if region is not None and cam is not None:
+            x0, y0, x1, y1 = region
+            if not (x0 <= cam.x and cam.x + cam.view_w + 1 <= x1
+                    and y0 <= cam.y and cam.y + cam.view_h + 1 <= y1):
+                region = None
+        if self.static_layer is None or region is None:
+            region = self.static_region()
+            self.static_layer = self.build_static_layer(region)
+            self.static_key = region
+        ox, oy = self.view_origin()
+        self.screen.blit(self.static_layer, (0, 0),
+                         (ox - region[0] * self.tile, oy - region[1] * self.tile,
+                          self.width, self.height))
+
+    def view_origin(self) -> Tuple[int, int]:
+        # сдвиг мира относительно экрана (px)
+        if self.camera is None:
+            return 0, 0
+        return self.camera.x * self.tile, self.camera.y * self.tile
+
+    def cell_rect(self, cell: Vec) -> pg.Rect:
+        ox, oy = self.view_origin()
+        return pg.Rect(cell[0] * self.tile - ox, cell[1] * self.tile - oy,
+                       self.tile, self.tile)
+
+    def draw_minimap(self):
+        cam = self.camera
+        scale = MINIMAP_SIZE / max(self.grid_w, self.grid_h)
+        mw, mh = max(1, int(self.grid_w * scale)), max(1, int(self.grid_h * scale))
+        if self.minimap_layer is None:
+            # уменьшенная карта стен — строится раз на уровень
+            surf = pg.Surface((mw, mh)).convert()
+            surf.fill(COLORS["bg"])
+            if self.mode == "OBSTACLES":
+                self.obstacles.draw_minimap(surf, scale)
+            pg.draw.rect(surf, COLORS["grid"], surf.get_rect(), 1)
+            self.minimap_layer = surf
+        x0, y0 = self.width - mw - 10, 10
+        self.screen.blit(self.minimap_layer, (x0, y0))
+        view = pg.Rect(x0 + int(cam.x * scale), y0 + int(cam.y * scale),
+                       max(2, int(cam.view_w * scale)), max(2, int(cam.view_h * scale)))
+        pg.draw.rect(self.screen, COLORS["text"], view, 1)
+        for it in self.items.values():
+            self.screen.set_at((x0 + int(it.pos[0] * scale), y0 + int(it.pos[1] * scale)),
+                               COLORS.get(it.kind, COLORS["food"]))
+        hx, hy = self.snake.head()
+        pg.draw.circle(self.screen, COLORS["snake_head"],
+                       (x0 + int(hx * scale), y0 + int(hy * scale)), 2)
+
+    def text(self, font: pg.font.Font, text: str, color) -> pg.Surface:
+        return self.text_cache.render(font, text, color)
 
     def draw_snake(self):
         body = self.snake.body
@@ -593,38 +1623,64 @@ class Game:
 
         # рисуем голову чуть светлее
         head_col = COLORS["snake_head"]
-        if self.effects["ghost"] > 0:
+        if self.effect_active("ghost"):
             head_col = (COLORS["ghost"][0], COLORS["ghost"]
                         [1], COLORS["ghost"][2])
 
-        pg.draw.rect(self.screen, head_col, grid_to_px(body[0], self.tile))
-        # глаза
+        # тело — лёгкий градиент
+        n = len(body)
+        for i, cell in self.visible_segments():
+            t = i / max(1, n - 1)
+            r = int(COLORS["snake"][0] * (1 - 0.4 * t))
+            g = int(COLORS["snake"][1] * (1 - 0.4 * t))
+            b = int(COLORS["snake"][2] * (1 - 0.4 * t))
+            pg.draw.rect(self.screen, (r, g, b), self.cell_rect(cell))
+
+        # голова — интерполяция между прошлой и текущей клеткой
         hx, hy = body[0]
+        prev = self.prev_head
+        if prev is not None and abs(hx - prev[0]) + abs(hy - prev[1]) == 1:
+            alpha = self.interp_alpha()
+            hx = prev[0] + (hx - prev[0]) * alpha
+            hy = prev[1] + (hy - prev[1]) * alpha
+        ox, oy = self.view_origin()
+        pg.draw.rect(self.screen, head_col, pg.Rect(
+            round(hx * self.tile) - ox, round(hy * self.tile) - oy, self.tile, self.tile))
+        # глаза
         dx, dy = self.snake.dir
         eye_offset = 0.25
-        ex = (hx + 0.5 + 0.25 * dx) * self.tile
-        ey = (hy + 0.5 + 0.25 * dy) * self.tile
+        ex = (hx + 0.5 + 0.25 * dx) * self.tile - ox
+        ey = (hy + 0.5 + 0.25 * dy) * self.tile - oy
         r = max(2, self.tile // 8)
         pg.draw.circle(self.screen, (12, 12, 12), (int(
             ex - eye_offset * self.tile), int(ey - eye_offset * self.tile)), r)
         pg.draw.circle(self.screen, (12, 12, 12), (int(
             ex + eye_offset * self.tile), int(ey + eye_offset * self.tile)), r)
 
-        # тело — лёгкий градиент
-        n = len(body)
-        for i, cell in enumerate(body[1:], start=1):
-            t = i / max(1, n - 1)
-            r = int(COLORS["snake"][0] * (1 - 0.4 * t))
-            g = int(COLORS["snake"][1] * (1 - 0.4 * t))
-            b = int(COLORS["snake"][2] * (1 - 0.4 * t))
-            pg.draw.rect(self.screen, (r, g, b), grid_to_px(cell, self.tile))
+    def visible_segments(self):
+        # (индекс, клетка) сегментов тела без головы, попадающих в кадр
+        body = self.snake.body
+        cam = self.camera
+        if cam is None:
+            return enumerate(islice(body, 1, None), start=1)
+        if len(body) <= cam.view_w * cam.view_h:
+            return ((i, c) for i, c in enumerate(islice(body, 1, None), start=1)
+                    if cam.visible(c))
+        # длинная змейка: обходим видимые клетки и смотрим в индекс тела
+        x0, y0, x1, y1 = cam.bounds()
+        index = self.snake.segment_index
+        return ((i, (x, y)) for y in range(y0, y1) for x in range(x0, x1)
+                for i in (index((x, y)),) if i)
 
     def draw_items(self):
-        for it in self.items:
-            rect = grid_to_px(it.pos, self.tile)
+        cam = self.camera
+        for it in self.items.values():
+            if cam is not None and not cam.visible(it.pos):
+                continue
+            rect = self.cell_rect(it.pos)
             col = COLORS.get(it.kind, COLORS["food"])
             # пульсация золота по ttl
-            if it.kind == "gold" and it.ttl is not None:
+            if it.kind == "gold" and it.expires is not None:
                 pulse = 0.5 + 0.5 * math.sin(pg.time.get_ticks() / 120.0)
                 col = (
                     clamp(int(col[0] * (0.9 + 0.3 * pulse)), 0, 255),
@@ -636,51 +1692,59 @@ class Game:
     def draw_hud(self):
         best = self.current_best()
         speed = int(1000 / self.step_ms)
-        slow_icon = "⏳" if self.effects["slow"] > 0 else ""
-        ghost_icon = "👻" if self.effects["ghost"] > 0 else ""
-        rev_icon = "🔁" if self.effects["reverse"] > 0 else ""
-        mode_txt = f"[{self.mode}]"
+        slow_icon = "⏳" if self.effect_active("slow") else ""
+        ghost_icon = "👻" if self.effect_active("ghost") else ""
+        rev_icon = "🔁" if self.effect_active("reverse") else ""
+        auto_txt = (" [AUTO]" if self.pilot is not None
+                    else " [AUTO OFF]" if self.autopilot else "")
+        mode_txt = f"[{self.mode}]{auto_txt}"
 
         text = f"Score: {self.score}   Best: {best}   Step/s: {speed}  {mode_txt} {slow_icon}{ghost_icon}{rev_icon}"
-        img = self.font.render(text, True, COLORS["text"])
+        img = self.text(self.font, text, COLORS["text"])
         self.screen.blit(img, (10, 8))
 
         # Текст помощи
         help_txt = "P — пауза, R — рестарт, Esc — меню, F — фулл-скрин"
-        img2 = self.font_small.render(help_txt, True, (200, 200, 210))
+        img2 = self.text(self.font_small, help_txt, (200, 200, 210))
         self.screen.blit(img2, (10, self.height - 24))
 
     def draw_menu(self):
         title = "ADVANCED SNAKE"
-        sub = "Space/Enter — старт • 1–4 — выбор режима • Tab — Настройки"
+        sub = "Space/Enter — старт • 1–4 — выбор режима • A — автопилот • Tab — Настройки"
         desc_lines = [f"1) CLASSIC — {MODES['CLASSIC']}",
                       f"2) WRAP — {MODES['WRAP']}",
                       f"3) OBSTACLES — {MODES['OBSTACLES']}",
                       f"4) MARATHON — {MODES['MARATHON']}"]
 
-        t_img = self.font_big.render(title, True, COLORS["text"])
+        t_img = self.text(self.font_big, title, COLORS["text"])
         t_rect = t_img.get_rect(
             center=(self.width // 2, self.height // 2 - 120))
         self.screen.blit(t_img, t_rect)
 
-        s_img = self.font.render(sub, True, (205, 205, 215))
+        s_img = self.text(self.font, sub, (205, 205, 215))
         s_rect = s_img.get_rect(
             center=(self.width // 2, self.height // 2 - 75))
         self.screen.blit(s_img, s_rect)
 
         for i, line in enumerate(desc_lines):
-            img = self.font_mid.render(line, True, COLORS["text"] if str(
+            img = self.text(self.font_mid, line, COLORS["text"] if str(
                 i + 1) in "1234" else (200, 200, 210))
             rect = img.get_rect(
                 center=(self.width // 2, self.height // 2 - 10 + i * 36))
             self.screen.blit(img, rect)
 
-        best_info = f"Best: CLASSIC {self.highscores.get('CLASSIC', 0)} • WRAP {self.highscores.get('WRAP', 0)} • OBST {self.highscores.get('OBSTACLES', 0)} • MARA {self.highscores.get('MARATHON', 0)}"
-        b_img = self.font_small.render(best_info, True, (190, 190, 200))
+        best_info = f"Best {self.grid_key()}: CLASSIC {self.current_best('CLASSIC')} • WRAP {self.current_best('WRAP')} • OBST {self.current_best('OBSTACLES')} • MARA {self.current_best('MARATHON')}"
+        b_img = self.text(self.font_small, best_info, (190, 190, 200))
         b_rect = b_img.get_rect(
             center=(self.width // 2, self.height // 2 + 160))
         self.screen.blit(b_img, b_rect)
 
+        if self.autopilot_off:
+            a_img = self.text(self.font_small, self.autopilot_off, COLORS["food"])
+            a_rect = a_img.get_rect(
+                center=(self.width // 2, self.height // 2 + 188))
+            self.screen.blit(a_img, a_rect)
+
     def draw_settings(self):
         title = "Настройки"
         lines = [
@@ -688,37 +1752,39 @@ class Game:
             f"↑/↓ размер сетки: {self.grid_w}x{self.grid_h}",
             "Enter/Space — применить и перезапустить • Esc — назад",
         ]
-        t_img = self.font_big.render(title, True, COLORS["text"])
+        t_img = self.text(self.font_big, title, COLORS["text"])
         t_rect = t_img.get_rect(
             center=(self.width // 2, self.height // 2 - 100))
         self.screen.blit(t_img, t_rect)
         for i, ln in enumerate(lines):
-            img = self.font_mid.render(ln, True, (210, 210, 220))
+            img = self.text(self.font_mid, ln, (210, 210, 220))
             rect = img.get_rect(
                 center=(self.width // 2, self.height // 2 - 20 + i * 36))
             self.screen.blit(img, rect)
 
     def draw_overlay(self, title: str, subtitle: str):
-        overlay = pg.Surface((self.width, self.height), pg.SRCALPHA)
-        overlay.fill((0, 0, 0, 140))
-        self.screen.blit(overlay, (0, 0))
-        t = self.font_big.render(title, True, COLORS["text"])
-        ts = self.font_mid.render(subtitle, True, (210, 210, 220))
+        if self.overlay_layer is None or self.overlay_layer.get_size() != (self.width, self.height):
+            self.overlay_layer = pg.Surface(
+                (self.width, self.height), pg.SRCALPHA)
+            self.overlay_layer.fill((0, 0, 0, 140))
+        self.screen.blit(self.overlay_layer, (0, 0))
+        t = self.text(self.font_big, title, COLORS["text"])
+        ts = self.text(self.font_mid, subtitle, (210, 210, 220))
         self.screen.blit(t, t.get_rect(
             center=(self.width // 2, self.height // 2 - 12)))
         self.screen.blit(ts, ts.get_rect(
             center=(self.width // 2, self.height // 2 + 34)))
 
     def draw(self):
-        self.screen.fill(COLORS["bg"])
-        self.draw_grid()
-        if self.mode == "OBSTACLES":
-            self.obstacles.draw(self.screen, self.tile)
+        if self.camera is not None:
+            self.camera.follow(self.snake.head())
+        self.draw_static()
         if self.state in ("playing", "paused", "gameover"):
             self.draw_items()
             self.draw_snake()
-            for p in self.particles:
-                p.draw(self.screen)
+            self.particles.draw(self.screen, self.sprites, self.view_origin())
+            if self.camera is not None:
+                self.draw_minimap()
             self.draw_hud()
         if self.state == "menu":
             self.draw_menu()
@@ -729,7 +1795,7 @@ class Game:
                 "PAUSE", "P/Space — продолжить • R — рестарт • Esc — меню")
         elif self.state == "gameover":
             self.draw_overlay(
-                "GAME OVER", f"Score: {self.score}   Best: {self.current_best()}   (R — рестарт, Space — меню)")
+                "BOARD CLEARED" if self.cleared else "GAME OVER", f"Score: {self.score}   Best: {self.current_best()}   (R — рестарт, Space — меню)")
 
         pg.display.flip()
 
@@ -740,22 +1806,60 @@ class Game:
         self.state = "menu"
         running = True
         while running:
-            dt = self.clock.tick(BASE_FPS)
+            dt = self.clock.tick(self.fps)
             running = self.handle_events()
             self.update(dt)
             self.draw()
 
 
 def main():
-    # Можно передать размеры сетки в аргументах: python advanced_snake.py 28 28
+    # Можно передать размеры сетки в аргументах: python snake02.py 28 28
+    # --uncapped — рисовать без ограничения FPS, --vsync — по кадрам монитора
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    flags = {a for a in sys.argv[1:] if a.startswith("--")}
+    # --selftest — проверка записи DataStore (сбой диска, не-JSON, повтор)
+    if "--selftest" in flags:
+        sys.exit(0 if store_selftest() else 1)
     gw, gh = INIT_GRID
-    if len(sys.argv) >= 3:
+    if len(args) >= 2:
         try:
-            gw, gh = int(sys.argv[1]), int(sys.argv[2])
+            gw, gh = int(args[0]), int(args[1])
         except Exception:
             pass
-    game = Game(gw, gh, INIT_TILE, INIT_MODE)
+    # --lite — лёгкий классический режим на 12 кадрах/с (см. snike_g_gpt.py)
+    if "--lite" in flags:
+        from snike_g_gpt import main as run_lite
+        run_lite()
+        return
+    # --connect=HOST:PORT — тонкий клиент сетевой арены (см. snake_net.py)
+    connect = next((a.split("=", 1)[1] for a in flags
+                    if a.startswith("--connect=")), None)
+    if connect:
+        from snake_net import run_client
+        host, _, port = connect.rpartition(":")
+        run_client(host or "127.0.0.1", int(port))
+        return
+    # --record=FILE — дописывать партии в файл повторов (см. snake_replay.py)
+    record = next((a.split("=", 1)[1] for a in flags
+                   if a.startswith("--record=")), None)
+    fps = 0 if ("--uncapped" in flags or "--vsync" in flags) else BASE_FPS
+    # --telemetry=FILE — события партий в gzip NDJSON (см. snake_telemetry.py)
+    telemetry_path = next((a.split("=", 1)[1] for a in flags
+                           if a.startswith("--telemetry=")), None)
+    telemetry = None
+    if telemetry_path:
+        from snake_telemetry import Telemetry
+        telemetry = Telemetry(telemetry_path)
+    # --autopilot — демо: играет решатель (см. snake_solver.py)
+    game = Game(gw, gh, INIT_TILE, INIT_MODE,
+                fps=fps, vsync="--vsync" in flags,
+                record_path=Path(record) if record else None,
+                autopilot="--autopilot" in flags, telemetry=telemetry)
     game.run()
+    game.store.close()
+    if telemetry is not None:
+        game.emit_quit()
+        telemetry.close()
     pg.quit()
 
 
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Арена: много змеек на одном поле — игроки и боты.
+#   python snake_arena.py --bots 40                 — окно, игрок на стрелках
+#   python snake_arena.py --players 2 --bots 20     — второй игрок на WASD
+#   python snake_arena.py --headless --bots 300 --grid 200 --ticks 2000
+#                                                   — замер времени тика
+
+import argparse
+import colorsys
+import random
+import statistics
+import time
+from array import array
+from collections import deque
+from typing import List, Optional
+
+import pygame as pg
+
+from snake02 import (BASE_STEP_MS, COLORS, INPUT_DIRS, ObstacleField,
+                     clamp, get_font)
+
+# Значения общей сетки занятости: 0 — пусто, >0 — id змейки (+1)
+EMPTY = 0
+WALL = -1
+FOOD = -2
+
+RESPAWN_TICKS = 20        # через сколько шагов бот возрождается
+FOOD_PER_SNAKE = 0.5      # еды на поле на одну змейку
+TURNS = {(1, 0): ((0, -1), (0, 1)), (-1, 0): ((0, 1), (0, -1)),
+         (0, 1): ((1, 0), (-1, 0)), (0, -1): ((-1, 0), (1, 0))}
+
+
+class ArenaSnake:
+    __slots__ = ("sid", "body", "dir", "grow", "alive", "score", "bot",
+                 "target", "dead_for", "next_head")
+
+    def __init__(self, sid: int, bot: bool):
+        self.sid = sid            # значение в сетке занятости
+        self.body = deque()       # плоские индексы клеток, голова слева
+        self.dir = (1, 0)
+        self.grow = 0
+        self.alive = False
+        self.score = 0
+        self.bot = bot
+        self.target = -1          # клетка с едой, к которой едет бот
+        self.dead_for = 0
+        self.next_head = -1
+
+
+class Arena:
+    """Поле с общей сеткой занятости: одна запись на клетку для всех змеек.
+
+    Столкновения проверяются чтением одной клетки сетки (O(1) на змейку),
+    а не обходом чужих тел. Тик — один проход: хвосты, головы, разбор.
+    """
+
+    def __init__(self, grid_w: int, grid_h: int, bots: int, players: int = 0,
+                 wrap: bool = False, obstacles: Optional[str] = None,
+                 seed: Optional[int] = None):
+        self.w, self.h = grid_w, grid_h
+        self.wrap = wrap
+        self.rng = random.Random(seed)
+        self.grid = array("i", [EMPTY]) * (grid_w * grid_h)
+        if obstacles:
+            field = ObstacleField(grid_w, grid_h)
+            field.generate(obstacles, self.rng)
+            for i in field.grid.ravel().nonzero()[0].tolist():
+                self.grid[i] = WALL
+        self.snakes: List[ArenaSnake] = []
+        for k in range(players + bots):
+            self.snakes.append(ArenaSnake(k + 1, bot=k >= players))
+        # клетки с едой; съеденные остаются в списке «протухшими» и
+        # выкидываются при выборе цели (swap-remove) или при уплотнении
+        self.food: List[int] = []
+        self.food_count = 0
+        self.food_target = max(1, int(len(self.snakes) * FOOD_PER_SNAKE))
+        self.tick = 0
+        self.tick_times = deque(maxlen=600)   # мс на обработку тика
+        # журнал изменений за тик (для сетевых дельт); None — не ведём
+        self.journal: Optional[list] = None
+        self.free_slots: List[ArenaSnake] = []
+        for sn in self.snakes:
+            self.spawn_snake(sn)
+        self.refill_food()
+
+    # ---------- вспомогательное ----------
+
+    def random_empty(self) -> int:
+        grid, n = self.grid, self.w * self.h
+        for _ in range(1000):
+            i = self.rng.randrange(n)
+            if grid[i] == EMPTY:
+                return i
+        return -1
+
+    def log(self, *event):
+        if self.journal is not None:
+            self.journal.append(event)
+
+    def add_snake(self, bot: bool = False) -> ArenaSnake:
+        # новый участник (например, сетевой игрок); слоты ушедших переиспользуем
+        if self.free_slots:
+            sn = self.free_slots.pop()
+            sn.bot, sn.score = bot, 0
+        else:
+            sn = ArenaSnake(len(self.snakes) + 1, bot)
+            self.snakes.append(sn)
+            self.food_target = max(1, int(len(self.snakes) * FOOD_PER_SNAKE))
+        self.spawn_snake(sn)
+        return sn
+
+    def remove_snake(self, sn: ArenaSnake):
+        if sn.alive:
+            self.kill(sn)
+        sn.bot = False          # не-бот без игрока сам не возрождается
+        self.free_slots.append(sn)
+
+    def spawn_snake(self, sn: ArenaSnake):
+        i = self.random_empty()
+        if i < 0:
+            return
+        sn.body.clear()
+        sn.body.append(i)
+        self.grid[i] = sn.sid
+        self.log("S", sn.sid, i)
+        sn.dir = self.rng.choice(INPUT_DIRS)
+        sn.grow = 2
+        sn.alive = True
+        sn.dead_for = 0
+        sn.target = -1
+
+    def kill(self, sn: ArenaSnake):
+        # тело освобождаем, каждая третья клетка становится едой
+        grid = self.grid
+        self.log("K", sn.sid)
+        for n, i in enumerate(sn.body):
+            if n % 3 == 2:
+                self.place_food(i)
+            else:
+                grid[i] = EMPTY
+        sn.body.clear()
+        sn.alive = False
+        sn.dead_for = 0
+
+    def place_food(self, i: int):
+        self.grid[i] = FOOD
+        self.food.append(i)
+        self.food_count += 1
+        self.log("F", i)
+
+    def refill_food(self):
+        while self.food_count < self.food_target:
+            i = self.random_empty()
+            if i < 0:
+                return
+            self.place_food(i)
+        if len(self.food) > 2 * self.food_count + 64:
+            self.food = [i for i in self.food if self.grid[i] == FOOD]
+
+    def random_food(self) -> int:
+        food, grid = self.food, self.grid
+        while food:
+            k = self.rng.randrange(len(food))
+            i = food[k]
+            if grid[i] == FOOD:
+                return i
+            food[k] = food[-1]
+            food.pop()
+        return -1
+
+    def neighbour(self, i: int, d) -> int:
+        # плоский индекс соседа или -1 за стеной поля
+        x, y = i % self.w + d[0], i // self.w + d[1]
+        if self.wrap:
+            x %= self.w
+            y %= self.h
+        elif not (0 <= x < self.w and 0 <= y < self.h):
+            return -1
+        return y * self.w + x
+
+    def steer_bot(self, sn: ArenaSnake):
+        # O(1): цель — одна клетка с едой; из трёх направлений берём
+        # свободные и среди них ближайшее к цели
+        grid = self.grid
+        if sn.target < 0 or grid[sn.target] != FOOD:
+            sn.target = self.random_food()
+        head = sn.body[0]
+        hx, hy = head % self.w, head // self.w
+        tx, ty = (sn.target % self.w, sn.target // self.w) if sn.target >= 0 else (hx, hy)
+        best, best_d = None, None
+        for d in (sn.dir, *TURNS[sn.dir]):
+            j = self.neighbour(head, d)
+            if j < 0 or grid[j] > 0 or grid[j] == WALL:
+                continue
+            dist = abs(hx + d[0] - tx) + abs(hy + d[1] - ty)
+            if best is None or dist < best_d:
+                best, best_d = d, dist
+        if best is not None:
+            sn.dir = best
+
+    def set_input(self, player: int, code: int):
+        sn = self.snakes[player]
+        if not sn.alive:
+            return
+        d = INPUT_DIRS[code]
+        if len(sn.body) > 1 and d[0] == -sn.dir[0] and d[1] == -sn.dir[1]:
+            return
+        sn.dir = d
+
+    # ---------- тик ----------
+
+    def step(self):
+        t0 = time.perf_counter()
+        self.tick += 1
+        grid = self.grid
+        alive = [sn for sn in self.snakes if sn.alive]
+
+        # 1) куда идут головы
+        for sn in alive:
+            if sn.bot:
+                self.steer_bot(sn)
+            sn.next_head = self.neighbour(sn.body[0], sn.dir)
+
+        # 2) хвосты уходят до проверки голов — в освободившуюся клетку можно въехать
+        for sn in alive:
+            if sn.grow > 0:
+                sn.grow -= 1
+            else:
+                grid[sn.body.pop()] = EMPTY
+                self.log("T", sn.sid)
+
+        # 3) голова в голову: сколько голов метит в каждую клетку
+        heads = {}
+        for sn in alive:
+            if sn.next_head >= 0:
+                heads[sn.next_head] = heads.get(sn.next_head, 0) + 1
+
+        # 4) разбор: стена, тело (своё или чужое), лобовое столкновение
+        dead = []
+        for sn in alive:
+            j = sn.next_head
+            if j < 0 or grid[j] > 0 or grid[j] == WALL or heads[j] > 1:
+                dead.append(sn)
+                continue
+            if grid[j] == FOOD:
+                self.food_count -= 1
+                sn.grow += 1
+                sn.score += 1
+                self.log("E", j)
+            sn.body.appendleft(j)
+            grid[j] = sn.sid
+            self.log("H", sn.sid, j)
+        for sn in dead:
+            self.kill(sn)
+
+        # 5) возрождение ботов и еда
+        for sn in self.snakes:
+            if not sn.alive and sn.bot:
+                sn.dead_for += 1
+                if sn.dead_for >= RESPAWN_TICKS:
+                    self.spawn_snake(sn)
+        self.refill_food()
+        self.tick_times.append((time.perf_counter() - t0) * 1000.0)
+
+    def stats(self) -> dict:
+        t = sorted(self.tick_times) or [0.0]
+        return {
+            "ticks": self.tick,
+            "alive": sum(1 for sn in self.snakes if sn.alive),
+            "cells": sum(len(sn.body) for sn in self.snakes),
+            "mean_ms": statistics.fmean(t),
+            "p99_ms": t[min(len(t) - 1, int(0.99 * len(t)))],
+        }
+
+
+# ============================== Окно ==============================
+
+PLAYER_KEYS = [
+    {pg.K_UP: 0, pg.K_DOWN: 1, pg.K_LEFT: 2, pg.K_RIGHT: 3},
+    {pg.K_w: 0, pg.K_s: 1, pg.K_a: 2, pg.K_d: 3},
+]
+
+
+def snake_color(k: int):
+    r, g, b = colorsys.hsv_to_rgb((k * 0.618034) % 1.0, 0.55, 0.95)
+    return int(r * 255), int(g * 255), int(b * 255)
+
+
+def run_window(arena: Arena, players: int, tile: int, step_ms: int):
+    pg.display.init()
+    pg.font.init()
+    pg.display.set_caption("Snake Arena — Pygame")
+    screen = pg.display.set_mode((arena.w * tile, arena.h * tile))
+    clock = pg.time.Clock()
+    font = get_font(18)
+    colors = [snake_color(k) for k in range(len(arena.snakes))]
+    accum = 0.0
+    while True:
+        dt = clock.tick(60)
+        for e in pg.event.get():
+            if e.type == pg.QUIT or (e.type == pg.KEYDOWN and e.key == pg.K_ESCAPE):
+                return
+            if e.type == pg.KEYDOWN:
+                for p in range(players):
+                    code = PLAYER_KEYS[p].get(e.key)
+                    if code is not None:
+                        arena.set_input(p, code)
+                    elif e.key == pg.K_r and not arena.snakes[p].alive:
+                        arena.spawn_snake(arena.snakes[p])
+        accum += dt
+        while accum >= step_ms:
+            arena.step()
+            accum -= step_ms
+
+        screen.fill(COLORS["bg"])
+        w = arena.w
+        for i, v in enumerate(arena.grid):
+            if v == EMPTY:
+                continue
+            rect = ((i % w) * tile, (i // w) * tile, tile, tile)
+            if v == WALL:
+                pg.draw.rect(screen, COLORS["obstacle"], rect)
+            elif v == FOOD:
+                pg.draw.rect(screen, COLORS["food"], rect)
+            else:
+                pg.draw.rect(screen, colors[v - 1], rect)
+        st = arena.stats()
+        scores = "  ".join(f"P{p + 1}: {arena.snakes[p].score}" for p in range(players))
+        hud = (f"{scores}  alive {st['alive']}/{len(arena.snakes)}  "
+               f"tick {st['mean_ms']:.2f} ms (p99 {st['p99_ms']:.2f})")
+        screen.blit(font.render(hud, True, COLORS["text"]), (10, 8))
+        pg.display.flip()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Snake arena")
+    ap.add_argument("--grid", type=int, default=60)
+    ap.add_argument("--tile", type=int, default=12)
+    ap.add_argument("--bots", type=int, default=20)
+    ap.add_argument("--players", type=int, default=1, choices=(0, 1, 2))
+    ap.add_argument("--wrap", action="store_true")
+    ap.add_argument("--obstacles", choices=ObstacleField.KINDS)
+    ap.add_argument("--seed", type=int)
+    ap.add_argument("--step-ms", type=int, default=BASE_STEP_MS)
+    ap.add_argument("--headless", action="store_true")
+    ap.add_argument("--ticks", type=int, default=1000)
+    args = ap.parse_args()
+
+    players = 0 if args.headless else args.players
+    arena = Arena(args.grid, args.grid, args.bots, players,
+                  wrap=args.wrap, obstacles=args.obstacles, seed=args.seed)
+    if args.headless:
+        for _ in range(args.ticks):
+            arena.step()
+        st = arena.stats()
+        print(f"{args.bots} bots on {args.grid}x{args.grid}: {st['ticks']} ticks, "
+              f"alive {st['alive']}, body cells {st['cells']}, "
+              f"tick mean {st['mean_ms']:.3f} ms, p99 {st['p99_ms']:.3f} ms "
+              f"(budget {args.step_ms} ms)")
+        return
+    tile = clamp(args.tile, 4, 40)
+    run_window(arena, players, tile, args.step_ms)
+    pg.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Набор бенчмарков змейки, без окна (SDL dummy driver).
+#   python snake_bench.py                          — все сценарии
+#   python snake_bench.py -s marathon_long -s grid_200
+#   python snake_bench.py --quick --json out.json  — короткие прогоны, результат в JSON
+#   python snake_bench.py --save-baseline bench_baseline.json
+#   python snake_bench.py --baseline bench_baseline.json [--threshold 0.2]
+#       — сравнить с сохранённой базой, код выхода 1 при регрессии
+#         (или если холодный старт дольше COLD_START_TARGET_MS); база должна
+#         быть снята в том же режиме (--quick или полном), иначе код выхода 2
+#
+# Метрики: ticks_per_s и tick_p50/p99_ms — чистая симуляция (sim_tick),
+# frame_p50/p99_ms — кадр (update + draw), alloc_bytes_per_tick — пик
+# временной памяти за тик (tracemalloc), blocks_per_tick — прирост числа
+# живых блоков за тик (признак утечки).
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import deque
+from typing import Optional
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np  # noqa: E402
+import pygame as pg  # noqa: E402
+
+import snake02  # noqa: E402
+from snake02 import (COLORS, INPUT_DIRS, SIM_TICK_MS, DataStore,  # noqa: E402
+                     Game, ObstacleField)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    idx = min(len(values) - 1, int(round(q * (len(values) - 1))))
+    return values[idx]
+
+
+# -------------------- управление змейкой --------------------
+
+def cycle_dir(x: int, y: int, w: int, h: int):
+    # гамильтонов цикл «змейкой» для чётной высоты: столбец 0 — обратный путь
+    if x == 0:
+        return (0, -1) if y > 0 else (1, 0)
+    if y % 2 == 0:
+        return (1, 0) if x < w - 1 else (0, 1)
+    if x > 1:
+        return (-1, 0)
+    return (-1, 0) if y == h - 1 else (0, 1)
+
+
+def steer(game: Game, d):
+    # ввод идёт через apply_input, как у игрока; под «реверсом» он
+    # инвертируется, поэтому заранее подаём противоположное направление
+    if d == game.snake.dir:
+        return
+    if game.effect_active("reverse"):
+        d = (-d[0], -d[1])
+    game.apply_input(INPUT_DIRS.index(d))
+
+
+def steer_cycle(game: Game):
+    x, y = game.snake.head()
+    steer(game, cycle_dir(x, y, game.grid_w, game.grid_h))
+
+
+def steer_safe(game: Game):
+    # жадно: прямо, если свободно, иначе первый свободный поворот
+    x, y = game.snake.head()
+    cur = game.snake.dir
+    for dx, dy in [cur] + [d for d in INPUT_DIRS if d != cur]:
+        nx, ny = x + dx, y + dy
+        if (0 <= nx < game.grid_w and 0 <= ny < game.grid_h
+                and not game.obstacles.is_blocked((nx, ny))
+                and not game.snake.occupies((nx, ny))):
+            steer(game, (dx, dy))
+            return
+
+
+class FoodSeeker:
+    """Кратчайший путь (BFS) до ближайшего предмета; без пути — steer_safe.
+
+    Путь пересчитывается, когда цель съедена/пропала или следующий шаг
+    занят. Управление в замер тика не входит.
+    """
+
+    def __init__(self):
+        self.path = deque()
+        self.pickups = 0
+
+    def __call__(self, game: Game):
+        head = game.snake.head()
+        if not (self.path and self.path[-1] in game.items
+                and abs(self.path[0][0] - head[0]) + abs(self.path[0][1] - head[1]) == 1
+                and not game.obstacles.is_blocked(self.path[0])
+                and not game.snake.occupies(self.path[0])):
+            self.path = self.find(game, head)
+            if not self.path:
+                steer_safe(game)
+                return
+        nxt = self.path.popleft()
+        if not self.path:
+            self.pickups += 1
+        steer(game, (nxt[0] - head[0], nxt[1] - head[1]))
+
+    @staticmethod
+    def find(game: Game, head) -> deque:
+        back = (-game.snake.dir[0], -game.snake.dir[1])
+        prev = {head: None}
+        queue = deque([head])
+        while queue:
+            cur = queue.popleft()
+            if cur in game.items:
+                path = deque()
+                while cur != head:
+                    path.appendleft(cur)
+                    cur = prev[cur]
+                return path
+            for d in INPUT_DIRS:
+                if cur == head and d == back and len(game.snake.body) > 1:
+                    continue   # разворот на месте змейка не делает
+                c = (cur[0] + d[0], cur[1] + d[1])
+                if (c not in prev and 0 <= c[0] < game.grid_w and 0 <= c[1] < game.grid_h
+                        and not game.obstacles.is_blocked(c) and not game.snake.occupies(c)):
+                    prev[c] = cur
+                    queue.append(c)
+        return deque()
+
+
+# -------------------- прогоны --------------------
+
+def new_game(grid: int, mode: str, headless: bool = True, tile: int = 8) -> Game:
+    # DataStore(None) — рекорды бенчмарка не попадают на диск
+    game = Game(grid, grid, tile, mode, headless=headless,
+                seed=12345, store=DataStore(None))
+    game.reset_level()
+    game.state = "playing"
+    return game
+
+
+def every_tick(game: Game):
+    # шаг на каждом тике: меряем саму симуляцию, а не ожидание таймера
+    game.base_step_ms = game.min_step_ms = SIM_TICK_MS
+    game.step_ms = SIM_TICK_MS
+
+
+def sim_ticks(game: Game, ticks: int, control, on_reset=None) -> dict:
+    times = []
+    resets = 0
+    for _ in range(ticks):
+        control(game)
+        t0 = time.perf_counter()
+        game.sim_tick()
+        times.append((time.perf_counter() - t0) * 1000.0)
+        if not game.snake.alive:
+            resets += 1
+            game.reset_level()
+            if on_reset:
+                on_reset(game)
+    return {
+        "ticks": ticks,
+        "ticks_per_s": ticks / max(sum(times) / 1000.0, 1e-9),
+        "tick_p50_ms": percentile(times, 0.50),
+        "tick_p99_ms": percentile(times, 0.99),
+        "resets": resets,
+        "length": len(game.snake.body),
+    }
+
+
+def alloc_per_tick(game: Game, ticks: int, control, on_reset=None) -> dict:
+    tracemalloc.start()
+    peak_sum = 0
+    blocks0 = sys.getallocatedblocks()
+    for _ in range(ticks):
+        control(game)
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        game.sim_tick()
+        peak_sum += tracemalloc.get_traced_memory()[1] - before
+        if not game.snake.alive:
+            game.reset_level()
+            if on_reset:
+                on_reset(game)
+    blocks = sys.getallocatedblocks() - blocks0
+    tracemalloc.stop()
+    return {
+        "alloc_bytes_per_tick": peak_sum / ticks,
+        "blocks_per_tick": blocks / ticks,
+    }
+
+
+def frames(game: Game, count: int, control, before_frame=None) -> dict:
+    times = []
+    for i in range(count):
+        if before_frame:
+            before_frame(game, i)
+        control(game)
+        t0 = time.perf_counter()
+        game.update(1000.0 / snake02.BASE_FPS)
+        game.draw()
+        times.append((time.perf_counter() - t0) * 1000.0)
+        if game.state != "playing":
+            game.reset_level()
+            game.state = "playing"
+    return {
+        "frames": count,
+        "frame_p50_ms": percentile(times, 0.50),
+        "frame_p99_ms": percentile(times, 0.99),
+        "frame_mean_ms": statistics.fmean(times),
+    }
+
+
+def grow_along_cycle(game: Game, length: int):
+    game.snake.change_length(length)
+    while len(game.snake.body) < length and game.snake.alive:
+        steer_cycle(game)
+        game.sim_tick()
+
+
+# -------------------- сценарии --------------------
+
+def scenario_marathon_long(scale: float) -> dict:
+    # длинная змейка (2/3 поля) в MARATHON
+    game = new_game(60, "MARATHON")
+    every_tick(game)
+    grow_along_cycle(game, 2400)
+    res = sim_ticks(game, int(20000 * scale), steer_cycle)
+    res.update(alloc_per_tick(game, 500, steer_cycle))
+    return res
+
+
+# доля стен в obstacles_dense: впятеро гуще обычного ObstacleField.DENSITY,
+# после заливки недостижимых карманов стеной — ~40% поля. Заливка
+# (reachable) и поиск свободной клетки под предмет работают в полную силу
+DENSE = 0.35
+
+
+def random_field(game: Game):
+    # плотное «random»-поле вместо случайно выбранного генератора
+    game.obstacles.generate("random", game.rng, start=game.snake.head(), density=DENSE)
+    for it in [it for it in game.items.values() if game.obstacles.is_blocked(it.pos)]:
+        game.remove_item(it)
+        game.spawn_item("food")
+    every_tick(game)
+
+
+def scenario_obstacles_dense(scale: float) -> dict:
+    # генерация плотного поля (с заливкой достижимости) и игра на нём:
+    # змейка идёт к еде, каждый подбор — спавн предмета на плотном поле
+    gen = []
+    for seed in range(5):
+        t0 = time.perf_counter()
+        ObstacleField(200, 200).generate("random", random.Random(seed),
+                                         start=(100, 100), density=DENSE)
+        gen.append((time.perf_counter() - t0) * 1000.0)
+
+    game = new_game(200, "OBSTACLES")
+    random_field(game)
+    seeker = FoodSeeker()
+    res = sim_ticks(game, int(20000 * scale), seeker, random_field)
+    res.update(alloc_per_tick(game, 500, seeker, random_field))
+    res["pickups"] = seeker.pickups
+    res["walls"] = game.obstacles.count
+    res["wall_share"] = game.obstacles.count / game.obstacles.grid.size
+    res["generate_ms"] = statistics.median(gen)
+    return res
+
+
+def scenario_particles(scale: float) -> dict:
+    # ~5000 живых частиц: 400 всплесков по 12 штук раз в 30 кадров
+    game = new_game(30, "WRAP", headless=False, tile=22)
+
+    def burst(g: Game, i: int):
+        if i % 30 == 0:
+            for b in range(400):
+                g.add_particles_burst((b % 30, (b // 30) % 30), COLORS["food"])
+
+    res = frames(game, int(300 * scale), steer_cycle, burst)
+    times = []
+    for i in range(int(300 * scale)):
+        burst(game, i)
+        t0 = time.perf_counter()
+        game.particles.update(1.0 / snake02.BASE_FPS)
+        times.append((time.perf_counter() - t0) * 1000.0)
+    res["particles_update_p99_ms"] = percentile(times, 0.99)
+    return res
+
+
+def scenario_grid_200(scale: float) -> dict:
+    # 200x200: окно в режиме камеры, симуляция и кадры
+    game = new_game(200, "CLASSIC", headless=False, tile=8)
+    every_tick(game)
+    grow_along_cycle(game, 1000)
+    res = sim_ticks(game, int(10000 * scale), steer_cycle)
+    res.update(alloc_per_tick(game, 300, steer_cycle))
+    res.update(frames(game, int(300 * scale), steer_cycle))
+    return res
+
+
+def scenario_classic_lite(scale: float) -> dict:
+    # лёгкий режим snike_g_gpt: ходы ClassicGame до заполнения поля
+    from snike_g_gpt import ClassicGame
+
+    times = []
+    games = 0
+    while len(times) < int(20000 * scale):
+        game = ClassicGame(30, 30, seed=games)
+        games += 1
+        while not game.over:
+            x, y = game.snake.head()
+            game.set_dir(cycle_dir(x, y, game.grid_w, game.grid_h))
+            t0 = time.perf_counter()
+            game.step()
+            times.append((time.perf_counter() - t0) * 1000.0)
+    return {
+        "ticks": len(times),
+        "ticks_per_s": len(times) / max(sum(times) / 1000.0, 1e-9),
+        "tick_p50_ms": percentile(times, 0.50),
+        "tick_p99_ms": percentile(times, 0.99),
+        "games": games,
+    }
+
+
+# холодный старт: от import snake02 до первого показанного кадра меню
+COLD_START_TARGET_MS = 500.0
+COLD_START_CODE = """
+import time
+t0 = time.perf_counter()
+import snake02
+game = snake02.Game(30, 30, 22, "CLASSIC", store=snake02.DataStore(None))
+game.draw()
+print((time.perf_counter() - t0) * 1000.0)
+"""
+
+
+def scenario_cold_start(scale: float) -> dict:
+    # каждый замер — свежий процесс: ни модулей, ни кэша шрифтов
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", PYGAME_HIDE_SUPPORT_PROMPT="1")
+    here = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    for _ in range(max(3, int(10 * scale))):
+        out = subprocess.run([sys.executable, "-c", COLD_START_CODE], cwd=here,
+                             env=env, capture_output=True, text=True, check=True)
+        times.append(float(out.stdout.split()[-1]))
+
+    # применение настроек на месте (раньше — повторный __init__)
+    game = new_game(30, "CLASSIC", headless=False, tile=22)
+    t = []
+    for _ in range(20):
+        t0 = time.perf_counter()
+        game.apply_settings()
+        game.draw()
+        t.append((time.perf_counter() - t0) * 1000.0)
+    return {
+        "runs": len(times),
+        "cold_start_p50_ms": statistics.median(times),
+        "cold_start_max_ms": max(times),
+        "cold_start_target_ms": COLD_START_TARGET_MS,
+        "apply_settings_p50_ms": statistics.median(t),
+    }
+
+
+def scenario_render_100(scale: float) -> dict:
+    game = new_game(100, "OBSTACLES", headless=False, tile=8)
+
+    def burst(g: Game, i: int):
+        if i % 10 == 0:
+            g.add_particles_burst(g.snake.head(), COLORS["gold"])
+
+    return frames(game, int(300 * scale), steer_safe, burst)
+
+
+SCENARIOS = {
+    "marathon_long": scenario_marathon_long,
+    "obstacles_dense": scenario_obstacles_dense,
+    "particles": scenario_particles,
+    "grid_200": scenario_grid_200,
+    "render_100": scenario_render_100,
+    "classic_lite": scenario_classic_lite,
+    "cold_start": scenario_cold_start,
+}
+
+# направление метрики: +1 — чем больше, тем лучше; -1 — чем меньше
+DIRECTION = {
+    "ticks_per_s": +1,
+    "tick_p50_ms": -1,
+    "tick_p99_ms": -1,
+    "frame_p50_ms": -1,
+    "frame_p99_ms": -1,
+    "alloc_bytes_per_tick": -1,
+    "particles_update_p99_ms": -1,
+    "cold_start_p50_ms": -1,
+    "apply_settings_p50_ms": -1,
+}
+
+# абсолютные цели: метрика -> предел (проверяются и без базы)
+TARGETS = {
+    "cold_start_p50_ms": COLD_START_TARGET_MS,
+}
+
+
+def run_mode(meta: dict) -> str:
+    return "quick" if meta.get("quick") else "full"
+
+
+def same_mode(meta: dict, baseline: dict) -> Optional[str]:
+    # None — режимы совпадают; иначе причина, почему сравнивать нельзя:
+    # у --quick в 5 раз короче прогоны, p99 и аллокации несопоставимы
+    base = baseline.get("meta", {})
+    if "mode" not in base and "quick" not in base:
+        return "baseline has no run mode recorded; re-save it"
+    if run_mode(base) != run_mode(meta):
+        return (f"baseline is a {run_mode(base)} run, this is a {run_mode(meta)} run; "
+                f"re-run {'with' if run_mode(base) == 'quick' else 'without'} --quick")
+    return None
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    problems = []
+    for name, metrics in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        for key, sign in DIRECTION.items():
+            if key not in metrics or not base.get(key):
+                continue
+            change = (metrics[key] - base[key]) / base[key]
+            if -sign * change > threshold:
+                problems.append(f"{name}.{key}: {base[key]:.4g} -> "
+                                f"{metrics[key]:.4g} ({change:+.0%})")
+    return problems
+
+
+def over_targets(results: dict) -> list:
+    problems = []
+    for name, metrics in results.items():
+        for key, limit in TARGETS.items():
+            if metrics.get(key, 0) > limit:
+                problems.append(f"{name}.{key}: {metrics[key]:.4g} > target {limit:.4g}")
+    return problems
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Snake benchmark suite")
+    ap.add_argument("-s", "--scenario", action="append", choices=list(SCENARIOS))
+    ap.add_argument("--quick", action="store_true", help="укороченные прогоны")
+    ap.add_argument("--json", help="записать результаты в файл")
+    ap.add_argument("--baseline", help="сравнить с сохранённой базой")
+    ap.add_argument("--save-baseline", help="сохранить результаты как базу")
+    ap.add_argument("--threshold", type=float, default=0.2,
+                    help="допустимое ухудшение, доля (по умолчанию 0.2)")
+    args = ap.parse_args()
+
+    baseline = None
+    if args.baseline:
+        # режим сверяем до прогона, а не после
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        mismatch = same_mode({"quick": args.quick}, baseline)
+        if mismatch:
+            print(f"cannot compare with {args.baseline}: {mismatch}")
+            sys.exit(2)
+
+    scale = 0.2 if args.quick else 1.0
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        res = results[name] = SCENARIOS[name](scale)
+        print(name + ": " + ", ".join(
+            f"{k} {v:.4g}" if isinstance(v, float) else f"{k} {v}"
+            for k, v in res.items()))
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "pygame": pg.version.ver,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "quick": args.quick,
+            "mode": run_mode({"quick": args.quick}),
+        },
+        "results": results,
+    }
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+
+    failed = False
+    missed = over_targets(results)
+    if missed:
+        print("OVER TARGET:")
+        for p in missed:
+            print("  " + p)
+        failed = True
+    if baseline is not None:
+        problems = compare(results, baseline, args.threshold)
+        if problems:
+            print("REGRESSIONS:")
+            for p in problems:
+                print("  " + p)
+            failed = True
+        else:
+            print(f"no regressions against {args.baseline}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Сетевая арена: авторитетный asyncio-сервер и тонкий клиент.
+#   python snake_net.py server [--port 8765] [--bots 20] [--grid 60]
+#   python snake_net.py client [--host 127.0.0.1] [--port 8765]
+#   python snake02.py --connect=127.0.0.1:8765   — то же из основной игры
+#   python snake_net.py selftest [--clients 100] [--ticks 300]
+#       — сервер и N клиентов на localhost, сверка состояний и метрики
+#
+# Протокол — JSON по строке на сообщение.
+#   сервер -> клиент:
+#     {"hello": sid, "w": W, "h": H, "walls": [...]}   при подключении
+#     {"k": tick, "snakes": {sid: [клетки]}, "food": [...]}   ключевой кадр
+#     {"t": tick, "ev": [[op, ...], ...]}   дельта за тик (см. Arena.log):
+#        H sid i — новая голова, T sid — хвост ушёл, K sid — змейка погибла,
+#        S sid i — появилась, F i — еда появилась, E i — еда съедена
+#   клиент -> сервер:
+#     {"in": код}   направление (индекс в INPUT_DIRS)
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from snake02 import BASE_STEP_MS, COLORS, get_font
+from snake_arena import FOOD, WALL, Arena, snake_color
+
+KEYFRAME_EVERY = 50            # тиков между ключевыми кадрами
+MAX_CLIENT_BUFFER = 1 << 20    # отстающего клиента отключаем
+
+
+def encode(msg) -> bytes:
+    return json.dumps(msg, separators=(",", ":")).encode() + b"\n"
+
+
+class ArenaServer:
+    def __init__(self, arena: Arena, step_ms: int = BASE_STEP_MS):
+        self.arena = arena
+        self.arena.journal = []
+        self.step_ms = step_ms
+        self.clients: Dict[asyncio.StreamWriter, object] = {}
+        self.walls = [i for i, v in enumerate(arena.grid) if v == WALL]
+        # метрики
+        self.bytes_sent = 0
+        self.tick_ms = deque(maxlen=1000)      # обработка тика + рассылка
+        self.lag_ms = deque(maxlen=1000)       # опоздание тика от расписания
+        self.delta_bytes = deque(maxlen=1000)
+
+    def keyframe(self) -> bytes:
+        a = self.arena
+        return encode({
+            "k": a.tick,
+            "snakes": {sn.sid: list(sn.body) for sn in a.snakes if sn.alive},
+            "food": [i for i in a.food if a.grid[i] == FOOD],
+        })
+
+    def send(self, writer: asyncio.StreamWriter, data: bytes):
+        if writer.transport.get_write_buffer_size() > MAX_CLIENT_BUFFER:
+            writer.close()
+            return
+        writer.write(data)
+        self.bytes_sent += len(data)
+
+    def broadcast(self, data: bytes):
+        for writer in list(self.clients):
+            if writer.is_closing():
+                continue
+            self.send(writer, data)
+
+    async def handle_client(self, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter):
+        sn = self.arena.add_snake(bot=False)
+        self.clients[writer] = sn
+        a = self.arena
+        self.send(writer, encode({"hello": sn.sid, "w": a.w, "h": a.h,
+                                  "walls": self.walls}))
+        self.send(writer, self.keyframe())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    msg = json.loads(line)
+                    code = int(msg["in"])
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if 0 <= code < 4:
+                    if not sn.alive:
+                        a.spawn_snake(sn)
+                    a.set_input(sn.sid - 1, code)
+        except ConnectionError:
+            pass
+        finally:
+            del self.clients[writer]
+            a.remove_snake(sn)
+            writer.close()
+
+    async def tick_loop(self, ticks: Optional[int] = None):
+        loop = asyncio.get_running_loop()
+        next_at = loop.time()
+        done = 0
+        while ticks is None or done < ticks:
+            next_at += self.step_ms / 1000.0
+            await asyncio.sleep(max(0.0, next_at - loop.time()))
+            t0 = loop.time()
+            lag = t0 - next_at
+            self.lag_ms.append(max(0.0, lag * 1000.0))
+            if lag > self.step_ms / 1000.0:
+                next_at = t0   # отстали больше чем на тик — не догоняем пачкой
+
+            # в журнале — и события между тиками (подключения, респауны)
+            a = self.arena
+            a.step()
+            if a.tick % KEYFRAME_EVERY == 0:
+                data = self.keyframe()
+            else:
+                data = encode({"t": a.tick, "ev": a.journal})
+                self.delta_bytes.append(len(data))
+            a.journal.clear()
+            self.broadcast(data)
+            self.tick_ms.append((loop.time() - t0) * 1000.0)
+            done += 1
+
+    def metrics(self, seconds: float) -> dict:
+        def p(values, q):
+            v = sorted(values) or [0.0]
+            return v[min(len(v) - 1, int(q * len(v)))]
+        return {
+            "clients": len(self.clients),
+            "tick_p50_ms": p(self.tick_ms, 0.5),
+            "tick_p99_ms": p(self.tick_ms, 0.99),
+            "lag_p99_ms": p(self.lag_ms, 0.99),
+            "delta_bytes_mean": statistics.fmean(self.delta_bytes) if self.delta_bytes else 0,
+            "kbytes_per_s": self.bytes_sent / 1024 / max(seconds, 1e-9),
+        }
+
+
+class MirrorState:
+    """Копия состояния арены на клиенте, обновляется дельтами."""
+
+    def __init__(self):
+        self.sid = 0
+        self.w = self.h = 0
+        self.walls = set()
+        self.snakes: Dict[int, deque] = {}
+        self.food = set()
+        self.tick = 0
+        self.synced = False   # был ли уже ключевой кадр
+
+    def apply(self, msg: dict):
+        if "hello" in msg:
+            self.sid = msg["hello"]
+            self.w, self.h = msg["w"], msg["h"]
+            self.walls = set(msg["walls"])
+        elif "k" in msg:
+            self.tick = msg["k"]
+            self.snakes = {int(sid): deque(body) for sid, body in msg["snakes"].items()}
+            self.food = set(msg["food"])
+            self.synced = True
+        elif "t" in msg and self.synced:
+            self.tick = msg["t"]
+            snakes, food = self.snakes, self.food
+            for ev in msg["ev"]:
+                op = ev[0]
+                if op == "H":
+                    snakes.setdefault(ev[1], deque()).appendleft(ev[2])
+                elif op == "T":
+                    snakes[ev[1]].pop()
+                elif op == "K":
+                    snakes.pop(ev[1], None)
+                elif op == "S":
+                    snakes[ev[1]] = deque([ev[2]])
+                elif op == "F":
+                    food.add(ev[1])
+                elif op == "E":
+                    food.discard(ev[1])
+
+
+async def open_client(host: str, port: int):
+    reader, writer = await asyncio.open_connection(host, port, limit=1 << 24)
+    return reader, writer
+
+
+async def client_reader(reader: asyncio.StreamReader, state: MirrorState,
+                        stats: Optional[dict] = None):
+    while True:
+        line = await reader.readline()
+        if not line:
+            return
+        if stats is not None:
+            stats["bytes"] = stats.get("bytes", 0) + len(line)
+        state.apply(json.loads(line))
+
+
+# ============================== Окно клиента ==============================
+
+def run_client(host: str, port: int, tile: int = 12):
+    asyncio.run(_client_window(host, port, tile))
+
+
+async def _client_window(host: str, port: int, tile: int):
+    import pygame as pg
+
+    reader, writer = await open_client(host, port)
+    state = MirrorState()
+    task = asyncio.create_task(client_reader(reader, state))
+    while not state.w:
+        await asyncio.sleep(0.01)
+
+    pg.display.init()
+    pg.font.init()
+    pg.display.set_caption(f"Snake Arena — {host}:{port}")
+    screen = pg.display.set_mode((state.w * tile, state.h * tile))
+    font = get_font(18)
+    keys = {pg.K_UP: 0, pg.K_w: 0, pg.K_DOWN: 1, pg.K_s: 1,
+            pg.K_LEFT: 2, pg.K_a: 2, pg.K_RIGHT: 3, pg.K_d: 3}
+    wall_layer = pg.Surface(screen.get_size())
+    wall_layer.fill(COLORS["bg"])
+    for i in state.walls:
+        pg.draw.rect(wall_layer, COLORS["obstacle"],
+                     ((i % state.w) * tile, (i // state.w) * tile, tile, tile))
+    clock = pg.time.Clock()
+    try:
+        while not task.done():
+            for e in pg.event.get():
+                if e.type == pg.QUIT or (e.type == pg.KEYDOWN and e.key == pg.K_ESCAPE):
+                    return
+                if e.type == pg.KEYDOWN and e.key in keys:
+                    writer.write(encode({"in": keys[e.key]}))
+            screen.blit(wall_layer, (0, 0))
+            w = state.w
+            for i in state.food:
+                pg.draw.rect(screen, COLORS["food"], ((i % w) * tile, (i // w) * tile, tile, tile))
+            for sid, body in state.snakes.items():
+                col = COLORS["snake_head"] if sid == state.sid else snake_color(sid - 1)
+                for i in body:
+                    pg.draw.rect(screen, col, ((i % w) * tile, (i // w) * tile, tile, tile))
+            alive = "" if state.sid in state.snakes else " — нажми стрелку, чтобы возродиться"
+            screen.blit(font.render(f"tick {state.tick}{alive}", True, COLORS["text"]), (10, 8))
+            pg.display.flip()
+            clock.tick(60)
+            await asyncio.sleep(0)
+    finally:
+        task.cancel()
+        writer.close()
+        pg.quit()
+
+
+# ============================== Запуск ==============================
+
+async def serve(args):
+    arena = Arena(args.grid, args.grid, args.bots, 0, wrap=args.wrap,
+                  obstacles=args.obstacles, seed=args.seed)
+    server = ArenaServer(arena, args.step_ms)
+    srv = await asyncio.start_server(server.handle_client, args.host, args.port)
+    print(f"serving on {args.host}:{args.port}")
+    started = time.perf_counter()
+
+    async def report():
+        while True:
+            await asyncio.sleep(5)
+            m = server.metrics(time.perf_counter() - started)
+            print(f"clients {m['clients']}  tick p50 {m['tick_p50_ms']:.2f} ms "
+                  f"p99 {m['tick_p99_ms']:.2f} ms  lag p99 {m['lag_p99_ms']:.2f} ms  "
+                  f"delta {m['delta_bytes_mean']:.0f} B  {m['kbytes_per_s']:.1f} KiB/s")
+
+    async with srv:
+        await asyncio.gather(server.tick_loop(), report())
+
+
+async def selftest(args):
+    arena = Arena(args.grid, args.grid, args.bots, 0, seed=args.seed)
+    server = ArenaServer(arena, args.step_ms)
+    srv = await asyncio.start_server(server.handle_client, "127.0.0.1", 0)
+    port = srv.sockets[0].getsockname()[1]
+
+    clients = []
+    for _ in range(args.clients):
+        reader, writer = await open_client("127.0.0.1", port)
+        state, stats = MirrorState(), {}
+        clients.append((writer, state, stats,
+                        asyncio.create_task(client_reader(reader, state, stats))))
+    await asyncio.sleep(0.1)
+
+    started = time.perf_counter()
+    # клиенты иногда поворачивают — чтобы шёл и входящий трафик
+    async def steer():
+        k = 0
+        while True:
+            await asyncio.sleep(args.step_ms / 1000.0)
+            for n, (writer, *_rest) in enumerate(clients):
+                if (n + k) % 7 == 0:
+                    writer.write(encode({"in": (n + k) % 4}))
+            k += 1
+    steering = asyncio.create_task(steer())
+    await server.tick_loop(args.ticks)
+    steering.cancel()
+    elapsed = time.perf_counter() - started
+    # дать клиентам дочитать (они в том же процессе и могут отставать)
+    for _ in range(100):
+        if all(state.tick >= arena.tick for _, state, _, _ in clients):
+            break
+        await asyncio.sleep(0.1)
+
+    expect_snakes = {sn.sid: list(sn.body) for sn in arena.snakes if sn.alive}
+    expect_food = {i for i in arena.food if arena.grid[i] == FOOD}
+    bad = 0
+    for _, state, _, _ in clients:
+        got = {sid: list(body) for sid, body in state.snakes.items()}
+        if state.tick != arena.tick or got != expect_snakes or state.food != expect_food:
+            bad += 1
+    m = server.metrics(elapsed)
+    per_client = statistics.fmean(s.get("bytes", 0) for _, _, s, _ in clients) / elapsed
+    print(f"{args.clients} clients, {args.bots} bots, {args.ticks} ticks: "
+          f"{'OK' if bad == 0 else f'{bad} clients out of sync'}")
+    print(f"tick p50 {m['tick_p50_ms']:.2f} ms, p99 {m['tick_p99_ms']:.2f} ms, "
+          f"lag p99 {m['lag_p99_ms']:.2f} ms, delta {m['delta_bytes_mean']:.0f} B, "
+          f"{per_client / 1024:.1f} KiB/s per client, "
+          f"{m['kbytes_per_s']:.1f} KiB/s total")
+    for writer, _, _, task in clients:
+        task.cancel()
+        writer.close()
+    await asyncio.sleep(0.2)   # обработчики на сервере видят EOF и убирают змеек
+    srv.close()
+    await srv.wait_closed()
+    return bad == 0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Networked snake arena")
+    ap.add_argument("cmd", choices=("server", "client", "selftest"))
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--grid", type=int, default=60)
+    ap.add_argument("--bots", type=int, default=20)
+    ap.add_argument("--wrap", action="store_true")
+    ap.add_argument("--obstacles")
+    ap.add_argument("--seed", type=int)
+    ap.add_argument("--step-ms", type=int, default=BASE_STEP_MS)
+    ap.add_argument("--clients", type=int, default=100)
+    ap.add_argument("--ticks", type=int, default=300)
+    args = ap.parse_args()
+    if args.cmd == "server":
+        asyncio.run(serve(args))
+    elif args.cmd == "client":
+        run_client(args.host, args.port)
+    else:
+        raise SystemExit(0 if asyncio.run(selftest(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Проверка и прогон записанных партий (python snake02.py --record=FILE).
+#   python snake_replay.py verify FILE  — переиграть каждую сессию и сверить счёт
+#   python snake_replay.py stats FILE   — потоковая сводка по сессиям
+#   python snake_replay.py bench FILE   — тиков/сек симуляции на повторах
+
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from snake02 import iter_sessions, replay_session
+
+
+def verify(path: Path) -> bool:
+    ok = bad = 0
+    for n, session in enumerate(iter_sessions(path), start=1):
+        game = replay_session(session)
+        if game.score == session.score and game.tick == session.ticks:
+            ok += 1
+        else:
+            bad += 1
+            print(f"#{n}: seed {session.seed} — записано {session.score} очков / "
+                  f"{session.ticks} тиков, получено {game.score} / {game.tick}")
+    print(f"OK: {ok}, mismatch: {bad}")
+    return bad == 0
+
+
+def stats(path: Path):
+    sessions = 0
+    inputs = 0
+    ticks = 0
+    best = Counter()
+    for session in iter_sessions(path):
+        sessions += 1
+        inputs += len(session.events)
+        ticks += session.ticks
+        best[session.mode] = max(best[session.mode], session.score)
+    print(f"sessions: {sessions}, inputs: {inputs}, ticks: {ticks}")
+    for mode, score in best.items():
+        print(f"  best {mode}: {score}")
+
+
+def bench(path: Path):
+    ticks = 0
+    t0 = time.perf_counter()
+    for session in iter_sessions(path):
+        ticks += replay_session(session).tick
+    dt = time.perf_counter() - t0
+    print(f"{ticks} ticks in {dt:.3f} s — {ticks / max(dt, 1e-9):,.0f} ticks/s")
+
+
+def main():
+    if len(sys.argv) != 3 or sys.argv[1] not in ("verify", "stats", "bench"):
+        print("usage: snake_replay.py verify|stats|bench FILE")
+        sys.exit(2)
+    cmd, path = sys.argv[1], Path(sys.argv[2])
+    if cmd == "verify":
+        sys.exit(0 if verify(path) else 1)
+    elif cmd == "stats":
+        stats(path)
+    else:
+        bench(path)
+
+
+if __name__ == "__main__":
+    main()
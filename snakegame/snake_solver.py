@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Автопилот змейки: гамильтонов цикл по свободным клеткам + безопасные срезки.
+#
+# Цикл строится по блокам 2x2: у каждого свободного блока свой маленький
+# цикл TL→BL→BR→TR, а блоки остовного дерева сшиваются заменой пары
+# параллельных рёбер. Стены из ObstacleField просто выкидывают блок из
+# дерева. Затем цикл расширяется обходами пар свободных клеток вдоль его
+# рёбер (неполные блоки, нечётный край), а циклы соседних компонент
+# сшиваются через встречные рёбра. Что не подобралось, в цикл не входит;
+# до цикла змейка доходит кратчайшим путём.
+#
+# Цикл не всегда покрывает всё поле: через проход шириной в клетку
+# (центр «cross») он не пройдёт, тупики «caves» тоже мимо. Еда кладётся
+# только на цикл, поэтому по неполному циклу поле не пройти — Game
+# включает автопилот, только если Autopilot.covers().
+#
+# Срезка за O(1) на шаг: тело змейки всегда лежит на цикле между хвостом
+# и головой, поэтому шагнуть можно в любую соседнюю клетку цикла, которая
+# ближе к хвосту (по ходу цикла), чем запас под рост.
+#
+#   python snake_solver.py [размер] [--mode=OBSTACLES] [--seed=N]
+#       — пройти поле без окна и напечатать статистику
+#   python snake_solver.py --check [размер]
+#       — покрытие цикла на каждой раскладке: полный цикл проходит поле,
+#         на неполном автопилот выключен
+
+import sys
+import time
+from collections import Counter, deque
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+Vec = Tuple[int, int]
+
+DIRS = [(0, -1), (0, 1), (-1, 0), (1, 0)]   # как INPUT_DIRS в snake02
+SHORTCUT_SHARE = 0.5   # змейка длиннее этой доли цикла — только по циклу
+SHORTCUT_SLACK = 4     # запас клеток до хвоста сверх отложенного роста
+
+
+class HamiltonCycle:
+    """Порядок клеток цикла и обратный индекс клетка -> номер."""
+
+    def __init__(self, cells: List[Vec]):
+        self.cells = cells
+        self.n = len(cells)
+        self.index: Dict[Vec, int] = {c: i for i, c in enumerate(cells)}
+
+
+def cycle_for(blocked: np.ndarray, start: Vec) -> HamiltonCycle:
+    """Цикл для карты стен (uint8, h x w); кэшируется по раскладке."""
+    h, w = blocked.shape
+    return _build_cycle(w, h, np.ascontiguousarray(blocked, np.uint8).tobytes(), start)
+
+
+def _components(free: List[List[bool]], start: Vec):
+    # связные компоненты свободных блоков (обход в ширину); для каждой —
+    # список блоков и рёбра остовного дерева
+    bh, bw = len(free), len(free[0])
+    seen = set()
+    order = [start] if free[start[1]][start[0]] else []
+    order += [(x, y) for y in range(bh) for x in range(bw) if free[y][x]]
+    for root in order:
+        if root in seen:
+            continue
+        seen.add(root)
+        tree, edges = [root], []
+        i = 0
+        while i < len(tree):
+            bx, by = tree[i]
+            i += 1
+            for nx, ny in ((bx + 1, by), (bx - 1, by), (bx, by + 1), (bx, by - 1)):
+                if 0 <= nx < bw and 0 <= ny < bh and free[ny][nx] and (nx, ny) not in seen:
+                    seen.add((nx, ny))
+                    tree.append((nx, ny))
+                    edges.append(((bx, by), (nx, ny)))
+        yield tree, edges
+
+
+@lru_cache(maxsize=8)
+def _build_cycle(w: int, h: int, walls: bytes, start: Vec) -> HamiltonCycle:
+    g = np.frombuffer(walls, np.uint8).reshape(h, w)
+    # сетка блоков 2x2 со сдвигом (ox, oy) — берём сдвиг с наибольшим
+    # числом свободных блоков: стены часто режут поле неровно
+    best = None
+    for oy in (0, 1):
+        for ox in (0, 1):
+            bw, bh = (w - ox) // 2, (h - oy) // 2
+            if bw == 0 or bh == 0:
+                continue
+            s = g[oy:oy + bh * 2, ox:ox + bw * 2]
+            free = ~(s[0::2, 0::2] | s[0::2, 1::2] | s[1::2, 0::2] | s[1::2, 1::2]).astype(bool)
+            if best is None or free.sum() > best[2].sum():
+                best = (ox, oy, free)
+    if best is None or not best[2].any():
+        return HamiltonCycle([])
+    ox, oy, free = best
+    root = (min(max((start[0] - ox) // 2, 0), free.shape[1] - 1),
+            min(max((start[1] - oy) // 2, 0), free.shape[0] - 1))
+
+    # nxt[id] — следующая клетка цикла, id = y * w + x;
+    # label[id] — номер цикла (компоненты), parent — их слияния
+    def tl_of(b):
+        return (oy + 2 * b[1]) * w + ox + 2 * b[0]
+
+    nxt, label, parent = {}, {}, []
+    for tree, edges in _components(free.tolist(), root):
+        k = len(parent)
+        parent.append(k)
+        for b in tree:
+            tl = tl_of(b)
+            tr, bl, br = tl + 1, tl + w, tl + w + 1
+            nxt[tl], nxt[bl], nxt[br], nxt[tr] = bl, br, tr, tl
+            label[tl] = label[tr] = label[bl] = label[br] = k
+        for a, b in edges:
+            if a[1] == b[1]:
+                if a[0] > b[0]:
+                    a, b = b, a
+                # a слева от b: a.BR→b.BL и b.TL→a.TR
+                atl, btl = tl_of(a), tl_of(b)
+                nxt[atl + w + 1] = btl + w
+                nxt[btl] = atl + 1
+            else:
+                if a[1] > b[1]:
+                    a, b = b, a
+                # a над b: a.BL→b.TL и b.TR→a.BR
+                atl, btl = tl_of(a), tl_of(b)
+                nxt[atl + w] = btl
+                nxt[btl + 1] = atl + w + 1
+
+    def find(k):
+        while parent[k] != k:
+            parent[k] = parent[parent[k]]
+            k = parent[k]
+        return k
+
+    # Доводка, пока что-то меняется:
+    #  - ребро a→b, рядом с которым свободна пара клеток c, e, заменяем
+    #    обходом a→c→e→b (подбираем неполные блоки и нечётный край);
+    #  - два разных цикла со встречными соседними рёбрами a→b и c→d
+    #    (d рядом с a, c рядом с b) сшиваем в один: a→d ... c→b
+    walls = g.tolist()
+    changed = True
+    while changed:
+        changed = False
+        for a in list(nxt):
+            b = nxt[a]
+            ax, ay, bx, by = a % w, a // w, b % w, b // w
+            dx, dy = bx - ax, by - ay
+            for px, py in ((dy, dx), (-dy, -dx)):
+                cx, cy, ex, ey = bx + px, by + py, ax + px, ay + py
+                if not (0 <= cx < w and 0 <= cy < h and 0 <= ex < w and 0 <= ey < h):
+                    continue
+                c, e = cy * w + cx, ey * w + ex
+                if c not in nxt and e not in nxt:
+                    if walls[cy][cx] or walls[ey][ex]:
+                        continue
+                    nxt[a], nxt[e], nxt[c] = e, c, b
+                    label[c] = label[e] = label[a]
+                elif nxt.get(c) == e and find(label[c]) != find(label[a]):
+                    nxt[a], nxt[c] = e, b
+                    parent[find(label[c])] = find(label[a])
+                else:
+                    continue
+                changed = True
+                break
+
+    # остаётся самый большой цикл; до него змейка дойдёт по пути
+    sizes = Counter(find(k) for k in label.values())
+    main = sizes.most_common(1)[0][0]
+    first = next(i for i, k in label.items() if find(k) == main)
+    cells = []
+    cur = first
+    while True:
+        cells.append((cur % w, cur // w))
+        cur = nxt[cur]
+        if cur == first:
+            break
+    return HamiltonCycle(cells)
+
+
+class Autopilot:
+    """Выбор направления на каждом шаге змейки для Game."""
+
+    def __init__(self, cycle: HamiltonCycle):
+        self.cycle = cycle
+        self.path = None   # путь до цикла, пока голова вне его
+
+    def covers(self, obstacles) -> bool:
+        # цикл проходит через все свободные клетки (недостижимые карманы
+        # ObstacleField уже залиты стеной)
+        return self.cycle.n == obstacles.grid.size - obstacles.count
+
+    def target(self, game, hi: int) -> Optional[int]:
+        # ближайший по ходу цикла предмет (предметов на поле единицы)
+        n, index = self.cycle.n, self.cycle.index
+        best = None
+        for pos in game.items:
+            ii = index.get(pos)
+            if ii is not None:
+                d = (ii - hi) % n
+                if best is None or d < best:
+                    best = d
+        return best
+
+    def choose(self, game) -> Optional[Vec]:
+        snake = game.snake
+        head = snake.body[0]
+        index = self.cycle.index
+        hi = index.get(head)
+        if hi is None:
+            return self.rejoin(game)
+        n = self.cycle.n
+        best = self.cycle.cells[(hi + 1) % n]
+        best_d = 1
+
+        ti = index.get(snake.body[-1])
+        if ti is not None and len(snake.body) + snake.grow < n * SHORTCUT_SHARE:
+            target = self.target(game, hi)
+            if target is not None:
+                gap = (ti - hi) % n or n
+                limit = min(target, gap - snake.grow - SHORTCUT_SLACK)
+                hx, hy = head
+                for dx, dy in DIRS:
+                    c = (hx + dx, hy + dy)
+                    ci = index.get(c)
+                    if ci is None or snake.occupies(c):
+                        continue
+                    d = (ci - hi) % n
+                    if best_d < d <= limit:
+                        best, best_d = c, d
+        return (best[0] - head[0], best[1] - head[1])
+
+    def rejoin(self, game) -> Optional[Vec]:
+        # голова вне цикла (старт в неполном блоке или в другой компоненте):
+        # кратчайший путь до ближайшей клетки цикла, считается один раз
+        head = game.snake.body[0]
+        if not self.path or self.path[0] != head or game.snake.occupies(self.path[1]):
+            self.path = self.find_path(game, head)
+            if not self.path:
+                return self.any_free(game)
+        self.path.popleft()
+        nx, ny = self.path[0]
+        return (nx - head[0], ny - head[1])
+
+    def find_path(self, game, head: Vec):
+        prev = {head: None}
+        queue = deque([head])
+        while queue:
+            cur = queue.popleft()
+            if cur in self.cycle.index:
+                path = deque()
+                while cur is not None:
+                    path.appendleft(cur)
+                    cur = prev[cur]
+                return path
+            for c in self.free_neighbours(game, cur):
+                if c not in prev:
+                    prev[c] = cur
+                    queue.append(c)
+        return None
+
+    def free_neighbours(self, game, pos: Vec):
+        x, y = pos
+        for dx, dy in DIRS:
+            c = (x + dx, y + dy)
+            if (0 <= c[0] < game.grid_w and 0 <= c[1] < game.grid_h
+                    and not game.obstacles.is_blocked(c)
+                    and not game.snake.occupies(c)):
+                yield c
+
+    def any_free(self, game) -> Optional[Vec]:
+        hx, hy = game.snake.body[0]
+        for c in self.free_neighbours(game, (hx, hy)):
+            return (c[0] - hx, c[1] - hy)
+        return None
+
+
+def new_game(size: int, mode: str, seed: int):
+    from snake02 import SIM_TICK_MS, DataStore, Game
+
+    game = Game(size, size, 1, mode, headless=True, seed=seed,
+                autopilot=True, store=DataStore(None))
+    game.base_step_ms = game.min_step_ms = SIM_TICK_MS
+    game.reset_level(seed=seed)
+    game.state = "playing"
+    return game
+
+
+def check(size: int) -> bool:
+    # каждая раскладка стен (и стена-блок 2x2, которую цикл обходит):
+    # сколько свободных клеток покрыл цикл. Полный цикл должен пройти поле
+    # целиком, на неполном автопилот должен быть выключен
+    from snake02 import ObstacleField
+
+    ok = True
+    for kind in ["none", "block"] + ObstacleField.KINDS:
+        mode = "CLASSIC" if kind == "none" else "OBSTACLES"
+        game = new_game(size, mode, 1)
+        if kind != "none":
+            if kind == "block":
+                game.obstacles.grid[:] = 0
+                game.obstacles.grid[2:4, 2:4] = 1
+            else:
+                game.obstacles.generate(kind, game.rng, start=game.snake.head())
+            game.setup_pilot(game.snake.head())
+            for it in list(game.items.values()):
+                game.remove_item(it)
+            game.spawn_item("food")
+        free = game.obstacles.grid.size - game.obstacles.count
+        covered = cycle_for(game.obstacles.grid, game.snake.head()).n
+        if game.pilot is None:
+            result = "autopilot off"
+            good = covered < free and game.autopilot_off is not None
+        else:
+            while game.snake.alive:
+                game.sim_tick()
+            result = "cleared" if game.cleared else "died"
+            good = covered == free and game.cleared and len(game.snake.body) == free
+        # без стен и с блоком цикл обязан быть полным (сетка чётная)
+        if kind in ("none", "block") and size % 2 == 0:
+            good = good and game.pilot is not None
+        ok = ok and good
+        print(f"{kind:<8} cycle {covered:>6}/{free:<6} free cells "
+              f"({covered / free:6.1%}), {result}, length {len(game.snake.body)}"
+              f"{'' if good else '  FAIL'}")
+    return ok
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    opts = dict(a[2:].split("=", 1) for a in sys.argv[1:]
+                if a.startswith("--") and "=" in a)
+    size = int(args[0]) if args else 30
+    if "--check" in sys.argv[1:]:
+        sys.exit(0 if check(int(args[0]) if args else 20) else 1)
+    mode = opts.get("mode", "CLASSIC").upper()
+    seed = int(opts.get("seed", 1))
+
+    game = new_game(size, mode, seed)
+
+    t0 = time.perf_counter()
+    _build_cycle.cache_clear()
+    cycle = cycle_for(game.obstacles.grid, game.snake.head())
+    cold_ms = (time.perf_counter() - t0) * 1000.0
+    t0 = time.perf_counter()
+    cycle_for(game.obstacles.grid, game.snake.head())
+    warm_ms = (time.perf_counter() - t0) * 1000.0
+
+    free = size * size - game.obstacles.count
+    print(f"{size}x{size} {mode}: cycle {cycle.n}/{free} free cells, "
+          f"build {cold_ms:.1f} ms (cached {warm_ms:.3f} ms)")
+    if game.pilot is None:
+        # по неполному циклу поле не пройти — Game автопилот не включил
+        print("autopilot off: the cycle does not cover every free cell")
+        sys.exit(1)
+
+    t0 = time.perf_counter()
+    while game.snake.alive:
+        game.sim_tick()
+    elapsed = time.perf_counter() - t0
+
+    print(f"{'cleared' if game.cleared else 'died'} after {game.tick} ticks, "
+          f"length {len(game.snake.body)}, score {game.score}, "
+          f"{game.tick / elapsed:,.0f} ticks/s")
+    sys.exit(0 if game.cleared else 1)
+
+
+if __name__ == "__main__":
+    main()
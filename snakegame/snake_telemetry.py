@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Телеметрия змейки: события партии -> кольцевой буфер -> gzip NDJSON.
+#
+# Game вызывает emit() из игрового цикла — это только append в deque;
+# фоновый поток раз в FLUSH_EVERY секунд (или когда буфер наполовину полон)
+# забирает события и дописывает их в файл отдельным gzip-блоком. Если
+# запись не успевает, буфер вытесняет самые старые события (счётчик dropped).
+#
+# Строка файла: {"t": unix-время, "s": сессия, "tick": тик, "ev": вид, ...}
+#   session      — старт партии: mode, grid, seed, step_ms, autopilot (играет ли он)
+#   spawn/pickup — предмет kind в клетке pos (pickup — ещё length, score)
+#   expire       — золотое яблоко пропало несъеденным
+#   effect_start/effect_end — эффект kind
+#   step         — новый интервал шага step_ms (марафон)
+#   death        — cause: wall/self/obstacle/cleared, score, length
+#   quit         — партию бросили (рестарт/выход): score, length
+#
+#   python snake_telemetry.py stats FILE... [--json]  — потоковая сводка
+#   python snake_telemetry.py simulate FILE [партий]  — наиграть автопилотом
+
+import gzip
+import json
+import sys
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+CAPACITY = 1 << 16      # событий в кольцевом буфере
+FLUSH_EVERY = 1.0       # секунд между сбросами на диск
+
+
+class Telemetry:
+    """Кольцевой буфер событий и фоновая запись в gzip NDJSON."""
+
+    def __init__(self, path, capacity: int = CAPACITY,
+                 flush_every: float = FLUSH_EVERY):
+        self.path = Path(path)
+        self.capacity = capacity
+        self.flush_every = flush_every
+        self.buffer = deque(maxlen=capacity)
+        self.session: Optional[str] = None
+        self.sessions = 0
+        self.emitted = 0
+        self.written = 0
+        self.closed = False
+        self.flush_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = threading.Thread(
+            target=self._writer, name="snake-telemetry", daemon=True)
+        self.thread.start()
+
+    @property
+    def dropped(self) -> int:
+        return self.emitted - self.written - len(self.buffer)
+
+    def start_session(self, tick: int, **info):
+        # id уникален между запусками: время старта процесса + номер партии
+        if self.sessions == 0:
+            self.prefix = f"{int(time.time() * 1000):x}"
+        self.sessions += 1
+        self.session = f"{self.prefix}-{self.sessions}"
+        self.emit(tick, "session", **info)
+
+    def emit(self, tick: int, event: str, **data):
+        # вызывается из игрового цикла: без блокировок и ввода-вывода
+        self.buffer.append((time.time(), self.session, tick, event, data))
+        self.emitted += 1
+        if len(self.buffer) >= self.capacity // 2:
+            self.wake.set()
+
+    def _writer(self):
+        while not self.closed:
+            self.wake.wait(self.flush_every)
+            self.wake.clear()
+            self.flush()
+
+    def flush(self):
+        with self.flush_lock:
+            lines = []
+            buf = self.buffer
+            while buf:
+                t, session, tick, event, data = buf.popleft()
+                rec = {"t": round(t, 3), "s": session, "tick": tick, "ev": event}
+                rec.update(data)
+                lines.append(json.dumps(rec, separators=(",", ":")))
+            if not lines:
+                return
+            try:
+                # каждый сброс — отдельный gzip-блок; gzip.open читает их подряд
+                with gzip.open(self.path, "at", encoding="utf-8", compresslevel=6) as f:
+                    f.write("\n".join(lines) + "\n")
+                self.written += len(lines)
+            except OSError as e:
+                print(f"snake: телеметрия не записана в {self.path}: {e}",
+                      file=sys.stderr)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.wake.set()
+        self.thread.join()
+        self.flush()
+
+
+# ============================== сводка ==============================
+
+def iter_events(paths: Iterable) -> Iterator[dict]:
+    """События из файлов телеметрии по одному — память не растёт с объёмом."""
+    for path in paths:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class Aggregator:
+    """Потоковая сводка: счётчики и суммы, по сессиям — только открытые."""
+
+    def __init__(self):
+        self.events = Counter()
+        self.modes = Counter()          # сыгранные партии по режимам
+        self.grids = Counter()
+        self.spawns = Counter()
+        self.pickups = Counter()
+        self.expired = Counter()
+        self.effects = Counter()
+        self.deaths = Counter()         # (режим, причина)
+        self.quits = Counter()
+        self.steps = Counter()          # интервал шага -> сколько раз выставлялся
+        self.score_sum = Counter()      # режим -> сумма очков завершённых партий
+        self.ticks_sum = Counter()
+        self.ended = Counter()
+        self.open = {}                  # сессия -> (режим, сетка, шаг), пока идёт
+        self.played = set()             # открытые сессии, где был хоть один тик
+        self.first = self.last = None
+
+    def add(self, e: dict):
+        ev = e["ev"]
+        s = e.get("s")
+        self.events[ev] += 1
+        t = e.get("t")
+        if t is not None:
+            self.first = t if self.first is None else min(self.first, t)
+            self.last = t if self.last is None else max(self.last, t)
+        if ev == "session":
+            self.open[s] = (e.get("mode"), e.get("grid"), e.get("step_ms"))
+            return
+        mode, grid, step_ms = self.open.get(s, (None, None, None))
+        if e.get("tick", 0) > 0 and s in self.open and s not in self.played:
+            # партия считается сыгранной с первого события после старта
+            self.played.add(s)
+            self.modes[mode] += 1
+            self.grids[grid] += 1
+            self.steps[step_ms] += 1
+        if ev == "spawn":
+            self.spawns[e["kind"]] += 1
+        elif ev == "pickup":
+            self.pickups[e["kind"]] += 1
+        elif ev == "expire":
+            self.expired[e["kind"]] += 1
+        elif ev == "effect_start":
+            self.effects[e["kind"]] += 1
+        elif ev == "step":
+            self.steps[e["step_ms"]] += 1
+        elif ev in ("death", "quit"):
+            if ev == "death":
+                self.deaths[(mode, e.get("cause"))] += 1
+            else:
+                self.quits[mode] += 1
+            self.score_sum[mode] += e.get("score", 0)
+            self.ticks_sum[mode] += e.get("tick", 0)
+            self.ended[mode] += 1
+            self.open.pop(s, None)
+            self.played.discard(s)
+
+    def report(self) -> dict:
+        pickup_rate = {k: self.pickups[k] / n for k, n in self.spawns.items() if n}
+        return {
+            "events": sum(self.events.values()),
+            "by_event": dict(self.events),
+            "span_s": (self.last - self.first) if self.first is not None else 0,
+            "sessions_by_mode": dict(self.modes),
+            "sessions_by_grid": dict(self.grids),
+            "spawns": dict(self.spawns),
+            "pickups": dict(self.pickups),
+            "pickup_rate": pickup_rate,
+            "expired": dict(self.expired),
+            "effects": dict(self.effects),
+            "deaths": {f"{m}/{c}": n for (m, c), n in self.deaths.items()},
+            "quits": dict(self.quits),
+            "mean_score": {m: self.score_sum[m] / n for m, n in self.ended.items()},
+            "mean_ticks": {m: self.ticks_sum[m] / n for m, n in self.ended.items()},
+            "step_ms": {str(k): n for k, n in sorted(self.steps.items(),
+                                                      key=lambda kv: kv[0] or 0)},
+        }
+
+
+def print_report(rep: dict):
+    print(f"events: {rep['events']:,} over {rep['span_s']:.0f} s")
+    for key in ("by_event", "sessions_by_mode", "sessions_by_grid", "pickups",
+                "expired", "effects", "deaths", "quits", "step_ms"):
+        if rep[key]:
+            items = sorted(rep[key].items(), key=lambda kv: -kv[1])
+            print(f"{key}: " + ", ".join(f"{k} {v:,}" for k, v in items))
+    if rep["pickup_rate"]:
+        print("pickup_rate: " + ", ".join(
+            f"{k} {v:.0%}" for k, v in sorted(rep["pickup_rate"].items())))
+    for m, v in rep["mean_score"].items():
+        print(f"{m}: mean score {v:.1f}, mean ticks {rep['mean_ticks'][m]:.0f}")
+
+
+def simulate(path: str, games: int):
+    # наиграть телеметрию без окна: через круг режимов — автопилот,
+    # иначе случайные повороты (чтобы были и смерти)
+    import random
+    from snake02 import MODES, SIM_TICK_MS, DataStore, Game
+
+    tel = Telemetry(path)
+    rng = random.Random(0)
+    for i in range(games):
+        mode = list(MODES)[i % len(MODES)]
+        game = Game(20, 20, 1, mode, headless=True, seed=i, autopilot=i // 4 % 2 == 0,
+                    store=DataStore(None), telemetry=tel)
+        game.base_step_ms = game.min_step_ms = SIM_TICK_MS
+        game.reset_level(seed=i)
+        game.state = "playing"
+        while game.snake.alive:
+            if game.pilot is None and rng.random() < 0.1:
+                game.apply_input(rng.randrange(4))
+            game.sim_tick()
+    tel.close()
+    print(f"{tel.written:,} events written to {path}, dropped {tel.dropped}")
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if len(args) >= 2 and args[0] == "stats":
+        agg = Aggregator()
+        t0 = time.perf_counter()
+        for e in iter_events(args[1:]):
+            agg.add(e)
+        rep = agg.report()
+        if "--json" in sys.argv:
+            print(json.dumps(rep, indent=2))
+        else:
+            print_report(rep)
+            elapsed = time.perf_counter() - t0
+            print(f"({rep['events'] / max(elapsed, 1e-9):,.0f} events/s)")
+    elif len(args) >= 2 and args[0] == "simulate":
+        simulate(args[1], int(args[2]) if len(args) >= 3 else 20)
+    else:
+        print("usage: snake_telemetry.py stats FILE... [--json] | simulate FILE [games]")
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,20 @@
 import pygame as pg
 import random
+from itertools import islice
 from pathlib import Path
+from typing import Optional
+
+# Лёгкий режим: классика на общих кусках snake02 (змейка с индексом тела,
+# кэш шрифтов и текста), без частиц, камеры и таймеров — 12 кадров/с.
+from snake02 import Snake, TextCache, Vec, atomic_write, get_font
 
 # ---------- Настройки ----------
 TILE = 20           # размер клетки (px)
 GRID_W, GRID_H = 30, 30  # сетка 30x30 => окно 600x600
 WIDTH, HEIGHT = GRID_W * TILE, GRID_H * TILE
 FPS = 12            # скорость игры (кадров в секунду)
-FONT_NAME = "arial"
 HIGHSCORE_FILE = Path("highscore.txt")
+SPAWN_TRIES = 64    # случайных попыток найти пустую клетку, потом — перебор
 # -------------------------------
 
 # Цвета
@@ -27,12 +33,6 @@ DIRS = {
     pg.K_LEFT: (-1, 0),
     pg.K_RIGHT: (1, 0),
 }
-OPPOSITE = {
-    (0, -1): (0, 1),
-    (0, 1): (0, -1),
-    (-1, 0): (1, 0),
-    (1, 0): (-1, 0),
-}
 
 
 def load_highscore() -> int:
@@ -44,158 +44,164 @@ def load_highscore() -> int:
 
 def save_highscore(value: int) -> None:
     try:
-        HIGHSCORE_FILE.write_text(str(value))
+        atomic_write(HIGHSCORE_FILE, str(value))
     except Exception:
         pass
 
 
-def draw_grid(surface: pg.Surface):
-    # Нежная сетка, чтобы ориентироваться
+class ClassicGame:
+    """Состояние партии; step() — один ход, без окна и pygame.display."""
+
+    def __init__(self, grid_w: int = GRID_W, grid_h: int = GRID_H,
+                 seed: Optional[int] = None):
+        self.grid_w, self.grid_h = grid_w, grid_h
+        self.rng = random.Random(seed)
+        self.snake = Snake((grid_w // 2, grid_h // 2))  # старт вправо
+        self.score = 0
+        self.won = False    # змейка заняла всё поле
+        self.food = self.random_empty_cell()
+
+    def random_empty_cell(self) -> Optional[Vec]:
+        occupies = self.snake.occupies
+        for _ in range(SPAWN_TRIES):
+            pos = (self.rng.randrange(self.grid_w), self.rng.randrange(self.grid_h))
+            if not occupies(pos):
+                return pos
+        # поле почти заполнено — перебираем свободные клетки
+        cells = [(x, y) for y in range(self.grid_h) for x in range(self.grid_w)
+                 if not occupies((x, y))]
+        return self.rng.choice(cells) if cells else None
+
+    def set_dir(self, d: Vec):
+        self.snake.set_dir(d)  # разворот на 180° змейка не примет
+
+    @property
+    def over(self) -> bool:
+        return self.won or not self.snake.alive
+
+    def step(self) -> bool:
+        # стена и самоукус проверяются в Snake.step по индексу тела, O(1).
+        # Как и раньше, змейка растёт на том же ходу, когда ест: хвост на
+        # этом ходу остаётся на месте
+        hx, hy = self.snake.head()
+        dx, dy = self.snake.dir
+        eats = (hx + dx, hy + dy) == self.food
+        if eats:
+            self.snake.grow += 1
+        head = self.snake.step(wrap=False, grid_w=self.grid_w, grid_h=self.grid_h)
+        if head is not None and eats:
+            self.score += 1
+            self.food = self.random_empty_cell()
+            if self.food is None:
+                self.won = True  # еду класть некуда — поле пройдено
+        return not self.over
+
+
+def build_grid_layer() -> pg.Surface:
+    # фон с сеткой рисуется один раз, дальше — один blit за кадр
+    surf = pg.Surface((WIDTH, HEIGHT))
+    surf.fill(BG)
     for x in range(0, WIDTH, TILE):
-        pg.draw.line(surface, GRID, (x, 0), (x, HEIGHT), 1)
+        pg.draw.line(surf, GRID, (x, 0), (x, HEIGHT), 1)
     for y in range(0, HEIGHT, TILE):
-        pg.draw.line(surface, GRID, (0, y), (WIDTH, y), 1)
+        pg.draw.line(surf, GRID, (0, y), (WIDTH, y), 1)
+    return surf
 
 
-def random_empty_cell(snake_body):
-    while True:
-        pos = (random.randrange(GRID_W), random.randrange(GRID_H))
-        if pos not in snake_body:
-            return pos
+def build_overlay(alpha: int) -> pg.Surface:
+    overlay = pg.Surface((WIDTH, HEIGHT), pg.SRCALPHA)
+    overlay.fill((0, 0, 0, alpha))
+    return overlay
 
 
-def draw_rect_cell(surface: pg.Surface, color, cell, border=0):
+def draw_rect_cell(surface: pg.Surface, color, cell):
     x, y = cell
-    r = pg.Rect(x * TILE, y * TILE, TILE, TILE)
-    if border:
-        pg.draw.rect(surface, color, r, border)
-    else:
-        pg.draw.rect(surface, color, r, border)
+    surface.fill(color, (x * TILE, y * TILE, TILE, TILE))
 
 
-def render_text(surface, text, size, pos, color=TEXT, center=False, bold=False):
-    font = pg.font.SysFont(FONT_NAME, size, bold=bold)
-    img = font.render(text, True, color)
+def render_text(surface, texts: TextCache, text, size, pos, color=TEXT,
+                center=False, bold=False):
+    img = texts.render(get_font(size, bold), text, color)
     rect = img.get_rect()
-    rect.center = pos if center else pos
-    if not center:
-        surface.blit(img, rect)
+    if center:
+        rect.center = pos
     else:
-        surface.blit(img, rect)
+        rect.topleft = pos
+    surface.blit(img, rect)
 
 
 def main():
-    pg.init()
+    pg.display.init()  # звук и джойстики не нужны; шрифты — через get_font
     pg.display.set_caption("Snake — Pygame")
     screen = pg.display.set_mode((WIDTH, HEIGHT))
     clock = pg.time.Clock()
-    font_small = pg.font.SysFont(FONT_NAME, 18)
-    font_big = pg.font.SysFont(FONT_NAME, 42, bold=True)
+    texts = TextCache()
+    grid_layer = build_grid_layer()
+    pause_layer = build_overlay(120)
+    over_layer = build_overlay(150)
 
     highscore = load_highscore()
-
-    def reset_game():
-        snake = [(GRID_W // 2, GRID_H // 2)]
-        direction = (1, 0)  # старт вправо
-        grow = 0
-        food = random_empty_cell(set(snake))
-        score = 0
-        paused = False
-        alive = True
-        return snake, direction, grow, food, score, paused, alive
-
-    snake, direction, grow, food, score, paused, alive = reset_game()
+    game = ClassicGame()
+    paused = False
 
     # Основной цикл
     while True:
         # --- события ---
         for event in pg.event.get():
-            if event.type == pg.QUIT:
+            if event.type == pg.QUIT or (event.type == pg.KEYDOWN
+                                         and event.key == pg.K_ESCAPE):
+                save_highscore(highscore)
                 pg.quit()
                 return
             if event.type == pg.KEYDOWN:
                 if event.key in DIRS:
-                    new_dir = DIRS[event.key]
-                    # запрет разворота на 180°
-                    if len(snake) == 1 or new_dir != OPPOSITE.get(direction):
-                        direction = new_dir
+                    game.set_dir(DIRS[event.key])
                 elif event.key == pg.K_p:
                     paused = not paused
-                elif event.key == pg.K_ESCAPE:
-                    pg.quit()
-                    return
-                elif event.key == pg.K_r and not alive:
-                    snake, direction, grow, food, score, paused, alive = reset_game()
-
-        if not paused and alive:
-            # --- логика движения ---
-            head_x, head_y = snake[0]
-            dx, dy = direction
-            new_head = (head_x + dx, head_y + dy)
-
-            # Проверка стены
-            if not (0 <= new_head[0] < GRID_W and 0 <= new_head[1] < GRID_H):
-                alive = False
-            # Проверка самоукуса
-            elif new_head in snake:
-                alive = False
-            else:
-                snake.insert(0, new_head)
-
-                # Еда?
-                if new_head == food:
-                    score += 1
-                    grow += 1
-                    food = random_empty_cell(set(snake))
-                if grow > 0:
-                    grow -= 1
-                else:
-                    snake.pop()
-
-        # Обновление рекорда
-        if score > highscore:
-            highscore = score
-            save_highscore(highscore)
+                elif event.key == pg.K_r and game.over:
+                    game = ClassicGame()
+
+        if not paused and not game.over:
+            if not game.step():
+                # рекорд пишем на диск один раз — в конце партии
+                if game.score > highscore:
+                    highscore = game.score
+                    save_highscore(highscore)
 
         # --- отрисовка ---
-        screen.fill(BG)
-        draw_grid(screen)
+        screen.blit(grid_layer, (0, 0))
 
         # Еда
-        draw_rect_cell(screen, FOOD, food)
-
-        # Змейка
-        # Голова
-        if snake:
-            draw_rect_cell(screen, SNAKE_HEAD, snake[0])
-        # Тело
-        for cell in snake[1:]:
+        if game.food is not None:
+            draw_rect_cell(screen, FOOD, game.food)
+
+        # Змейка: голова и тело
+        body = game.snake.body
+        draw_rect_cell(screen, SNAKE_HEAD, body[0])
+        for cell in islice(body, 1, None):
             draw_rect_cell(screen, SNAKE, cell)
 
         # HUD
-        score_text = f"Score: {score}   Best: {highscore}   FPS: {FPS}"
-        hud = font_small.render(score_text, True, TEXT)
-        screen.blit(hud, (10, 8))
+        best = max(highscore, game.score)
+        render_text(screen, texts, f"Score: {game.score}   Best: {best}   FPS: {FPS}",
+                    18, (10, 8))
 
         if paused:
-            overlay = pg.Surface((WIDTH, HEIGHT), pg.SRCALPHA)
-            overlay.fill((0, 0, 0, 120))
-            screen.blit(overlay, (0, 0))
-            render_text(screen, "PAUSE", 48, (WIDTH // 2, HEIGHT //
-                        2 - 10), color=TEXT, center=True, bold=True)
-            render_text(screen, "Press P to continue", 22,
-                        (WIDTH // 2, HEIGHT // 2 + 30), color=TEXT, center=True)
-
-        if not alive:
-            overlay = pg.Surface((WIDTH, HEIGHT), pg.SRCALPHA)
-            overlay.fill((0, 0, 0, 150))
-            screen.blit(overlay, (0, 0))
-            render_text(screen, "GAME OVER", 56, (WIDTH // 2,
-                        HEIGHT // 2 - 20), color=TEXT, center=True, bold=True)
-            render_text(screen, f"Score: {score}   Best: {highscore}", 24, (
-                WIDTH // 2, HEIGHT // 2 + 20), color=TEXT, center=True)
-            render_text(screen, "Press R to restart • Esc to quit", 20,
-                        (WIDTH // 2, HEIGHT // 2 + 54), color=TEXT, center=True)
+            screen.blit(pause_layer, (0, 0))
+            render_text(screen, texts, "PAUSE", 48, (WIDTH // 2, HEIGHT // 2 - 10),
+                        center=True, bold=True)
+            render_text(screen, texts, "Press P to continue", 22,
+                        (WIDTH // 2, HEIGHT // 2 + 30), center=True)
+
+        if game.over:
+            screen.blit(over_layer, (0, 0))
+            title = "YOU WIN" if game.won else "GAME OVER"
+            render_text(screen, texts, title, 56, (WIDTH // 2, HEIGHT // 2 - 20),
+                        center=True, bold=True)
+            render_text(screen, texts, f"Score: {game.score}   Best: {best}", 24,
+                        (WIDTH // 2, HEIGHT // 2 + 20), center=True)
+            render_text(screen, texts, "Press R to restart • Esc to quit", 20,
+                        (WIDTH // 2, HEIGHT // 2 + 54), center=True)
 
         pg.display.flip()
         clock.tick(FPS)
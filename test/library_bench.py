@@ -0,0 +1,165 @@
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from itertools import accumulate
+
+import library_db
+
+# Операций в секунду: «до» — как было в bibliotek_app (новое соединение на
+# каждый вызов, настройки sqlite по умолчанию), «после» — library_db
+# (соединение на поток, WAL, synchronous=NORMAL). Базы — во временной папке.
+# Затем смесь чтений и записей (как в меню) без кэша и с кэшем library_db
+# и возврат тележки из CART книг: по одной против change_available_many.
+#   python library_bench.py [-n 2000]
+
+
+def legacy_add(db, title, author, year, available=1):
+    with sqlite3.connect(db) as conn:
+        conn.execute("INSERT INTO books (title,author,year,available) VALUES(?,?,?,?)",
+                     (title, author, year, available))
+        conn.commit()
+
+
+def legacy_get(db, book_id):
+    with sqlite3.connect(db) as conn:
+        return conn.execute("SELECT * FROM books WHERE id = ?", (book_id,)).fetchone()
+
+
+def legacy_change(db, book_id, available):
+    with sqlite3.connect(db) as conn:
+        row = conn.execute("SELECT available FROM books WHERE id = ?", (book_id,)).fetchone()
+        if row and row[0] != available:
+            conn.execute("UPDATE books SET available = ? WHERE id = ?", (available, book_id))
+            conn.commit()
+
+
+def legacy_setup(db):
+    with sqlite3.connect(db) as conn:
+        conn.execute(library_db.SCHEMA)
+
+
+def ops_per_sec(fn, n):
+    t0 = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return n / (time.perf_counter() - t0)
+
+
+def run(n, tmp):
+    rng = random.Random(1)
+    ids = [rng.randrange(1, n + 1) for _ in range(n)]
+    results = {}
+
+    db = os.path.join(tmp, "legacy.db")
+    legacy_setup(db)
+    results["before"] = {
+        "add_book": ops_per_sec(lambda i: legacy_add(db, f"Title {i}", f"Author {i % 97}", 1900 + i % 120), n),
+        "get_book": ops_per_sec(lambda i: legacy_get(db, ids[i]), n),
+        "change_available": ops_per_sec(lambda i: legacy_change(db, ids[i], i % 2), n),
+    }
+
+    library_db.set_db_path(os.path.join(tmp, "library.db"))
+    results["after"] = {
+        "add_book": ops_per_sec(lambda i: library_db.add_book(f"Title {i}", f"Author {i % 97}", 1900 + i % 120), n),
+        "get_book": ops_per_sec(lambda i: library_db.get_book(ids[i]), n),
+        "change_available": ops_per_sec(lambda i: change_quiet(ids[i], i % 2), n),
+    }
+    library_db.close_all()
+    return results
+
+
+def mixed_workload(n, rng):
+    # 90% чтений (популярные книги чаще — по Ципфу), 10% смены статуса
+    ids = list(range(1, n + 1))
+    cum = list(accumulate(1 / k for k in ids))
+    authors = [f"Author {i}" for i in range(97)]
+
+    def op(i):
+        r = rng.random()
+        if r < 0.1:
+            change_quiet(rng.choices(ids, cum_weights=cum)[0], rng.randint(0, 1))
+        elif r < 0.6:
+            library_db.get_book(rng.choices(ids, cum_weights=cum)[0])
+        elif r < 0.8:
+            library_db.count_by_author(rng.choice(authors))
+        else:
+            next(library_db.book_pages(available_only=True, page_size=20), None)
+    return op
+
+
+def run_cache(n, tmp):
+    library_db.set_db_path(os.path.join(tmp, "cache.db"))
+    conn = library_db.get_connection()
+    with conn:
+        conn.executemany(library_db.QUERIES["add_book"], (
+            (f"Title {i}", f"Author {i % 97}", 1900 + i % 120, 1) for i in range(n)))
+    results = {}
+    for enabled in (False, True):
+        library_db.cache.clear()
+        library_db.cache.enabled = enabled
+        library_db.cache.hits.clear()
+        library_db.cache.misses.clear()
+        results[enabled] = ops_per_sec(mixed_workload(n, random.Random(2)), n * 5)
+    stats = library_db.cache.stats()
+    library_db.close_all()
+    return results, stats
+
+
+CART = 200
+
+
+def run_cart(n, tmp):
+    # книг в секунду при возврате тележек по CART штук
+    library_db.set_db_path(os.path.join(tmp, "cart.db"))
+    conn = library_db.get_connection()
+    with conn:
+        conn.executemany(library_db.QUERIES["add_book"], (
+            (f"Title {i}", f"Author {i % 97}", 1900 + i % 120, 0) for i in range(n)))
+    carts = [list(range(i, i + CART)) for i in range(1, n - CART + 2, CART)]
+    books = len(carts) * CART
+    t0 = time.perf_counter()
+    for cart in carts:
+        for book_id in cart:
+            change_quiet(book_id, 1)
+    single = books / (time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    for cart in carts:
+        library_db.check_out_books(cart)
+    batch = books / (time.perf_counter() - t0)
+    library_db.close_all()
+    return single, batch
+
+
+def change_quiet(book_id, available):
+    try:
+        library_db.change_available_books(book_id, available)
+    except library_db.Bookchangeavailb:
+        pass  # статус уже такой — в «до» это тоже просто пропуск
+
+
+def main():
+    ap = argparse.ArgumentParser(description="library.db ops/s, before and after")
+    ap.add_argument("-n", type=int, default=2000, help="операций каждого вида")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = run(args.n, tmp)
+        cached, stats = run_cache(args.n, tmp)
+        single, batch = run_cart(args.n, tmp)
+    print(f"{'operation':<18}{'before ops/s':>14}{'after ops/s':>14}{'speedup':>10}")
+    for op in results["before"]:
+        b, a = results["before"][op], results["after"][op]
+        print(f"{op:<18}{b:>14,.0f}{a:>14,.0f}{a / b:>9.1f}x")
+    print(f"{'mixed, cache':<18}{cached[False]:>14,.0f}{cached[True]:>14,.0f}"
+          f"{cached[True] / cached[False]:>9.1f}x")
+    print(f"{f'cart of {CART}':<18}{single:>14,.0f}{batch:>14,.0f}{batch / single:>9.1f}x"
+          f"  (books/s: one by one, batch)")
+    for kind, (hits, misses, rate) in stats.items():
+        print(f"  cache {kind:<8}{hits:>8,} hits {misses:>8,} misses {rate:>6.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import os
+import random
+import tempfile
+
+import library_db
+
+# Чистка мягко удалённых книг и возврат места файлу базы.
+#   python library_compact.py [--db PATH] [--older-than-days 7] [--enable-incremental]
+#   python library_compact.py --churn 200000   — демонстрация на временной базе
+#
+# --enable-incremental — для базы, созданной до auto_vacuum=INCREMENTAL:
+# один полный VACUUM, после него compact() возвращает место понемногу.
+
+
+def db_size(path) -> int:
+    return sum(os.path.getsize(path + suffix) for suffix in ("", "-wal")
+               if os.path.exists(path + suffix))
+
+
+def churn(n: int, tmp: str):
+    # каталог из n книг, три волны «удалить десятилетие + докупить новые»,
+    # размер файла без чистки и с чисткой после каждой волны
+    rng = random.Random(1)
+    for do_compact in (False, True):
+        path = os.path.join(tmp, f"churn{int(do_compact)}.db")
+        library_db.set_db_path(path)
+        conn = library_db.get_connection()
+        with conn:
+            conn.executemany(library_db.QUERIES["add_book"], (
+                (f"Title {i}", f"Author {i % 997}", rng.randint(1900, 2019), 1)
+                for i in range(n)))
+        for decade in (1900, 1930, 1960):
+            deleted = library_db.delete_books_where(year_from=decade, year_to=decade + 29)
+            with conn:
+                conn.executemany(library_db.QUERIES["add_book"], (
+                    (f"New {decade} {i}", f"Author {i % 997}", rng.randint(2020, 2024), 1)
+                    for i in range(deleted)))
+            if do_compact:
+                library_db.compact(older_than=0, vacuum_pages=1 << 30)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        rows, tombstones = conn.execute(
+            "SELECT count(*), count(deleted_at) FROM books").fetchone()
+        label = "with compact" if do_compact else "no compact"
+        print(f"{label:<14}{rows:>10,} rows {tombstones:>10,} tombstones "
+              f"{db_size(path) / 2**20:>8.1f} MiB")
+        library_db.close_all()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Purge soft-deleted books and vacuum")
+    ap.add_argument("--db", help="путь к базе (по умолчанию LIBRARY_DB или library.db)")
+    ap.add_argument("--older-than-days", type=float, default=library_db.PURGE_AFTER / 86400,
+                    help="удалять надгробия старше стольких дней")
+    ap.add_argument("--batch", type=int, default=library_db.PURGE_BATCH)
+    ap.add_argument("--enable-incremental", action="store_true",
+                    help="перевести старую базу на auto_vacuum=INCREMENTAL (полный VACUUM)")
+    ap.add_argument("--churn", type=int, metavar="N", help="демонстрация на временной базе")
+    args = ap.parse_args()
+
+    if args.churn:
+        with tempfile.TemporaryDirectory() as tmp:
+            churn(args.churn, tmp)
+        return
+    if args.db:
+        library_db.set_db_path(args.db)
+    if args.enable_incremental:
+        library_db.enable_incremental_vacuum()
+    before = db_size(library_db.DB_NAME)
+    stats = library_db.compact(older_than=args.older_than_days * 86400, batch=args.batch,
+                               vacuum_pages=1 << 30)
+    library_db.get_connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    print(f"Purged {stats['purged']:,} deleted books, freed {stats['freed_pages']:,} pages, "
+          f"{before / 2**20:.1f} -> {db_size(library_db.DB_NAME) / 2**20:.1f} MiB")
+    if not stats["incremental_vacuum"]:
+        print("auto_vacuum is off for this database: run with --enable-incremental once")
+    library_db.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,791 @@
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from itertools import combinations
+
+# Путь к базе можно переопределить переменной окружения LIBRARY_DB
+DB_NAME = os.environ.get("LIBRARY_DB", "library.db")
+
+# Настройки соединения: WAL — читатели не блокируют писателя,
+# synchronous=NORMAL в WAL безопасен и не делает fsync на каждый commit,
+# cache_size < 0 — размер кэша страниц в КиБ
+PRAGMAS = {
+    # до создания первой таблицы: освобождённые страницы возвращает
+    # PRAGMA incremental_vacuum (compact), а не только полный VACUUM
+    "auto_vacuum": "INCREMENTAL",
+    "busy_timeout": 5000,
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,
+    "temp_store": "MEMORY",
+}
+
+SCHEMA = """CREATE TABLE IF NOT EXISTS books(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        author TEXT NOT NULL,
+        year INTEGER NOT NULL,
+        available INTEGER CHECK(available in (0,1)) DEFAULT 1
+    );"""
+
+
+def decade(year: str) -> str:
+    # десятилетие в SQL: 1987 -> 1980, -5 -> -10 (без округления к нулю)
+    return f"({year} - (({year} % 10) + 10) % 10)"
+
+
+# Сводные таблицы для отчётов: живые книги и доступные из них по автору и
+# по десятилетию. Их ведут триггеры на books, так что отчёт не делает
+# GROUP BY по всему каталогу; check_stats() сверяет их с пересчётом.
+STATS = {
+    # таблица: (ключ, выражение ключа от строки {row} таблицы books)
+    "author_stats": ("author", "{row}.author"),
+    "decade_stats": ("decade", decade("{row}.year")),
+}
+
+
+def _stats_add(row: str) -> str:
+    # SQL для триггера: учесть строку row (new/old) в сводных таблицах
+    return "".join(
+        f"""INSERT INTO {table}({key}, books, available)
+            SELECT {expr.format(row=row)},
+                   1, {row}.available WHERE {row}.deleted_at IS NULL
+            ON CONFLICT({key}) DO UPDATE SET books = books + 1,
+                available = available + excluded.available;
+            """ for table, (key, expr) in STATS.items())
+
+
+def _stats_sub(row: str) -> str:
+    # ...и убрать её оттуда; опустевшие ключи удаляются
+    out = []
+    for table, (key, expr) in STATS.items():
+        value = expr.format(row=row)
+        out.append(f"""UPDATE {table} SET books = books - 1, available = available - {row}.available
+            WHERE {key} = {value} AND {row}.deleted_at IS NULL;
+            DELETE FROM {table} WHERE {key} = {value} AND books = 0;
+            """)
+    return "".join(out)
+
+
+# Миграции схемы: (версия, список SQL). Текущая версия хранится в
+# PRAGMA user_version, при подключении применяются недостающие по порядку.
+# Новые изменения — только новой записью в конце, старые не править.
+MIGRATIONS = [
+    (1, [SCHEMA]),
+    (2, [
+        # частичный индекс: только доступные книги, show_available_books
+        "CREATE INDEX IF NOT EXISTS idx_books_available ON books(id) WHERE available = 1",
+        "CREATE INDEX IF NOT EXISTS idx_books_author ON books(author, year)",
+        "CREATE INDEX IF NOT EXISTS idx_books_year ON books(year)",
+        "CREATE INDEX IF NOT EXISTS idx_books_title ON books(title)",
+    ]),
+    (3, [
+        # полнотекстовый поиск: FTS5 поверх books (external content), prefix —
+        # готовые индексы для префиксных запросов из 2 и 3 символов
+        """CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+            title, author, content='books', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+        """CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+            INSERT INTO books_fts(rowid, title, author)
+            VALUES (new.id, new.title, new.author);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+            INSERT INTO books_fts(books_fts, rowid, title, author)
+            VALUES ('delete', old.id, old.title, old.author);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE OF title, author ON books BEGIN
+            INSERT INTO books_fts(books_fts, rowid, title, author)
+            VALUES ('delete', old.id, old.title, old.author);
+            INSERT INTO books_fts(rowid, title, author)
+            VALUES (new.id, new.title, new.author);
+        END""",
+        "INSERT INTO books_fts(books_fts) VALUES ('rebuild')",
+    ]),
+    (4, [
+        # мягкое удаление: deleted_at — время удаления, NULL — книга есть.
+        # Надгробия чистит compact(); индексы частичные — без надгробий
+        "ALTER TABLE books ADD COLUMN deleted_at REAL",
+        "DROP INDEX IF EXISTS idx_books_available",
+        "DROP INDEX IF EXISTS idx_books_author",
+        "DROP INDEX IF EXISTS idx_books_year",
+        "DROP INDEX IF EXISTS idx_books_title",
+        "CREATE INDEX idx_books_available ON books(id) "
+        "WHERE available = 1 AND deleted_at IS NULL",
+        "CREATE INDEX idx_books_author ON books(author, year) WHERE deleted_at IS NULL",
+        "CREATE INDEX idx_books_year ON books(year) WHERE deleted_at IS NULL",
+        "CREATE INDEX idx_books_title ON books(title) WHERE deleted_at IS NULL",
+        "CREATE INDEX idx_books_deleted ON books(deleted_at) WHERE deleted_at IS NOT NULL",
+        # в поиске только живые книги: из FTS убираем при мягком удалении,
+        # поэтому окончательное удаление надгробия FTS уже не трогает
+        "DROP TRIGGER IF EXISTS books_fts_ad",
+        "DROP TRIGGER IF EXISTS books_fts_au",
+        """CREATE TRIGGER books_fts_ad AFTER DELETE ON books
+        WHEN old.deleted_at IS NULL BEGIN
+            INSERT INTO books_fts(books_fts, rowid, title, author)
+            VALUES ('delete', old.id, old.title, old.author);
+        END""",
+        """CREATE TRIGGER books_fts_au AFTER UPDATE OF title, author ON books
+        WHEN old.deleted_at IS NULL AND new.deleted_at IS NULL BEGIN
+            INSERT INTO books_fts(books_fts, rowid, title, author)
+            VALUES ('delete', old.id, old.title, old.author);
+            INSERT INTO books_fts(rowid, title, author)
+            VALUES (new.id, new.title, new.author);
+        END""",
+        """CREATE TRIGGER books_fts_soft_delete AFTER UPDATE OF deleted_at ON books
+        WHEN old.deleted_at IS NULL AND new.deleted_at IS NOT NULL BEGIN
+            INSERT INTO books_fts(books_fts, rowid, title, author)
+            VALUES ('delete', old.id, old.title, old.author);
+        END""",
+        """CREATE TRIGGER books_fts_restore AFTER UPDATE OF deleted_at ON books
+        WHEN old.deleted_at IS NOT NULL AND new.deleted_at IS NULL BEGIN
+            INSERT INTO books_fts(rowid, title, author)
+            VALUES (new.id, new.title, new.author);
+        END""",
+    ]),
+    (5, [
+        # сводные таблицы для отчётов (STATS) и триггеры, которые их ведут
+        "CREATE TABLE author_stats(author TEXT PRIMARY KEY, books INTEGER NOT NULL, "
+        "available INTEGER NOT NULL) WITHOUT ROWID",
+        "CREATE TABLE decade_stats(decade INTEGER PRIMARY KEY, books INTEGER NOT NULL, "
+        "available INTEGER NOT NULL)",
+        "CREATE INDEX idx_author_stats_books ON author_stats(books)",
+        f"""CREATE TRIGGER books_stats_ai AFTER INSERT ON books BEGIN
+            {_stats_add("new")}END""",
+        f"""CREATE TRIGGER books_stats_ad AFTER DELETE ON books BEGIN
+            {_stats_sub("old")}END""",
+        f"""CREATE TRIGGER books_stats_au AFTER UPDATE OF author, year, available, deleted_at
+        ON books BEGIN
+            {_stats_sub("old")}{_stats_add("new")}END""",
+        "INSERT INTO author_stats SELECT author, count(*), sum(available) FROM books "
+        "WHERE deleted_at IS NULL GROUP BY author",
+        f"INSERT INTO decade_stats SELECT {decade('year')}, count(*), sum(available) FROM books "
+        f"WHERE deleted_at IS NULL GROUP BY 1",
+    ]),
+]
+
+# Вес совпадения в названии и в авторе для bm25 (меньше rank — выше в выдаче)
+SEARCH_WEIGHTS = (2.0, 1.0)
+SEARCH_LIMIT = 10
+PAGE_SIZE = 500
+ID_CHUNK = 500   # id в одном IN (...) — ниже лимита переменных sqlite
+PURGE_AFTER = 7 * 24 * 3600   # секунд хранить надгробие (restore_book)
+PURGE_BATCH = 1000            # надгробий на транзакцию в compact()
+VACUUM_PAGES = 2000           # страниц за один incremental_vacuum
+FTS_MERGE_PAGES = 500         # страниц слияния сегментов books_fts за проход
+COMPACT_EVERY = 600           # секунд между проходами Compactor
+
+# Что отдают чтения: строка книги без служебного deleted_at
+BOOK = "id, title, author, year, available"
+LIVE = "deleted_at IS NULL"
+
+# Все запросы приложения — отсюда их берёт и check_query_plans()
+QUERIES = {
+    "add_book": "INSERT INTO books (title,author,year,available) VALUES(?,?,?,?)",
+    # постранично по id (keyset): WHERE id > последний выданный id
+    "books_page": f"SELECT {BOOK} FROM books WHERE {LIVE} AND id > ? ORDER BY id LIMIT ?",
+    "available_page": f"SELECT {BOOK} FROM books WHERE available = 1 AND {LIVE} "
+                      "AND id > ? ORDER BY id LIMIT ?",
+    "get_book": f"SELECT {BOOK} FROM books WHERE id = ? AND {LIVE}",
+    "get_available": f"SELECT available FROM books WHERE id = ? AND {LIVE}",
+    "count_by_author": "SELECT coalesce((SELECT books FROM author_stats WHERE author = ?), 0)",
+    "by_author": f"SELECT {BOOK} FROM books WHERE author = ? AND {LIVE} ORDER BY year",
+    "by_year": f"SELECT {BOOK} FROM books WHERE year = ? AND {LIVE}",
+    "by_title": f"SELECT {BOOK} FROM books WHERE title = ? AND {LIVE}",
+    "set_available": "UPDATE books SET available = ? WHERE id = ?",
+    "delete_book": f"UPDATE books SET deleted_at = ? WHERE id = ? AND {LIVE}",
+    "restore_book": "UPDATE books SET deleted_at = NULL WHERE id = ? "
+                    "AND deleted_at IS NOT NULL",
+    # надгробия старше срока, по PURGE_BATCH за раз
+    "purge": "DELETE FROM books WHERE id IN (SELECT id FROM books "
+             "WHERE deleted_at < ? ORDER BY deleted_at LIMIT ?)",
+    # отчёты — из сводных таблиц
+    "totals": "SELECT coalesce(sum(books), 0), coalesce(sum(available), 0) FROM decade_stats",
+    "authors_total": "SELECT count(*) FROM author_stats",
+    "top_authors": "SELECT author, books, available FROM author_stats "
+                   "ORDER BY books DESC LIMIT ?",
+    "decades": "SELECT decade, books, available FROM decade_stats ORDER BY decade",
+    # сначала top-k по bm25 внутри FTS, и только k строк — из books
+    # (удалённых книг в books_fts нет)
+    "search": "SELECT b.id, b.title, b.author, b.year, b.available FROM "
+              "(SELECT rowid, bm25(books_fts, %s, %s) AS score "
+              "FROM books_fts WHERE books_fts MATCH ? ORDER BY score LIMIT ?) f "
+              "JOIN books b ON b.id = f.rowid ORDER BY f.score" % SEARCH_WEIGHTS,
+}
+
+# Фильтры delete_books_where: аргумент -> условие. check_query_plans()
+# проверяет каждое их сочетание. Один available идёт сканом books (по
+# idx_books_year): частичный idx_books_available не подходит к available = ?,
+# а такой фильтр и так задевает большую часть каталога
+FILTERS = {"author": "author = ?", "year_from": "year >= ?",
+           "year_to": "year <= ?", "available": "available = ?"}
+FILTER_SCAN_OK = {("available",)}
+
+# сводная таблица по десятилетиям — десяток-другой строк, скан дешевле индекса
+FULL_SCAN_OK = {"totals", "decades"}
+
+_local = threading.local()
+_opened = []                  # все открытые соединения, для close_all()
+_opened_lock = threading.Lock()
+
+
+class BookCache:
+    """Кэш чтений перед базой: строки книг, страницы доступных книг,
+    число книг автора. Записи через этот модуль сбрасывают только то,
+    что изменили; записи в обход модуля (другой процесс, импорт) — clear()."""
+
+    def __init__(self, max_books: int = 10000, max_pages: int = 256,
+                 max_authors: int = 10000):
+        self.enabled = True
+        self.lock = threading.Lock()
+        self.limits = {"book": max_books, "page": max_pages, "author": max_authors}
+        self.tables = {kind: OrderedDict() for kind in self.limits}
+        self.hits = Counter()
+        self.misses = Counter()
+        # растёт при каждой инвалидации: значение, прочитанное из базы до
+        # неё, в кэш уже не кладётся
+        self.generation = 0
+
+    def get(self, kind: str, key, load):
+        if not self.enabled:
+            return load()
+        table = self.tables[kind]
+        with self.lock:
+            if key in table:
+                table.move_to_end(key)
+                self.hits[kind] += 1
+                return table[key]
+            self.misses[kind] += 1
+            generation = self.generation
+        value = load()
+        if value is not None:
+            with self.lock:
+                if generation == self.generation:
+                    table[key] = value
+                    if len(table) > self.limits[kind]:
+                        table.popitem(last=False)
+        return value
+
+    def invalidate(self, book_id: int, author=None, listing: bool = True):
+        # книга book_id изменилась: её строка, число книг автора и страницы
+        # доступных, в которые она попадает. Страница (after_id, size) — это
+        # первые size доступных книг с id > after_id, так что книга задевает
+        # её, если id > after_id и страница не полная или id не дальше её конца
+        with self.lock:
+            self.generation += 1
+            self.tables["book"].pop(book_id, None)
+            if author is not None:
+                self.tables["author"].pop(author, None)
+            if listing:
+                pages = self.tables["page"]
+                for key in [key for key, page in pages.items()
+                            if key[0] < book_id and (len(page) < key[1] or book_id <= page[-1][0])]:
+                    del pages[key]
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            for table in self.tables.values():
+                table.clear()
+
+    def stats(self) -> dict:
+        # {вид: (попадания, промахи, доля попаданий)}
+        return {kind: (self.hits[kind], self.misses[kind],
+                       self.hits[kind] / max(self.hits[kind] + self.misses[kind], 1))
+                for kind in self.tables}
+
+
+cache = BookCache()
+
+
+class Bookidiszero(Exception):
+    pass
+
+
+class Bookidforchenge(Exception):
+    pass
+
+
+class Bookchangeavailb(Exception):
+    pass
+
+
+def set_db_path(path):
+    global DB_NAME
+    close_all()
+    cache.clear()
+    DB_NAME = str(path)
+
+
+def connect(path=None) -> sqlite3.Connection:
+    # новое соединение с настройками; обычно нужен get_connection()
+    conn = sqlite3.connect(path or DB_NAME, check_same_thread=False)
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    migrate(conn)
+    return conn
+
+
+def schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn) -> int:
+    # применить недостающие миграции. Под BEGIN IMMEDIATE версия читается
+    # заново: соединения, открытые одновременно (писатель и читатели
+    # сервиса), иначе начали бы одну и ту же миграцию
+    if schema_version(conn) >= MIGRATIONS[-1][0]:
+        return schema_version(conn)
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        current = schema_version(conn)
+        for version, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            for sql in statements:
+                conn.execute(sql)
+            conn.execute(f"PRAGMA user_version = {version}")
+            current = version
+    return current
+
+
+def get_connection() -> sqlite3.Connection:
+    # одно долгоживущее соединение на поток (и на путь к базе)
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(DB_NAME)
+    if conn is None:
+        conn = conns[DB_NAME] = connect(DB_NAME)
+        with _opened_lock:
+            _opened.append(conn)
+    return conn
+
+
+def close_all():
+    with _opened_lock:
+        for conn in _opened:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass  # соединение чужого потока уже закрыто
+        _opened.clear()
+    _local.__dict__.clear()
+
+
+# Записи делятся на две части: insert_book/update_available/... выполняют
+# SQL в уже открытой транзакции и складывают в touched, что сбросить в кэше;
+# add_book/change_available_books/... открывают транзакцию сами и сбрасывают
+# кэш после commit. Первые нужны писателю library_service — он коммитит
+# сразу пачку записей от разных клиентов.
+
+def insert_book(conn, touched: list, title: str, author: str, year: int,
+                available=1) -> int:
+    book_id = conn.execute(
+        QUERIES["add_book"], (title, author, year, available)).lastrowid
+    touched.append((book_id, author, available == 1))
+    return book_id
+
+
+def update_available(conn, touched: list, book_id, available):
+    row = conn.execute(QUERIES["get_available"], (book_id,)).fetchone()
+    if not row:
+        raise Bookidforchenge("Книги с таким id нет!")
+    if row[0] == available:
+        raise Bookchangeavailb("Статус книги уже такой же!")
+    conn.execute(QUERIES["set_available"], (available, book_id))
+    touched.append((book_id, None, True))
+
+
+def update_available_many(conn, touched: list, book_ids, available) -> tuple:
+    # проверка одним запросом на пачку id, одно UPDATE ... WHERE id IN (...)
+    ids = list(dict.fromkeys(book_ids))
+    current = {}
+    for i in range(0, len(ids), ID_CHUNK):
+        chunk = ids[i:i + ID_CHUNK]
+        marks = ",".join("?" * len(chunk))
+        current.update(conn.execute(
+            f"SELECT id, available FROM books WHERE id IN ({marks}) AND {LIVE}", chunk))
+    changed = [book_id for book_id in ids
+               if book_id in current and current[book_id] != available]
+    for i in range(0, len(changed), ID_CHUNK):
+        chunk = changed[i:i + ID_CHUNK]
+        marks = ",".join("?" * len(chunk))
+        conn.execute(f"UPDATE books SET available = ? WHERE id IN ({marks})",
+                     [available, *chunk])
+    touched.extend((book_id, None, True) for book_id in changed)
+    errors = {}
+    for book_id in ids:
+        if book_id not in current:
+            errors[book_id] = Bookidforchenge("Книги с таким id нет!")
+        elif current[book_id] == available:
+            errors[book_id] = Bookchangeavailb("Статус книги уже такой же!")
+    return changed, errors
+
+
+def remove_book(conn, touched: list, book_id):
+    # мягкое удаление: строка остаётся надгробием до compact()
+    row = conn.execute(QUERIES["get_book"], (book_id,)).fetchone()
+    if not row:
+        raise Bookidiszero("Такой книги нет в библиотеке!")
+    conn.execute(QUERIES["delete_book"], (time.time(), book_id))
+    touched.append((book_id, row[2], row[4] == 1))
+
+
+def unremove_book(conn, touched: list, book_id):
+    if conn.execute(QUERIES["restore_book"], (book_id,)).rowcount == 0:
+        raise Bookidiszero("Такой книги нет среди удалённых!")
+    author, available = conn.execute(
+        "SELECT author, available FROM books WHERE id = ?", (book_id,)).fetchone()
+    touched.append((book_id, author, available == 1))
+
+
+def filter_query(**filters) -> tuple:
+    # (SELECT живых книг под фильтрами FILTERS, параметры); без фильтра —
+    # ValueError, чтобы случайно не удалить весь каталог
+    used = [name for name in FILTERS if filters.get(name) is not None]
+    if not used:
+        raise ValueError("Нужен хотя бы один фильтр!")
+    where = " AND ".join(FILTERS[name] for name in used)
+    return (f"SELECT id, author, available FROM books WHERE {where} AND {LIVE}",
+            [filters[name] for name in used])
+
+
+def remove_books_where(conn, touched: list, author=None, year_from=None,
+                       year_to=None, available=None) -> int:
+    # мягко удалить все книги под фильтром
+    rows = conn.execute(*filter_query(
+        author=author, year_from=year_from, year_to=year_to,
+        available=available)).fetchall()
+    now = time.time()
+    for i in range(0, len(rows), ID_CHUNK):
+        chunk = [row[0] for row in rows[i:i + ID_CHUNK]]
+        marks = ",".join("?" * len(chunk))
+        conn.execute(f"UPDATE books SET deleted_at = ? WHERE id IN ({marks})", [now, *chunk])
+    touched.extend((book_id, author, available == 1) for book_id, author, available in rows)
+    return len(rows)
+
+
+def purge_deleted(conn, older_than: float = PURGE_AFTER, limit: int = PURGE_BATCH) -> int:
+    # окончательно удалить до limit надгробий старше older_than секунд
+    return conn.execute(QUERIES["purge"], (time.time() - older_than, limit)).rowcount
+
+
+def invalidate(touched: list):
+    # только после commit: иначе читатель успеет положить в кэш старое.
+    # Много изменений разом (удаление по фильтру) — проще сбросить всё
+    if len(touched) > cache.limits["page"] * 4:
+        cache.clear()
+        return
+    for book_id, author, listing in touched:
+        cache.invalidate(book_id, author, listing)
+
+
+def add_book(title: str, author: str, year: int, available=1) -> int:
+    conn = get_connection()
+    touched = []
+    with conn:
+        book_id = insert_book(conn, touched, title, author, year, available)
+    invalidate(touched)
+    return book_id
+
+
+def book_pages(available_only=False, page_size: int = PAGE_SIZE, after_id: int = 0):
+    # страницы книг по возрастанию id. Каждая страница — отдельный запрос
+    # по индексу от последнего id, поэтому первая приходит сразу, память не
+    # растёт с таблицей и между страницами не держится транзакция чтения
+    # страницы доступных книг идут через кэш
+    sql = QUERIES["available_page" if available_only else "books_page"]
+    conn = get_connection()
+    while True:
+        if available_only:
+            page = cache.get("page", (after_id, page_size), lambda: tuple(
+                conn.execute(sql, (after_id, page_size)).fetchall()))
+        else:
+            page = conn.execute(sql, (after_id, page_size)).fetchall()
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        after_id = page[-1][0]
+
+
+def show_all_books(page_size: int = PAGE_SIZE):
+    for page in book_pages(False, page_size):
+        yield from page
+
+
+def show_available_books(page_size: int = PAGE_SIZE):
+    for page in book_pages(True, page_size):
+        yield from page
+
+
+def get_book(book_id):
+    return cache.get("book", book_id, lambda: get_connection().execute(
+        QUERIES["get_book"], (book_id,)).fetchone())
+
+
+def count_by_author(author) -> int:
+    return cache.get("author", author, lambda: get_connection().execute(
+        QUERIES["count_by_author"], (author,)).fetchone()[0])
+
+
+def books_by_author(author):
+    return get_connection().execute(QUERIES["by_author"], (author,)).fetchall()
+
+
+def books_by_year(year):
+    return get_connection().execute(QUERIES["by_year"], (year,)).fetchall()
+
+
+def books_by_title(title):
+    return get_connection().execute(QUERIES["by_title"], (title,)).fetchall()
+
+
+def fts_query(text: str) -> str:
+    # ввод пользователя -> запрос FTS5: каждое слово в кавычках (операторы
+    # и спецсимволы не срабатывают) и с * — поиск по началу слова, все слова
+    # должны встретиться
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{w}"*' for w in words)
+
+
+def search_books(text: str, limit: int = SEARCH_LIMIT):
+    query = fts_query(text)
+    if not query:
+        return []
+    return get_connection().execute(QUERIES["search"], (query, limit)).fetchall()
+
+
+def change_available_books(book_id, available):
+    conn = get_connection()
+    touched = []
+    with conn:
+        update_available(conn, touched, book_id, available)
+    invalidate(touched)
+
+
+def change_available_many(book_ids, available) -> tuple:
+    # сменить статус сразу многим книгам одной транзакцией.
+    # Возвращает (изменённые id, {id: исключение}) — ошибки те же, что у
+    # change_available_books: Bookidforchenge / Bookchangeavailb
+    conn = get_connection()
+    touched = []
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")   # между проверкой и UPDATE никто не пишет
+        result = update_available_many(conn, touched, book_ids, available)
+    invalidate(touched)
+    return result
+
+
+def check_out_books(book_ids) -> tuple:
+    return change_available_many(book_ids, 0)
+
+
+def check_in_books(book_ids) -> tuple:
+    return change_available_many(book_ids, 1)
+
+
+def delete_book(book_id):
+    conn = get_connection()
+    touched = []
+    with conn:
+        remove_book(conn, touched, book_id)
+    invalidate(touched)
+
+
+def restore_book(book_id):
+    # вернуть мягко удалённую книгу, пока compact() её не вычистил
+    conn = get_connection()
+    touched = []
+    with conn:
+        unremove_book(conn, touched, book_id)
+    invalidate(touched)
+
+
+def delete_books_where(author=None, year_from=None, year_to=None, available=None) -> int:
+    conn = get_connection()
+    touched = []
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        count = remove_books_where(conn, touched, author, year_from, year_to, available)
+    invalidate(touched)
+    return count
+
+
+def compact(older_than: float = PURGE_AFTER, batch: int = PURGE_BATCH,
+            vacuum_pages: int = VACUUM_PAGES, conn=None) -> dict:
+    # вычистить надгробия пачками (каждая — своя короткая транзакция, чтобы
+    # не держать запись надолго) и вернуть освободившиеся страницы файлу
+    conn = conn or get_connection()
+    purged = 0
+    while True:
+        with conn:
+            n = purge_deleted(conn, older_than, batch)
+        purged += n
+        if n < batch:
+            break
+    # удалённое из поиска FTS5 помечает, а место отдаёт только при слиянии
+    # сегментов — сливаем понемногу
+    with conn:
+        conn.execute("INSERT INTO books_fts(books_fts, rank) VALUES ('merge', ?)",
+                     (FTS_MERGE_PAGES,))
+    free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    incremental = conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    if incremental:
+        # execute() делает у прагмы без результата один шаг = одну страницу,
+        # executescript() — до конца
+        conn.executescript(f"PRAGMA incremental_vacuum({int(vacuum_pages)});")
+    free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return {"purged": purged, "freed_pages": free_before - free_after,
+            "free_pages": free_after, "incremental_vacuum": incremental}
+
+
+def enable_incremental_vacuum(conn=None):
+    # база, созданная до auto_vacuum=INCREMENTAL: включается только полным
+    # VACUUM (переписывает файл целиком — один раз, в тихое время)
+    conn = conn or get_connection()
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+
+
+class Compactor(threading.Thread):
+    """Фоновый compact() раз в every секунд, со своим соединением."""
+
+    def __init__(self, path=None, every: float = COMPACT_EVERY, **options):
+        super().__init__(name="library-compactor", daemon=True)
+        self.path = path or DB_NAME
+        self.every = every
+        self.options = options
+        self.stopped = threading.Event()
+        self.last = None
+
+    def run(self):
+        conn = connect(self.path)
+        while not self.stopped.wait(self.every):
+            try:
+                self.last = compact(conn=conn, **self.options)
+            except sqlite3.OperationalError as e:
+                # база занята дольше busy_timeout — попробуем в следующий раз
+                print(f"compact: {e}", file=sys.stderr)
+        conn.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def library_report(top_authors: int = 20, conn=None) -> dict:
+    # отчёт из сводных таблиц: время не зависит от размера каталога
+    conn = conn or get_connection()
+    books, available = conn.execute(QUERIES["totals"]).fetchone()
+
+    def rows(cursor):
+        return [(key, n, avail, avail / n) for key, n, avail in cursor]
+
+    return {
+        "books": books,
+        "available": available,
+        "available_ratio": available / books if books else 0.0,
+        "authors": conn.execute(QUERIES["authors_total"]).fetchone()[0],
+        "top_authors": rows(conn.execute(QUERIES["top_authors"], (top_authors,))),
+        "decades": rows(conn.execute(QUERIES["decades"])),
+    }
+
+
+def _recount_sql(table: str) -> str:
+    # сводка table, посчитанная заново по books
+    key, expr = STATS[table]
+    return (f"SELECT {expr.format(row='books')} AS {key}, count(*) AS books, "
+            f"sum(available) AS available FROM books WHERE {LIVE} GROUP BY 1")
+
+
+def check_stats(conn=None) -> dict:
+    # сверить сводные таблицы с пересчётом с нуля:
+    # {таблица: [(ключ, (книг, доступных) в таблице, (книг, доступных) на деле)]}
+    conn = conn or get_connection()
+    report = {}
+    for table, (key, _) in STATS.items():
+        actual = dict((row[0], row[1:]) for row in conn.execute(_recount_sql(table)))
+        stored = dict((row[0], row[1:]) for row in conn.execute(
+            f"SELECT {key}, books, available FROM {table}"))
+        report[table] = [(k, stored.get(k), actual.get(k))
+                         for k in sorted(actual.keys() | stored.keys(), key=str)
+                         if stored.get(k) != actual.get(k)]
+    return report
+
+
+def rebuild_stats(conn=None):
+    # пересчитать сводные таблицы целиком (после правок базы в обход триггеров)
+    conn = conn or get_connection()
+    with conn:
+        for table in STATS:
+            conn.execute(f"DELETE FROM {table}")
+            conn.execute(f"INSERT INTO {table} {_recount_sql(table)}")
+
+
+def add_stats(conn, after_id: int):
+    # учесть в сводках книги с id > after_id — для массовой загрузки,
+    # которая на время снимает триггеры (library_import)
+    for table, (key, expr) in STATS.items():
+        conn.execute(
+            f"INSERT INTO {table}({key}, books, available) "
+            f"SELECT {expr.format(row='books')}, count(*), sum(available) FROM books "
+            f"WHERE id > ? AND {LIVE} GROUP BY 1 "
+            f"ON CONFLICT({key}) DO UPDATE SET books = books + excluded.books, "
+            f"available = available + excluded.available", (after_id,))
+
+
+def query_plan(sql, conn=None) -> list:
+    # строки EXPLAIN QUERY PLAN; вместо параметров подставляются NULL
+    conn = conn or get_connection()
+    params = (None,) * sql.count("?")
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def check_query_plans(conn=None) -> dict:
+    # запросы, которые читают таблицу целиком: {имя: план}. По умолчанию —
+    # на пустой базе в памяти, т.е. проверяется сама схема: на реальных данных
+    # после ANALYZE sqlite вправе выбрать скан, если доступно большинство книг
+    conn = conn or connect(":memory:")
+    tables = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table'")}
+    bad = {}
+    for name, sql in QUERIES.items():
+        if name in FULL_SCAN_OK:
+            continue
+        plan = query_plan(sql, conn)
+        # «SCAN f» по подзапросу и «SCAN … VIRTUAL TABLE INDEX» по FTS — не скан таблицы
+        if any(step.startswith("SCAN ") and step.split()[1] in tables
+               and "USING" not in step and "VIRTUAL TABLE" not in step for step in plan):
+            bad[name] = plan
+    # сочетания фильтров delete_books_where: тут и «SCAN books USING INDEX» —
+    # скан, индекс лишь задаёт порядок обхода
+    for n in range(1, len(FILTERS) + 1):
+        for names in combinations(FILTERS, n):
+            if names in FILTER_SCAN_OK:
+                continue
+            sql, _ = filter_query(**dict.fromkeys(names, 0))
+            plan = query_plan(sql, conn)
+            if any(step.startswith("SCAN books") for step in plan):
+                bad["delete_where(" + ", ".join(names) + ")"] = plan
+    return bad
+
+
+if __name__ == "__main__":
+    # python library_db.py [путь к базе] — миграции, планы запросов к этой
+    # базе и проверка, что схема даёт индекс каждому запросу
+    if len(sys.argv) > 1:
+        set_db_path(sys.argv[1])
+    conn = get_connection()
+    print(f"{DB_NAME}: schema version {schema_version(conn)}")
+    for name, sql in QUERIES.items():
+        print(f"{name:<16}" + "; ".join(query_plan(sql, conn)))
+    bad = check_query_plans()
+    for name in bad:
+        print(f"full table scan: {name}", file=sys.stderr)
+    close_all()
+    sys.exit(1 if bad else 0)
@@ -0,0 +1,349 @@
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from itertools import accumulate, islice
+
+import library_db
+
+# Массовая загрузка каталога в books.
+#   python library_import.py catalogue.csv [more.json ...] [--batch 50000] [--db PATH]
+#   python library_import.py --generate 1000000 catalogue.csv   — тестовый каталог
+#   python library_import.py --selftest   — проверка отбраковки плохих строк
+#
+# Форматы: CSV с заголовком (title,author,year[,available]), JSON-массив
+# объектов, NDJSON (объект на строку). Файлы читаются потоково, строки
+# проверяются по схеме books; плохая строка (битый JSON, не объект, не те
+# поля) считается отбракованной и пропускается. Вставка — executemany
+# пачками по --batch строк. Индексы books, триггеры поиска и сводок на время
+# загрузки снимаются; в конце индексы строятся заново, а в books_fts и
+# сводные таблицы новые строки добавляются одним запросом (--keep-indexes —
+# не трогать).
+#
+# Снятие индексов и триггеров, загрузка и их возврат — одна транзакция:
+# если процесс упадёт посреди загрузки, она откатится целиком, и база не
+# останется без индексов и триггеров (иначе поиск и сводки разошлись бы
+# с books).
+
+BATCH_SIZE = 50000
+MAX_ERRORS_SHOWN = 20
+MIN_YEAR, MAX_YEAR = -3000, 2100
+JSON_CHUNK = 1 << 16
+
+
+def detect_format(path: str) -> str:
+    low = path.lower()
+    if low.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    if low.endswith(".json"):
+        return "json"
+    return "csv"
+
+
+def iter_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def iter_ndjson(path):
+    # строки как есть: JSON разбирает decode_ndjson в valid_rows, чтобы
+    # битая строка отбраковывалась, а не обрывала загрузку
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            if line.strip():
+                yield n, line
+
+
+def decode_ndjson(line: str):
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"битый JSON: {e.msg} (символ {e.pos})")
+
+
+def iter_json_array(path):
+    # JSON-массив объектов без загрузки файла целиком: raw_decode по кускам
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buf = f.read(JSON_CHUNK).lstrip()
+        if not buf.startswith("["):
+            raise ValueError(f"{path}: ожидался JSON-массив")
+        buf = buf[1:]
+        n = 0
+        eof = False
+        while True:
+            buf = buf.lstrip().lstrip(",").lstrip()
+            if buf.startswith("]"):
+                return
+            try:
+                obj, end = decoder.raw_decode(buf)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(JSON_CHUNK)
+                eof = not chunk
+                buf += chunk
+                continue
+            n += 1
+            yield n, obj
+            buf = buf[end:]
+            if len(buf) < JSON_CHUNK and not eof:
+                chunk = f.read(JSON_CHUNK)
+                eof = not chunk
+                buf += chunk
+
+
+READERS = {"csv": iter_csv, "json": iter_json_array, "ndjson": iter_ndjson}
+DECODERS = {"ndjson": decode_ndjson}   # формат -> разбор одной строки
+
+
+def validate(row: dict) -> tuple:
+    # строка -> (title, author, year, available) или ValueError с причиной
+    if not isinstance(row, dict):
+        raise ValueError(f"ожидался объект, а не {type(row).__name__}")
+    title = str(row.get("title") or "").strip()
+    author = str(row.get("author") or "").strip()
+    if not title:
+        raise ValueError("пустой title")
+    if not author:
+        raise ValueError("пустой author")
+    try:
+        year = int(row.get("year"))
+    except (TypeError, ValueError):
+        raise ValueError(f"year не число: {row.get('year')!r}")
+    if not MIN_YEAR <= year <= MAX_YEAR:
+        raise ValueError(f"year вне диапазона: {year}")
+    available = row.get("available", 1)
+    if available in ("", None):
+        available = 1
+    try:
+        available = int(available)
+    except (TypeError, ValueError):
+        raise ValueError(f"available не 0/1: {available!r}")
+    if available not in (0, 1):
+        raise ValueError(f"available не 0/1: {available!r}")
+    return title, author, year, available
+
+
+class ImportStats:
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.rejected = 0
+        self.errors = []
+        self.load_s = 0.0
+        self.index_s = 0.0
+
+
+def reject(stats: ImportStats, where: str, error):
+    stats.rejected += 1
+    if len(stats.errors) < MAX_ERRORS_SHOWN:
+        stats.errors.append(f"{where}: {error}")
+
+
+def valid_rows(paths, stats: ImportStats):
+    for path in paths:
+        fmt = detect_format(path)
+        decode = DECODERS.get(fmt)
+        try:
+            for line, row in READERS[fmt](path):
+                stats.rows += 1
+                try:
+                    yield validate(decode(row) if decode else row)
+                except ValueError as e:
+                    reject(stats, f"{path}:{line}", e)
+        except (ValueError, csv.Error) as e:
+            # файл испорчен так, что дальше не прочитать (оборванный
+            # JSON-массив, мусор в CSV): остаток файла пропускаем
+            reject(stats, path, f"{e}; остаток файла пропущен")
+
+
+def drop_indexes(conn) -> list:
+    # снять вторичные индексы books, вернуть их SQL для пересоздания;
+    # вызывать внутри транзакции загрузки
+    rows = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+        "AND tbl_name = 'books' AND sql IS NOT NULL").fetchall()
+    for name, _ in rows:
+        conn.execute(f'DROP INDEX "{name}"')
+    return [sql for _, sql in rows]
+
+
+def drop_triggers(conn) -> dict:
+    # снять триггеры поиска и сводок: {имя: SQL}; тоже внутри транзакции
+    rows = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'books' "
+        "AND (name LIKE 'books_fts_%' OR name LIKE 'books_stats_%')").fetchall()
+    for name, _ in rows:
+        conn.execute(f'DROP TRIGGER "{name}"')
+    return dict(rows)
+
+
+def import_books(paths, conn=None, batch_size: int = BATCH_SIZE,
+                 keep_indexes: bool = False, progress=None) -> ImportStats:
+    conn = conn or library_db.get_connection()
+    stats = ImportStats()
+    t0 = time.perf_counter()
+    rows = valid_rows(paths, stats)
+    # одна транзакция на всё: при ошибке или падении — откат целиком
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        indexes = [] if keep_indexes else drop_indexes(conn)
+        triggers = {} if keep_indexes else drop_triggers(conn)
+        last_id = conn.execute("SELECT coalesce(max(id), 0) FROM books").fetchone()[0]
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            conn.executemany(
+                "INSERT INTO books (title,author,year,available) VALUES(?,?,?,?)",
+                batch)
+            stats.inserted += len(batch)
+            if progress:
+                progress(stats, time.perf_counter() - t0)
+        stats.load_s = time.perf_counter() - t0
+        t1 = time.perf_counter()
+        for sql in indexes:
+            conn.execute(sql)
+        if any(name.startswith("books_fts_") for name in triggers):
+            conn.execute(
+                "INSERT INTO books_fts(rowid, title, author) "
+                "SELECT id, title, author FROM books WHERE id > ?", (last_id,))
+        if any(name.startswith("books_stats_") for name in triggers):
+            library_db.add_stats(conn, last_id)
+        for sql in triggers.values():
+            conn.execute(sql)
+    conn.execute("ANALYZE books")
+    library_db.cache.clear()
+    stats.index_s = time.perf_counter() - t1
+    return stats
+
+
+SYLLABLES = ["ka", "ro", "mi", "ten", "var", "lo", "sen", "da", "bri", "nor",
+             "gal", "es", "tu", "win", "shi", "pe", "mar", "ol", "dry", "fen"]
+
+
+def vocabulary(seed: int = 1, size: int = 5000) -> list:
+    # слова из слогов, от самого частого к самому редкому
+    rng = random.Random(seed)
+    words = sorted({"".join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+                    for _ in range(size)})
+    rng.shuffle(words)
+    return words
+
+
+def generate(n: int, path: str, seed: int = 1):
+    # частоты слов по Ципфу — как в настоящих названиях: немного очень
+    # частых слов и длинный хвост редких
+    words = vocabulary(seed)
+    rng = random.Random(seed)
+    cum_weights = list(accumulate(1 / (k + 1) for k in range(len(words))))
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["title", "author", "year", "available"])
+        for i in range(n):
+            title = " ".join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(1, 4))).title()
+            w.writerow([f"{title} {i}", f"Author {rng.randrange(n // 10 + 1)}",
+                        rng.randint(1800, 2024), 1 if rng.random() < 0.8 else 0])
+
+
+def schema_objects(conn) -> set:
+    return set(conn.execute(
+        "SELECT type, name FROM sqlite_master WHERE tbl_name = 'books'"))
+
+
+def selftest() -> bool:
+    # временная база: плохие строки NDJSON/JSON отбраковываются, а упавшая
+    # посреди загрузка откатывается вместе со снятием индексов и триггеров
+    with tempfile.TemporaryDirectory() as tmp:
+        ndjson = os.path.join(tmp, "books.ndjson")
+        with open(ndjson, "w", encoding="utf-8") as f:
+            f.write('{"title": "Good One", "author": "A", "year": 2001}\n'
+                    '{"title": "Broken", "author": \n'       # битый JSON
+                    '[1, 2]\n'                                # не объект
+                    '{"title": "Good Two", "author": "B", "year": 2002}\n')
+        array = os.path.join(tmp, "books.json")
+        with open(array, "w", encoding="utf-8") as f:
+            f.write('[{"title": "Good Three", "author": "C", "year": 2003}, "text", '
+                    '{"title": "Cut')                         # оборван
+        library_db.set_db_path(os.path.join(tmp, "library.db"))
+        conn = library_db.get_connection()
+        objects = schema_objects(conn)
+        stats = import_books([ndjson, array])
+        loaded = (stats.inserted, stats.rejected) == (3, 4)
+
+        def crash(stats, elapsed):
+            raise KeyboardInterrupt   # как падение процесса посреди загрузки
+
+        try:
+            import_books([ndjson], batch_size=1, progress=crash)
+            rolled_back = False
+        except KeyboardInterrupt:
+            rolled_back = conn.execute("SELECT count(*) FROM books").fetchone()[0] == 3
+        intact = schema_objects(conn) == objects
+        stats_ok = not any(library_db.check_stats().values())
+        found = len(library_db.search_books("good")) == 3
+        library_db.close_all()
+    for err in stats.errors:
+        print("  " + err)
+    checks = {"bad rows skipped": loaded, "crash rolled back": rolled_back,
+              "indexes and triggers intact": intact, "stats consistent": stats_ok,
+              "search in sync": found}
+    for name, ok in checks.items():
+        print(f"{name}: {'ok' if ok else 'FAIL'}")
+    return all(checks.values())
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Bulk import books into library.db")
+    ap.add_argument("files", nargs="*")
+    ap.add_argument("--batch", type=int, default=BATCH_SIZE, help="строк в одном executemany")
+    ap.add_argument("--db", help="путь к базе (по умолчанию LIBRARY_DB или library.db)")
+    ap.add_argument("--keep-indexes", action="store_true",
+                    help="не снимать индексы и триггеры поиска и сводок на время загрузки")
+    ap.add_argument("--generate", type=int, metavar="N",
+                    help="записать в FILE тестовый CSV-каталог из N книг")
+    ap.add_argument("--selftest", action="store_true",
+                    help="проверить отбраковку плохих строк и откат загрузки")
+    args = ap.parse_args()
+
+    if args.selftest:
+        sys.exit(0 if selftest() else 1)
+    if not args.files:
+        ap.error("нужен хотя бы один файл")
+
+    if args.generate:
+        generate(args.generate, args.files[0])
+        print(f"Generated {args.generate:,} books in {args.files[0]}")
+        return
+    if args.db:
+        library_db.set_db_path(args.db)
+
+    def progress(stats, elapsed):
+        print(f"\r{stats.inserted:,} rows, {stats.inserted / elapsed:,.0f} rows/s",
+              end="", flush=True)
+
+    stats = import_books(args.files, batch_size=args.batch,
+                         keep_indexes=args.keep_indexes, progress=progress)
+    print()
+    for err in stats.errors:
+        print(err, file=sys.stderr)
+    if stats.rejected > len(stats.errors):
+        print(f"... and {stats.rejected - len(stats.errors)} more rejected rows",
+              file=sys.stderr)
+    total = stats.load_s + stats.index_s
+    print(f"Imported {stats.inserted:,} of {stats.rows:,} rows "
+          f"({stats.rejected:,} rejected) in {total:.1f} s: "
+          f"{stats.inserted / max(stats.load_s, 1e-9):,.0f} rows/s load, "
+          f"indexes {stats.index_s:.1f} s")
+    library_db.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import accumulate
+
+import library_db
+import library_import
+from library_service import LIBRARY_ERRORS, LibraryClient
+
+# Нагрузка на library_service: много клиентов, у каждого свой запрос за
+# запросом (закрытый цикл). Итог — запросов в секунду и задержки p50/p95/p99
+# по видам операций. По умолчанию база с --books книгами и сервис
+# поднимаются во временной папке; --socket/--port — бить в уже запущенный.
+#   python library_load.py [--clients 64] [--duration 10] [--books 100000]
+#                          [--max-group 256]
+
+# вид операции -> доля в смеси
+MIX = {
+    "get_book": 0.50,
+    "page": 0.12,
+    "search": 0.08,
+    "count_by_author": 0.05,
+    "change_available": 0.18,
+    "add_book": 0.05,
+    "check_in": 0.02,
+}
+OPS = list(MIX)
+CUM = list(accumulate(MIX.values()))
+WORDS = library_import.vocabulary()[:500]   # для названий и поисковых запросов
+
+
+def make_request(rng, books: int):
+    op = rng.choices(OPS, cum_weights=CUM)[0]
+    if op == "get_book":
+        return op, {"book_id": rng.randint(1, books)}
+    if op == "page":
+        return op, {"available_only": True, "page_size": 20,
+                    "after_id": rng.randint(0, books)}
+    if op == "search":
+        return op, {"text": rng.choice(WORDS)[:rng.randint(3, 6)]}
+    if op == "count_by_author":
+        return op, {"author": f"Author {rng.randrange(books // 10 + 1)}"}
+    if op == "change_available":
+        return op, {"book_id": rng.randint(1, books), "available": rng.randint(0, 1)}
+    if op == "add_book":
+        return op, {"title": f"Load {rng.random():.6f}", "author": "Load", "year": 2024}
+    return op, {"book_ids": [rng.randint(1, books) for _ in range(10)]}
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(p * len(sorted_values)), len(sorted_values) - 1)]
+
+
+async def client_loop(client, rng, books, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        op, args = make_request(rng, books)
+        t0 = time.perf_counter()
+        try:
+            await client.call(op, **args)
+        except LIBRARY_ERRORS:
+            errors[op] = errors.get(op, 0) + 1   # нет книги / статус тот же — тоже ответ
+        latencies.setdefault(op, []).append(time.perf_counter() - t0)
+
+
+async def run_load(args, books):
+    clients = [await LibraryClient.connect(args.socket, args.port) for _ in range(args.clients)]
+    latencies, errors = {}, {}
+    before = await clients[0].call("stats")
+    deadline = time.perf_counter() + args.duration
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client_loop(c, random.Random(i), books, deadline, latencies, errors)
+                           for i, c in enumerate(clients)))
+    elapsed = time.perf_counter() - t0
+    after = await clients[0].call("stats")
+    for c in clients:
+        await c.close()
+    return latencies, errors, elapsed, before, after
+
+
+def report(latencies, errors, elapsed, before, after):
+    total = sum(len(v) for v in latencies.values())
+    print(f"{'op':<18}{'count':>9}{'ops/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    rows = sorted(latencies.items(), key=lambda kv: -len(kv[1]))
+    everything = []
+    for op, values in rows:
+        values.sort()
+        everything.extend(values)
+        print(f"{op:<18}{len(values):>9,}{len(values) / elapsed:>10,.0f}"
+              + "".join(f"{percentile(values, p) * 1000:>9.2f}" for p in (0.5, 0.95, 0.99))
+              + f"{errors.get(op, 0):>8,}")
+    everything.sort()
+    print(f"{'total':<18}{total:>9,}{total / elapsed:>10,.0f}"
+          + "".join(f"{percentile(everything, p) * 1000:>9.2f}" for p in (0.5, 0.95, 0.99)))
+    writes = after["writes"] - before["writes"]
+    commits = after["commits"] - before["commits"]
+    print(f"writer: {writes:,} writes in {commits:,} commits "
+          f"({writes / max(commits, 1):.1f} per commit)")
+
+
+def seed_db(path, books):
+    library_db.set_db_path(path)
+    conn = library_db.get_connection()
+    rng = random.Random(1)
+    with conn:
+        conn.executemany(library_db.QUERIES["add_book"], (
+            (f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {i}",
+             f"Author {rng.randrange(books // 10 + 1)}", rng.randint(1800, 2024),
+             1 if rng.random() < 0.8 else 0) for i in range(books)))
+    library_db.close_all()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Load generator for library_service")
+    ap.add_argument("--clients", type=int, default=64, help="одновременных клиентов")
+    ap.add_argument("--duration", type=float, default=10, help="секунд нагрузки")
+    ap.add_argument("--books", type=int, default=100_000, help="книг в тестовой базе")
+    ap.add_argument("--max-group", type=int, default=256,
+                    help="записей в транзакции у поднятого сервиса (1 — без group commit)")
+    ap.add_argument("--readers", type=int, default=4, help="читателей у поднятого сервиса")
+    ap.add_argument("--socket", help="уже запущенный сервис: Unix-сокет")
+    ap.add_argument("--port", type=int, help="уже запущенный сервис: 127.0.0.1:PORT")
+    args = ap.parse_args()
+
+    if args.socket or args.port:
+        asyncio.run(main_load(args, args.books))
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "library.db")
+        args.socket = os.path.join(tmp, "library.sock")
+        seed_db(db, args.books)
+        service = subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                          "library_service.py"),
+             "--db", db, "--socket", args.socket, "--readers", str(args.readers),
+             "--max-group", str(args.max_group)],
+            stdout=subprocess.PIPE, text=True)
+        try:
+            print(service.stdout.readline().strip())   # сервис готов
+            asyncio.run(main_load(args, args.books))
+        finally:
+            service.terminate()
+            print(service.stdout.read().strip())
+            service.wait()
+
+
+async def main_load(args, books):
+    print(f"{args.clients} clients, {args.duration:g} s")
+    report(*await run_load(args, books))
+
+
+if __name__ == "__main__":
+    main()
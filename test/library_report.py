@@ -0,0 +1,79 @@
+import argparse
+import json
+import sys
+import time
+
+import library_db
+
+# Отчёт по каталогу: книг и доступных всего, по авторам и по десятилетиям.
+# Цифры берутся из сводных таблиц author_stats/decade_stats, которые триггеры
+# books обновляют на каждой записи, — отчёт не просматривает books.
+#   python library_report.py [--db PATH] [--authors 20] [--json]
+#   python library_report.py --check     — пересчитать с нуля и сверить
+#   python library_report.py --rebuild   — пересчитать и записать заново
+#
+# --check завершается с кодом 1, если сводки разошлись с books.
+
+
+def ratio(value: float) -> str:
+    return f"{value * 100:.1f}%"
+
+
+def print_report(report: dict):
+    print(f"Books: {report['books']:,}, available: {report['available']:,} "
+          f"({ratio(report['available_ratio'])}), authors: {report['authors']:,}")
+    print()
+    print(f"{'author':<30}{'books':>9}{'available':>11}{'ratio':>8}")
+    for author, books, available, share in report["top_authors"]:
+        print(f"{author[:29]:<30}{books:>9,}{available:>11,}{ratio(share):>8}")
+    print()
+    print(f"{'decade':<10}{'books':>9}{'available':>11}{'ratio':>8}")
+    for decade, books, available, share in report["decades"]:
+        print(f"{str(decade) + 's':<10}{books:>9,}{available:>11,}{ratio(share):>8}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Library statistics report")
+    ap.add_argument("--db", help="путь к базе (по умолчанию LIBRARY_DB или library.db)")
+    ap.add_argument("--authors", type=int, default=20, help="сколько авторов показать")
+    ap.add_argument("--json", action="store_true", help="вывести отчёт в JSON")
+    ap.add_argument("--check", action="store_true",
+                    help="пересчитать сводки с нуля и сравнить с таблицами")
+    ap.add_argument("--rebuild", action="store_true", help="пересчитать сводные таблицы")
+    args = ap.parse_args()
+
+    if args.db:
+        library_db.set_db_path(args.db)
+    if args.rebuild:
+        t0 = time.perf_counter()
+        library_db.rebuild_stats()
+        print(f"Statistics rebuilt in {time.perf_counter() - t0:.2f} s")
+    if args.check:
+        t0 = time.perf_counter()
+        mismatches = library_db.check_stats()
+        elapsed = time.perf_counter() - t0
+        bad = sum(len(rows) for rows in mismatches.values())
+        for table, rows in mismatches.items():
+            for key, stored, actual in rows:
+                print(f"{table} {key!r}: stored {stored}, actual {actual}")
+        print(f"Checked in {elapsed:.2f} s: "
+              + (f"{bad} mismatches (run with --rebuild)" if bad else "statistics are consistent"))
+        library_db.close_all()
+        sys.exit(1 if bad else 0)
+    if args.rebuild:
+        library_db.close_all()
+        return
+
+    t0 = time.perf_counter()
+    report = library_db.library_report(args.authors)
+    elapsed = time.perf_counter() - t0
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+        print(f"\n(report in {elapsed * 1000:.1f} ms)")
+    library_db.close_all()
+
+
+if __name__ == "__main__":
+    main()
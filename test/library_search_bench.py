@@ -0,0 +1,81 @@
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import library_db
+import library_import
+
+# Поиск по каталогу: FTS5 (search_books, bm25, top-k) против LIKE '%...%'.
+# Каталог генерируется library_import во временной папке.
+#   python library_search_bench.py [-n 1000000] [-r 5]
+
+# «like ms» — LIKE с LIMIT: останавливается на первых k совпадениях и не
+# ранжирует их; «like all» — все совпадения, столько стоил бы LIKE с
+# сортировкой по релевантности. speedup считается от него.
+
+
+def queries():
+    words = library_import.vocabulary()
+    return [
+        words[0],                   # самое частое слово
+        words[100],
+        words[3000],                # редкое
+        words[1][:3],               # префикс
+        f"{words[5]} {words[20]}",  # два слова
+        "author 4242",
+        "77777",                    # номер в названии — единицы совпадений
+        "nothingmatches",
+    ]
+
+
+LIKE_SQL = (f"SELECT {library_db.BOOK} FROM books "
+            f"WHERE (title LIKE ?1 OR author LIKE ?1) AND {library_db.LIVE} LIMIT ?2")
+
+
+def like_search(text, limit=library_db.SEARCH_LIMIT):
+    # как искали бы без FTS: просмотр таблицы, без ранжирования
+    return library_db.get_connection().execute(
+        LIKE_SQL, (f"%{text}%", limit)).fetchall()
+
+
+def like_all(text):
+    return like_search(text, -1)
+
+
+def median_ms(fn, text, repeats):
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        rows = fn(text)
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times), len(rows)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="FTS5 search vs LIKE scan")
+    ap.add_argument("-n", type=int, default=1_000_000, help="книг в каталоге")
+    ap.add_argument("-r", type=int, default=5, help="повторов каждого запроса")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "catalogue.csv")
+        library_import.generate(args.n, csv_path)
+        library_db.set_db_path(os.path.join(tmp, "library.db"))
+        stats = library_import.import_books([csv_path])
+        print(f"{stats.inserted:,} books loaded in {stats.load_s + stats.index_s:.1f} s")
+
+        print(f"{'query':<26}{'fts ms':>9}{'like ms':>9}{'like all':>10}"
+              f"{'matches':>9}{'speedup':>9}")
+        for text in queries():
+            fts, _ = median_ms(library_db.search_books, text, args.r)
+            like, _ = median_ms(like_search, text, args.r)
+            full, matches = median_ms(like_all, text, args.r)
+            print(f"{text:<26}{fts:>9.2f}{like:>9.2f}{full:>10.2f}{matches:>9,}"
+                  f"{full / fts:>8.1f}x")
+        library_db.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+import argparse
+import asyncio
+import json
+import os
+import queue
+import signal
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+
+import library_db
+
+# Асинхронный сервис библиотеки для многих клиентов сразу.
+#   python library_service.py [--db PATH] [--socket library.sock | --port 8765]
+#                             [--readers 4] [--max-group 256] [--compact-every 600]
+#
+# Протокол — JSON, строка на запрос и строка на ответ. По одному соединению
+# можно слать запросы, не дожидаясь ответов: ответ несёт тот же "id".
+#   -> {"id": 1, "op": "get_book", "book_id": 5}
+#   <- {"id": 1, "ok": true, "result": [5, "Title", "Author", 1999, 1]}
+#   <- {"id": 2, "ok": false, "error": "Bookidforchenge", "message": "Книги с таким id нет!"}
+# Операции — READ_OPS, WRITE_OPS и "stats".
+#
+# Чтения выполняет пул потоков-читателей, у каждого своё соединение
+# (library_db.get_connection). Записи идут в очередь единственного потока-
+# писателя: он забирает всё, что накопилось, и проводит одной транзакцией
+# (group commit), каждую запись в своём SAVEPOINT — ошибка одной записи
+# не откатывает остальные.
+
+SOCKET = "library.sock"
+READERS = 4
+MAX_GROUP = 256          # записей в одной транзакции
+MAX_IN_FLIGHT = 256      # запросов одного клиента в работе одновременно
+MAX_PAGE = 1000
+LINE_LIMIT = 1 << 20     # байт в строке запроса (список id для check_in/out)
+
+LIBRARY_ERRORS = (library_db.Bookidiszero, library_db.Bookidforchenge,
+                  library_db.Bookchangeavailb)
+
+
+class BadRequest(Exception):
+    pass
+
+
+class ServiceError(Exception):
+    pass
+
+
+def error_reply(e: Exception) -> dict:
+    if isinstance(e, (KeyError, ValueError, TypeError)):
+        return {"error": "BadRequest", "message": f"{type(e).__name__}: {e}"}
+    return {"error": type(e).__name__, "message": str(e)}
+
+
+def batch_reply(result) -> dict:
+    changed, errors = result
+    return {"changed": changed,
+            "errors": {str(book_id): error_reply(e) for book_id, e in errors.items()}}
+
+
+def read_page(a):
+    # одна страница keyset-списка: следующую клиент просит с after_id = id
+    # последней книги
+    pages = library_db.book_pages(bool(a.get("available_only", False)),
+                                  min(int(a.get("page_size", 50)), MAX_PAGE),
+                                  int(a.get("after_id", 0)))
+    return next(pages, [])
+
+
+READ_OPS = {
+    "get_book": lambda a: library_db.get_book(int(a["book_id"])),
+    "page": read_page,
+    "search": lambda a: library_db.search_books(
+        str(a["text"]), min(int(a.get("limit", library_db.SEARCH_LIMIT)), MAX_PAGE)),
+    "count_by_author": lambda a: library_db.count_by_author(str(a["author"])),
+    "books_by_author": lambda a: library_db.books_by_author(str(a["author"])),
+    "report": lambda a: library_db.library_report(min(int(a.get("top", 20)), MAX_PAGE)),
+}
+
+WRITE_OPS = {
+    "add_book": lambda conn, touched, a: library_db.insert_book(
+        conn, touched, str(a["title"]), str(a["author"]), int(a["year"]),
+        int(a.get("available", 1))),
+    "change_available": lambda conn, touched, a: library_db.update_available(
+        conn, touched, int(a["book_id"]), int(a["available"])),
+    "check_out": lambda conn, touched, a: batch_reply(library_db.update_available_many(
+        conn, touched, [int(i) for i in a["book_ids"]], 0)),
+    "check_in": lambda conn, touched, a: batch_reply(library_db.update_available_many(
+        conn, touched, [int(i) for i in a["book_ids"]], 1)),
+    "delete_book": lambda conn, touched, a: library_db.remove_book(
+        conn, touched, int(a["book_id"])),
+    "restore_book": lambda conn, touched, a: library_db.unremove_book(
+        conn, touched, int(a["book_id"])),
+    "delete_where": lambda conn, touched, a: library_db.remove_books_where(
+        conn, touched, a.get("author"), a.get("year_from"), a.get("year_to"),
+        a.get("available")),
+}
+
+
+def _resolve(fut, result, error):
+    if fut.cancelled():
+        return
+    if error is not None:
+        fut.set_exception(error)
+    else:
+        fut.set_result(result)
+
+
+class Writer(threading.Thread):
+    """Единственный поток записи: очередь -> пачка -> одна транзакция."""
+
+    def __init__(self, path, max_group: int = MAX_GROUP):
+        super().__init__(name="library-writer", daemon=True)
+        self.path = path
+        self.max_group = max_group
+        self.queue = queue.SimpleQueue()
+        self.writes = 0
+        self.commits = 0
+
+    def submit(self, loop, op: str, args: dict) -> asyncio.Future:
+        fut = loop.create_future()
+        self.queue.put((op, args, fut, loop))
+        return fut
+
+    def stop(self):
+        self.queue.put(None)
+        self.join()
+
+    def run(self):
+        conn = library_db.connect(self.path)
+        conn.isolation_level = None   # BEGIN/COMMIT ставим сами
+        running = True
+        while running:
+            group = [self.queue.get()]
+            while len(group) < self.max_group:
+                try:
+                    group.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in group:
+                running = False
+                group = [item for item in group if item is not None]
+            if group:
+                self.commit(conn, group)
+        conn.close()
+
+    def commit(self, conn, group):
+        touched = []
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for op, args, _, _ in group:
+                conn.execute("SAVEPOINT op")
+                try:
+                    results.append((WRITE_OPS[op](conn, touched, args), None))
+                    conn.execute("RELEASE op")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO op")
+                    conn.execute("RELEASE op")
+                    results.append((None, e))
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            # не удалась сама транзакция — ошибка у всей пачки
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            results = [(None, e)] * len(group)
+        library_db.invalidate(touched)
+        self.writes += len(group)
+        self.commits += 1
+        for (_, _, fut, loop), (result, error) in zip(group, results):
+            loop.call_soon_threadsafe(_resolve, fut, result, error)
+
+
+class LibraryService:
+    def __init__(self, readers: int = READERS, max_group: int = MAX_GROUP,
+                 compact_every: float = library_db.COMPACT_EVERY):
+        self.writer = Writer(library_db.DB_NAME, max_group)
+        self.compactor = library_db.Compactor(every=compact_every) if compact_every else None
+        self.readers = ThreadPoolExecutor(readers, thread_name_prefix="library-reader")
+        self.requests = 0
+        self.clients = 0
+
+    def start(self):
+        self.writer.start()
+        if self.compactor:
+            self.compactor.start()
+
+    def close(self):
+        if self.compactor:
+            self.compactor.stop()
+        self.writer.stop()
+        self.readers.shutdown()
+        library_db.close_all()
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "clients": self.clients,
+            "writes": self.writer.writes,
+            "commits": self.writer.commits,
+            "cache": library_db.cache.stats(),
+            "compaction": self.compactor.last if self.compactor else None,
+        }
+
+    async def call(self, req: dict):
+        op = req.get("op")
+        loop = asyncio.get_running_loop()
+        if op in READ_OPS:
+            return await loop.run_in_executor(self.readers, READ_OPS[op], req)
+        if op in WRITE_OPS:
+            return await self.writer.submit(loop, op, req)
+        if op == "stats":
+            return self.stats()
+        raise BadRequest(f"неизвестная операция: {op!r}")
+
+    async def answer(self, line: bytes, writer, write_lock, in_flight):
+        rid = None
+        try:
+            try:
+                req = json.loads(line)
+                if not isinstance(req, dict):
+                    raise BadRequest("запрос должен быть JSON-объектом")
+                rid = req.get("id")
+                reply = {"id": rid, "ok": True, "result": await self.call(req)}
+            except Exception as e:
+                reply = {"id": rid, "ok": False, **error_reply(e)}
+            self.requests += 1
+            writer.write(json.dumps(reply, ensure_ascii=False).encode() + b"\n")
+            async with write_lock:
+                await writer.drain()
+        except ConnectionError:
+            pass  # клиент ушёл, не дождавшись ответа
+        finally:
+            in_flight.release()
+
+    async def handle_client(self, reader, writer):
+        self.clients += 1
+        in_flight = asyncio.Semaphore(MAX_IN_FLIGHT)
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                await in_flight.acquire()
+                task = asyncio.create_task(self.answer(line, writer, write_lock, in_flight))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except (ConnectionError, ValueError):
+            pass  # обрыв соединения или строка длиннее LINE_LIMIT
+        finally:
+            self.clients -= 1
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
+
+
+class LibraryClient:
+    """Клиент сервиса: call() можно звать из многих задач сразу по одному
+    соединению. Ошибки библиотеки приходят теми же исключениями library_db."""
+
+    ERRORS = {cls.__name__: cls for cls in LIBRARY_ERRORS}
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.pending = {}
+        self.next_id = 0
+        self.write_lock = asyncio.Lock()
+        self.listener = asyncio.create_task(self._listen())
+
+    @classmethod
+    async def connect(cls, socket=SOCKET, port=None):
+        if port:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=LINE_LIMIT)
+        else:
+            reader, writer = await asyncio.open_unix_connection(socket, limit=LINE_LIMIT)
+        return cls(reader, writer)
+
+    async def call(self, op: str, **args):
+        self.next_id += 1
+        rid = self.next_id
+        fut = asyncio.get_running_loop().create_future()
+        self.pending[rid] = fut
+        self.writer.write(json.dumps({"id": rid, "op": op, **args}).encode() + b"\n")
+        async with self.write_lock:
+            await self.writer.drain()
+        reply = await fut
+        if not reply["ok"]:
+            raise self.ERRORS.get(reply["error"], ServiceError)(reply["message"])
+        return reply["result"]
+
+    async def _listen(self):
+        try:
+            while line := await self.reader.readline():
+                reply = json.loads(line)
+                fut = self.pending.pop(reply.get("id"), None)
+                if fut is not None and not fut.done():
+                    fut.set_result(reply)
+        finally:
+            for fut in self.pending.values():
+                if not fut.done():
+                    fut.set_exception(ConnectionError("соединение с сервисом закрыто"))
+            self.pending.clear()
+
+    async def close(self):
+        self.writer.close()
+        with suppress(ConnectionError):
+            await self.writer.wait_closed()
+        await self.listener
+
+
+async def serve(args):
+    service = LibraryService(args.readers, args.max_group, args.compact_every)
+    service.start()
+    if args.port:
+        server = await asyncio.start_server(
+            service.handle_client, "127.0.0.1", args.port, limit=LINE_LIMIT)
+        where = f"127.0.0.1:{args.port}"
+    else:
+        with suppress(FileNotFoundError):
+            os.unlink(args.socket)   # остался от прошлого запуска
+        server = await asyncio.start_unix_server(
+            service.handle_client, args.socket, limit=LINE_LIMIT)
+        where = args.socket
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    print(f"Library service on {where}, db {library_db.DB_NAME}", flush=True)
+    async with server:
+        await stop.wait()
+    service.close()
+    if not args.port:
+        with suppress(FileNotFoundError):
+            os.unlink(args.socket)
+    print(f"Stopped: {service.requests:,} requests, {service.writer.writes:,} writes "
+          f"in {service.writer.commits:,} commits")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Library service over a Unix socket or localhost TCP")
+    ap.add_argument("--db", help="путь к базе (по умолчанию LIBRARY_DB или library.db)")
+    ap.add_argument("--socket", default=SOCKET, help="путь к Unix-сокету")
+    ap.add_argument("--port", type=int, help="слушать 127.0.0.1:PORT вместо сокета")
+    ap.add_argument("--readers", type=int, default=READERS, help="потоков-читателей")
+    ap.add_argument("--max-group", type=int, default=MAX_GROUP,
+                    help="записей в одной транзакции (1 — без group commit)")
+    ap.add_argument("--compact-every", type=float, default=library_db.COMPACT_EVERY,
+                    help="секунд между чистками надгробий (0 — не чистить)")
+    args = ap.parse_args()
+    if args.db:
+        library_db.set_db_path(args.db)
+    asyncio.run(serve(args))
+
+
+if __name__ == "__main__":
+    main()